@@ -0,0 +1,15 @@
+"""
+Benchmarks of the pystudio and qubicpack hot paths.
+
+The benchmarks follow the conventions of airspeed velocity (asv): the
+methods time_* are timed and the methods peakmem_* are profiled for their
+peak memory, after a call to the optional setup method. They can be run by
+asv or by the standalone runner, which stores the results in a JSON file:
+
+     $ python -m benchmarks.run -o results-2.0.0.json
+     $ python -m benchmarks.run -o new.json --compare results-2.0.0.json
+
+By default, the dispatcher is simulated (see pystudio/simulated.pyx) and the
+data are synthetic, so that no QubicStudio is needed.
+
+"""
@@ -0,0 +1,97 @@
+"""
+Benchmarks of the dispatcher client.
+
+The suites whose attribute dispatcher is True depend on the dispatcher: with
+the simulated one, they time the client code of the extension module but
+also the in-process transfer of the simulated TM packets, or its transfer
+functions, which are the identity and thus always take the affine path of
+the conversions. Their results are labelled as simulated by the runner and
+they are not representative of the performance with QubicStudio.
+
+"""
+from __future__ import division
+import numpy as np
+from .common import get_client
+
+
+class FetchSuite(object):
+    """ Round trip of one-time requests. """
+    dispatcher = True
+    params = ['QUBIC_Nsample', 'QUBIC_PixelScientificDataTimeLine_0']
+    param_names = ['parameter']
+
+    def setup(self, parameter):
+        self.client = get_client()
+        self.client.fetch(parameter)
+
+    def time_fetch(self, parameter):
+        self.client.fetch(parameter)
+
+
+class RequestSuite(object):
+    """ Throughput of the persistent requests. """
+    dispatcher = True
+    nchunks = 50
+
+    def setup(self):
+        self.client = get_client()
+        self.parameter = 'QUBIC_PixelScientificDataTimeLine_0'
+        param = self.client.parameters[self.parameter]
+        self.out = np.empty(param.value.shape[:-1] + (1500 * self.nchunks,),
+                            param.value.dtype)
+
+    def time_next(self):
+        request = self.client.request(self.parameter)
+        for i in range(self.nchunks):
+            request.next()
+        request.abort()
+
+    def time_next_into(self):
+        request = self.client.request(self.parameter)
+        offset = 0
+        for i in range(self.nchunks):
+            offset += request.next_into(self.out, offset)
+        request.abort()
+
+    def time_acquire_timeline(self):
+        self.client.acquire_timeline(0, 20000)
+
+    def peakmem_acquire_timeline(self):
+        self.client.acquire_timeline(0, 20000)
+
+
+class ConvertSuite(object):
+    """ Transfer function of a 128 x 100000 block. """
+    dispatcher = True
+    params = ['int16', 'float64']
+    param_names = ['dtype']
+
+    def setup(self, dtype):
+        self.client = get_client()
+        random = np.random.RandomState(0)
+        self.x = random.randint(-2**15, 2**15, (128, 100000)).astype(dtype)
+        self.client.convertADU2Value('QUBIC_WorkingRawData_0_0', self.x[0])
+
+    def time_convertADU2Value(self, dtype):
+        self.client.convertADU2Value('QUBIC_WorkingRawData_0_0', self.x)
+
+    def peakmem_convertADU2Value(self, dtype):
+        self.client.convertADU2Value('QUBIC_WorkingRawData_0_0', self.x)
+
+
+class ParametersSuite(object):
+    """ Construction of the parameter table. """
+    def setup(self):
+        self.client = get_client()
+
+    def time_build_schema(self):
+        from pystudio.parameters import read_schema
+        read_schema(cache=False)
+
+    def time_read_schema(self):
+        from pystudio.parameters import read_schema
+        read_schema()
+
+    def time_get_parameters(self):
+        self.client.invalidate_parameters()
+        self.client.parameters
@@ -0,0 +1,135 @@
+"""
+Benchmarks of the qubicpack acquisition and analysis methods, on synthetic
+data.
+
+"""
+from __future__ import division
+from glob import glob
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+from .common import get_client, iv_adu, timelines, write_bins
+
+# qubicpack prints a lot
+_devnull = open(os.devnull, 'w')
+
+
+def _new_qubicpack(datadir):
+    from qubicpack import qubicpack
+    stdout = sys.stdout
+    sys.stdout = _devnull
+    try:
+        qp = qubicpack()
+        qp.assign_datadir(datadir)
+        qp.assign_obsdate()
+    finally:
+        sys.stdout = stdout
+    return qp
+
+
+class _Suite(object):
+    def setup(self, *args):
+        self.tmpdir = tempfile.mkdtemp(prefix='pystudio-benchmarks-')
+        self.qp = _new_qubicpack(self.tmpdir)
+        self.stdout = sys.stdout
+        sys.stdout = _devnull
+
+    def teardown(self, *args):
+        sys.stdout = self.stdout
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class IntegrationSuite(_Suite):
+    """ Acquisition of a 1 s timeline through the dispatcher client. """
+    # see bench_pystudio
+    dispatcher = True
+    def setup(self):
+        _Suite.setup(self)
+        self.qp.connect_QubicStudio(client=get_client())
+        self.qp.assign_integration_time(1.)
+
+    def time_integrate_scientific_data(self):
+        self.qp.integrate_scientific_data()
+
+
+class IVSuite(_Suite):
+    """ Fit and selection of the I-V curves. """
+    def setup(self):
+        _Suite.setup(self)
+        iv_adu(self.qp, 0.35)
+
+    def time_fit_iv(self):
+        self.qp.fit_iv(1)
+
+    def time_filter_iv_all(self):
+        self.qp.filter_iv_all()
+
+
+class FitsSuite(_Suite):
+    """ FITS input/output of the I-V curves and of the timelines. """
+    params = ['iv', 'timeline']
+    param_names = ['data']
+
+    def setup(self, data):
+        _Suite.setup(self)
+        if data == 'iv':
+            iv_adu(self.qp, 0.35)
+        else:
+            self.qp.nsamples = 100
+            self.qp.timelines = timelines(4)
+        self.qp.write_fits()
+        self.filename = glob(os.path.join(self.tmpdir, '*', '*', '*.fits'))[0]
+
+    def time_write_fits(self, data):
+        self.qp.write_fits()
+
+    def time_read_fits(self, data):
+        self.qp.read_fits(self.filename)
+
+    def peakmem_read_fits(self, data):
+        self.qp.read_fits(self.filename)
+
+
+class BinsSuite(_Suite):
+    """ Reading of a binary timeline file. """
+    def setup(self):
+        _Suite.setup(self)
+        self.filename = os.path.join(self.tmpdir, 'timeline.bin')
+        write_bins(self.filename, 10000)
+
+    def time_read_bins(self):
+        self.qp.read_bins(self.filename)
+
+
+class ASDSuite(object):
+    """ Power spectral density computed by plot_ASD for each timeline. """
+    def setup(self):
+        self.timeline = timelines(1, nsamples=100000)[0]
+        self.fs = 20000 / 128
+
+    def time_psd(self):
+        import matplotlib.mlab as mlab
+        mlab.psd(self.timeline[0], Fs=self.fs, NFFT=self.timeline.shape[1],
+                 window=mlab.window_hanning, detrend='mean')
+
+
+class NEPSuite(_Suite):
+    """ NEP from I-V curves measured at 8 bath temperatures. """
+    def setup(self):
+        _Suite.setup(self)
+        self.qplist = []
+        for i, temperature in enumerate(np.linspace(0.3, 0.45, 8)):
+            qp = _new_qubicpack(self.tmpdir)
+            iv_adu(qp, temperature, seed=i)
+            qp.filter_iv_all()
+            self.qplist.append(qp)
+
+    def time_calculate_TES_NEP(self):
+        from qubicpack.temperature_analysis import calculate_TES_NEP
+        calculate_TES_NEP(self.qplist, 1, quiet=True)
+
+    def time_make_TES_NEP_resultslist(self):
+        from qubicpack.temperature_analysis import make_TES_NEP_resultslist
+        make_TES_NEP_resultslist(self.qplist)
@@ -0,0 +1,90 @@
+"""
+Dispatcher client and synthetic data shared by the benchmarks.
+
+"""
+from __future__ import division
+import os
+import struct
+import numpy as np
+
+# the simulated dispatcher is used unless a dispatcher address is given
+DISPATCHER_ADDRESS = os.environ.get('PYSTUDIO_BENCHMARK_DISPATCHER')
+if DISPATCHER_ADDRESS is None:
+    os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+
+# sampling rate of the simulated dispatcher, fast enough for the benchmarks
+# not to be limited by the arrival of the chunks
+SIMULATED_RATE = 150000.
+
+_client = None
+
+
+def get_client():
+    """
+    Return the dispatcher client used by all the benchmarks.
+
+    """
+    global _client
+    if _client is not None:
+        return _client
+    import pystudio
+    if DISPATCHER_ADDRESS is None:
+        _client = pystudio.DispatcherAccess(rate=SIMULATED_RATE)
+    else:
+        _client = pystudio.DispatcherAccess(DISPATCHER_ADDRESS, 3002)
+        if not _client.connected:
+            raise RuntimeError('Cannot connect to the dispatcher {0}.'.format(
+                DISPATCHER_ADDRESS))
+    return _client
+
+
+def iv_adu(qp, temperature, seed=0):
+    """
+    Assign to a qubicpack object synthetic I-V curves, for all its TES and
+    for the default bias cycles. The turnover voltage decreases with the
+    bath temperature, following P = K (T0^n - T^n).
+
+    """
+    random = np.random.RandomState(seed)
+    qp.nsamples = 100
+    qp.assign_temperature(temperature)
+    vbias = qp.make_Vbias()
+    K, T0, n = 7.4e-10, 0.5, 4
+    Iturnover = 20.  # uA
+    power = K * (T0**n - temperature**n)
+    V0 = power * qp.Rbias / (qp.Rshunt * Iturnover * 1e-6)
+    V0 = V0 * random.uniform(0.9, 1.1, (qp.NPIXELS, 1))
+    amplitude = random.uniform(2, 4, (qp.NPIXELS, 1))
+    current = amplitude * (vbias - V0)**2 * (vbias + 1) + Iturnover
+    current += random.standard_normal(current.shape) * 0.05
+    uA_per_adu = qp.ADU2I(1.)
+    qp.adu = current / uA_per_adu
+    return qp.adu
+
+
+def timelines(ntimelines, npixels=128, nsamples=10000, seed=0):
+    """
+    Return synthetic TES timelines in ADU.
+
+    """
+    random = np.random.RandomState(seed)
+    t = np.arange(nsamples) / 156.25
+    frequencies = random.uniform(0.5, 5, (1, npixels, 1))
+    out = 1000 * np.sin(2 * np.pi * frequencies * t)
+    out = out + random.standard_normal((ntimelines, npixels, nsamples)) * 100
+    return out
+
+
+def write_bins(filename, nrecords, seed=0):
+    """
+    Write a synthetic binary timeline file, as read by qubicpack.read_bins:
+    each record is a 14-byte header followed by 128 int32 values.
+
+    """
+    random = np.random.RandomState(seed)
+    header = b'\0' * 14
+    data = random.randint(-2**20, 2**20, (nrecords, 128)).astype('<i4')
+    with open(filename, 'wb') as f:
+        for record in data:
+            f.write(header)
+            f.write(struct.pack('128i', *record))
@@ -0,0 +1,278 @@
+"""
+Standalone runner of the benchmarks, storing the results as JSON.
+
+Examples
+--------
+Run all the benchmarks against the simulated dispatcher:
+     $ python -m benchmarks.run -o results.json
+
+The results of the suites depending on the dispatcher (attribute dispatcher)
+are then labelled as simulated: they are not representative of the
+performance with QubicStudio and they are only compared with results
+obtained with the same kind of dispatcher.
+
+Run the request benchmarks against a dispatcher and compare the results
+with those of a previous run:
+     $ python -m benchmarks.run -o new.json --compare results.json \\
+           --dispatcher 192.168.2.8 --filter RequestSuite
+
+"""
+from __future__ import division, print_function
+import argparse
+import datetime
+import gc
+import glob
+import importlib
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import traceback
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2
+    tracemalloc = None
+
+# a sample of the timed function lasts at least this duration, in seconds
+SAMPLE_TIME = 0.05
+# a timing is a regression if it is slower by more than this factor
+REGRESSION_FACTOR = 1.1
+
+
+def discover():
+    """
+    Return the list of (module name, class) of the benchmark suites.
+
+    """
+    out = []
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(directory, 'bench_*.py'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            module = importlib.import_module('benchmarks.' + name)
+        except Exception as exc:
+            print('{0}: skipped ({1}: {2})'.format(name, type(exc).__name__,
+                                                   exc))
+            continue
+        for key in sorted(vars(module)):
+            cls = getattr(module, key)
+            if not isinstance(cls, type) or key.startswith('_') or \
+               cls.__module__ != module.__name__:
+                continue
+            if not any(_.startswith(('time_', 'peakmem_')) for _ in dir(cls)):
+                continue
+            out.append((name, cls))
+    return out
+
+
+def parameter_sets(cls):
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    if len(getattr(cls, 'param_names', ())) <= 1:
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def time_function(func, repeat):
+    """
+    Return the durations in seconds of a call of func, for repeat samples.
+
+    """
+    number = 1
+    while True:
+        duration = timeit.timeit(func, number=number)
+        if duration >= SAMPLE_TIME or number >= 10000:
+            break
+        number *= 10 if duration < SAMPLE_TIME / 10 else 2
+    samples = [duration / number]
+    for i in range(repeat - 1):
+        samples.append(timeit.timeit(func, number=number) / number)
+    return samples, number
+
+
+def peakmem_function(func):
+    """
+    Return the peak memory in bytes allocated by a call of func.
+
+    """
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def median(values):
+    values = sorted(values)
+    n = len(values)
+    return (values[(n - 1) // 2] + values[n // 2]) / 2
+
+
+def run(suites, repeat, pattern=None):
+    from .common import DISPATCHER_ADDRESS
+    results = {}
+    for module, cls in suites:
+        for params in parameter_sets(cls):
+            for method in sorted(dir(cls)):
+                if not method.startswith(('time_', 'peakmem_')):
+                    continue
+                name = '{0}.{1}.{2}'.format(module, cls.__name__, method)
+                if len(params) > 0:
+                    name += '({0})'.format(', '.join(str(_) for _ in params))
+                if pattern is not None and pattern not in name:
+                    continue
+                results[name] = run_one(cls, method, params, repeat)
+                if getattr(cls, 'dispatcher', False) and \
+                   DISPATCHER_ADDRESS is None and \
+                   'error' not in results[name]:
+                    results[name]['simulated'] = True
+                print_result(name, results[name])
+    return results
+
+
+def run_one(cls, method, params, repeat):
+    suite = cls()
+    try:
+        if hasattr(suite, 'setup'):
+            suite.setup(*params)
+        func = getattr(suite, method)
+        call = lambda: func(*params)
+        if method.startswith('time_'):
+            samples, number = time_function(call, repeat)
+            return {'unit': 's', 'min': min(samples),
+                    'median': median(samples), 'number': number,
+                    'repeat': repeat}
+        return {'unit': 'bytes', 'peak': peakmem_function(call)}
+    except Exception as exc:
+        sys.stdout = sys.__stdout__
+        traceback.print_exc()
+        return {'error': '{0}: {1}'.format(type(exc).__name__, exc)}
+    finally:
+        if hasattr(suite, 'teardown'):
+            try:
+                suite.teardown(*params)
+            except Exception:
+                pass
+
+
+def value(result):
+    if 'error' in result:
+        return None
+    if result['unit'] == 's':
+        return result['median']
+    return result['peak']
+
+
+def format_value(result):
+    v = value(result)
+    if v is None:
+        return result.get('error', 'n/a')
+    if result['unit'] == 's':
+        for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+            if v * factor >= 1:
+                break
+        return '{0:.3f} {1}'.format(v * factor, unit)
+    return '{0:.1f} MiB'.format(v / 2**20)
+
+
+def print_result(name, result):
+    label = '  (simulated dispatcher)' if result.get('simulated') else ''
+    print('{0:<70} {1}{2}'.format(name, format_value(result), label))
+
+
+def compare(results, reference):
+    """
+    Print the ratio of the new and reference values of the benchmarks.
+    Return the number of regressions.
+
+    """
+    nregressions = 0
+    print('\n{0:<70} {1:>14} {2:>14} {3:>7}'.format('benchmark', 'reference',
+                                                     'new', 'ratio'))
+    for name in sorted(set(results) & set(reference)):
+        if results[name].get('simulated', False) != \
+           reference[name].get('simulated', False):
+            print('{0:<70} not compared (simulated and actual dispatchers)'.
+                  format(name))
+            continue
+        old = value(reference[name])
+        new = value(results[name])
+        if old is None or new is None or old == 0:
+            continue
+        ratio = new / old
+        flag = ''
+        if ratio > REGRESSION_FACTOR:
+            flag = '  regression'
+            nregressions += 1
+        elif ratio < 1 / REGRESSION_FACTOR:
+            flag = '  improvement'
+        print('{0:<70} {1:>14} {2:>14} {3:>7.2f}{4}'.format(
+            name, format_value(reference[name]), format_value(results[name]),
+            ratio, flag))
+    return nregressions
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        commit = commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import pystudio
+        version = pystudio.__version__
+    except Exception:
+        version = None
+    from .common import DISPATCHER_ADDRESS
+    return {'date': datetime.datetime.utcnow().isoformat(),
+            'commit': commit,
+            'version': version,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'dispatcher': DISPATCHER_ADDRESS or 'simulator'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmarks.')
+    parser.add_argument('-o', '--output', help='JSON file of the results')
+    parser.add_argument('--compare', help='JSON file of reference results')
+    parser.add_argument('--filter', help='run the benchmarks whose name '
+                        'contains this string')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of samples of the timings')
+    parser.add_argument('--dispatcher', help='address of the dispatcher '
+                        '(default: simulated dispatcher)')
+    args = parser.parse_args()
+    if args.dispatcher is not None:
+        os.environ['PYSTUDIO_BENCHMARK_DISPATCHER'] = args.dispatcher
+    elif 'PYSTUDIO_BENCHMARK_DISPATCHER' not in os.environ:
+        print('The dispatcher is simulated: the results labelled as such are '
+              'not representative\nof the performance with QubicStudio.\n')
+
+    suites = discover()
+    results = run(suites, args.repeat, args.filter)
+    output = {'environment': environment(), 'results': results}
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=1, sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            reference = json.load(f)['results']
+        if compare(results, reference) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Generate the sources of the simulated dispatcher access library, which are
+not shipped with the repository: the parameter table and the meta-object code
+of TDispatcherAccessKernel, produced by the Qt moc tool. The moc executable
+is given by the environment variable MOC, or searched in the Qt5 binary
+directory and in the PATH. Nothing is generated unless the simulator is built,
+as requested by the environment variable PYSTUDIO_BUILD_SIMULATOR.
+
+"""
+from __future__ import print_function
+import os
+import runpy
+import subprocess
+from distutils.spawn import find_executable
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SIMULATOR = os.path.join(ROOT, 'src', 'simulator')
+
+
+def find_moc():
+    moc = os.environ.get('MOC')
+    if moc:
+        return moc
+    try:
+        bins = subprocess.check_output(
+            ['pkg-config', '--variable=host_bins', 'Qt5Core'],
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        bins = ''
+    if bins and os.path.exists(os.path.join(bins, 'moc')):
+        return os.path.join(bins, 'moc')
+    for name in ('moc-qt5', 'moc'):
+        moc = find_executable(name)
+        if moc is not None:
+            return moc
+    return None
+
+
+def is_outdated(target, sources):
+    if not os.path.exists(target):
+        return True
+    mtime = os.path.getmtime(target)
+    return any(os.path.getmtime(_) > mtime for _ in sources)
+
+
+def generate():
+    table = os.path.join(SIMULATOR, 'tparameterstable.cpp')
+    generator = os.path.join(SIMULATOR, 'make_parameterstable.py')
+    if is_outdated(table, [generator,
+                           os.path.join(ROOT, 'pystudio', 'parameters.py')]):
+        print('generating ' + table)
+        runpy.run_path(generator)['main'](table)
+
+    header = os.path.join(ROOT, 'include', 'tdispatcheraccesskernel.h')
+    mocfile = os.path.join(SIMULATOR, 'moc_tdispatcheraccesskernel.cpp')
+    if is_outdated(mocfile, [header]):
+        moc = find_moc()
+        if moc is None:
+            raise RuntimeError(
+                'The Qt5 moc tool required by the simulator could not be found'
+                '. Set the environment variable MOC to its path, or unset PYST'
+                'UDIO_BUILD_SIMULATOR.')
+        print('generating ' + mocfile)
+        subprocess.check_call([moc, header, '-o', mocfile])
+
+
+if os.environ.get('PYSTUDIO_BUILD_SIMULATOR'):
+    generate()
@@ -1,4 +1,19 @@
-from .pystudio import DispatcherAccess, TimeoutError
+import os as _os
+
+if _os.environ.get('PYSTUDIO_REPLAY'):
+    from .replay import (
+        ReplayDispatcherAccess as DispatcherAccess, TimeoutError)
+elif _os.environ.get('PYSTUDIO_SIMULATOR'):
+    from .simulated import (
+        SimulatedDispatcherAccess as DispatcherAccess, TimeoutError)
+else:
+    from .pystudio import DispatcherAccess, TimeoutError
+from .alarms import AlarmEvaluator
+from .commandqueue import CommandError, CommandQueue
+from .metrics import HealthSampler
+from .recorder import SessionReader
+from .snapshot import SnapshotHistory
+from .subscriptions import SubscriptionManager
 from . import utils
 
 def _check_dispatcher_files():
@@ -17,9 +32,13 @@ def _check_dispatcher_files():
         raise ImportError('\n'.join(msg))
 
 def get_client():
-    from . import pystudio
-    return pystudio._last_client
+    client = utils._backend._last_client
+    if client is None:
+        return None
+    return client()
 
-_check_dispatcher_files()
+if not _os.environ.get('PYSTUDIO_SIMULATOR') and \
+   not _os.environ.get('PYSTUDIO_REPLAY'):
+    _check_dispatcher_files()
 
 __version__ = u'2.0.0'
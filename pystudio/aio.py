@@ -0,0 +1,150 @@
+"""
+asyncio interface to the dispatcher requests.
+
+The requests are the usual RequestOneTime and RequestPersistent instances.
+Instead of blocking in their wait method, the coroutines of this module
+await a future which is resolved when the request arrives. The arrivals are
+signalled through a pipe, which is watched by a single reader thread for the
+whole process. The reader resolves the futures of the arrived requests in
+the event loops awaiting them, so that any number of loops can multiplex
+any number of outstanding requests without polling.
+
+"""
+import asyncio
+import os
+import select
+import threading
+from .utils import _backend
+
+__all__ = ['AsyncRequest', 'fetch']
+
+_lock = threading.Lock()
+# the (loop, future) pairs awaiting each request
+_waiters = {}
+_reader = None
+
+
+def _read(fd):
+    while True:
+        select.select([fd], [], [])
+        try:
+            while os.read(fd, 4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        with _lock:
+            requests = list(_waiters)
+        for request in requests:
+            _dispatch(request)
+
+
+def _dispatch(request):
+    # resolve all the futures of a request, if it has arrived
+    with _lock:
+        if request not in _waiters or not request.test():
+            return
+        waiters = _waiters.pop(request)
+    for loop, future in waiters:
+        _notify(loop, future)
+
+
+def _notify(loop, future, exc=None):
+    # resolve a future in the thread of its loop
+    try:
+        loop.call_soon_threadsafe(_resolve, future, exc)
+    except RuntimeError:
+        # the loop is closed
+        pass
+
+
+def _resolve(future, exc):
+    if future.done():
+        return
+    if exc is None:
+        future.set_result(None)
+    else:
+        future.set_exception(exc)
+
+
+def _on_timeout(request, future):
+    # the arrival is checked one last time before the request is aborted,
+    # and all its futures fail
+    with _lock:
+        if future.done() or request not in _waiters:
+            return
+        waiters = _waiters.pop(request)
+        arrived = request.test()
+    exc = None
+    if not arrived:
+        request.abort()
+        exc = _backend.TimeoutError(request.error_msg)
+    for loop, future in waiters:
+        _notify(loop, future, exc)
+
+
+def _wait(request):
+    global _reader
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    with _lock:
+        if _reader is None:
+            _reader = threading.Thread(
+                target=_read, args=(_backend._arrival_fd(),),
+                name='pystudio asyncio arrivals')
+            _reader.daemon = True
+            _reader.start()
+        _waiters.setdefault(request, []).append((loop, future))
+    handle = loop.call_later(request.timeout / 1000, _on_timeout, request,
+                             future)
+
+    def done(future):
+        handle.cancel()
+        with _lock:
+            waiters = _waiters.get(request)
+            if waiters is None:
+                return
+            waiters[:] = [_ for _ in waiters if _[1] is not future]
+            if len(waiters) == 0:
+                del _waiters[request]
+    future.add_done_callback(done)
+    # the request may have arrived before its future was registered
+    _dispatch(request)
+    return future
+
+
+async def fetch(request):
+    """
+    Await the arrival of a one-time request and return its values.
+
+    """
+    await _wait(request)
+    return request._values()
+
+
+class AsyncRequest(object):
+    """
+    Asynchronous iterator over the arrivals of a persistent request.
+
+    Example
+    -------
+    >>> name = 'QUBIC_PixelScientificDataTimeLine_0'
+    >>> async for value in client.arequest(name):
+    ...     process(value)
+
+    """
+    def __init__(self, request):
+        self.request = request
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await _wait(self.request)
+        return self.request._values()
+
+    def abort(self):
+        """
+        Abort request.
+
+        """
+        self.request.abort()
@@ -0,0 +1,323 @@
+"""
+Index of the dispatcher parameter files and evaluation of the alarms.
+
+The files parametersDescription.dispatcher (identifier, type and size of the
+parameters) and parametersTF.dispatcher (unit, use of the transfer function,
+low/high warning and alert thresholds) are parsed once into a structured
+array, which is stored as a .npy file in the directory CACHE_DIR and then
+memory-mapped. A disabled threshold is stored as an infinite value.
+
+The AlarmEvaluator checks the values of a set of parameters, such as a
+housekeeping snapshot returned by a request, against all their thresholds
+at once: the thresholds are expanded to the elements of the parameters so
+that the evaluation is a few vectorized comparisons, without Python loops.
+
+The thresholds are enabled in the file parametersTF.dispatcher of the
+dispatcher. In the file shipped with pystudio, none is enabled: the list
+returned by alarm_parameters is then empty, no request should be sent and an
+evaluator of no parameters reports no violations.
+
+Example
+-------
+>>> names = alarm_parameters()
+>>> if len(names) == 0:
+...     raise SystemExit('No alarm threshold is enabled.')
+>>> evaluator = AlarmEvaluator(names)
+>>> request = client.request(names, 1000)
+>>> while True:
+...     for name, index, value, level in evaluator.violations(request.next()):
+...         print(name, index, value, LEVEL_NAMES[level])
+
+"""
+from __future__ import division, print_function
+import hashlib
+import io
+import os
+import numpy as np
+from .parameters import CACHE_DIR
+
+__all__ = ['AlarmEvaluator', 'alarm_parameters', 'read_index']
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+FILENAME_DESCRIPTION = os.path.join(DATA_DIR,
+                                    'parametersDescription.dispatcher')
+FILENAME_TF = os.path.join(DATA_DIR, 'parametersTF.dispatcher')
+INDEX_VERSION = 1
+
+INDEX_DTYPE = np.dtype([
+    ('name', 'S64'),
+    ('number', np.int32),
+    ('type', np.int16),
+    ('size', np.int32),
+    ('use_tf', np.bool_),
+    ('unit', 'S16'),
+    ('lowalert', np.float64),
+    ('lowwarn', np.float64),
+    ('highwarn', np.float64),
+    ('highalert', np.float64),
+])
+THRESHOLDS = ('lowalert', 'lowwarn', 'highwarn', 'highalert')
+
+# alarm levels returned by the evaluator
+LOW_ALERT = -2
+LOW_WARNING = -1
+OK = 0
+HIGH_WARNING = 1
+HIGH_ALERT = 2
+LEVEL_NAMES = {LOW_ALERT: 'low alert', LOW_WARNING: 'low warning', OK: 'ok',
+               HIGH_WARNING: 'high warning', HIGH_ALERT: 'high alert'}
+
+_index = None
+
+
+def build_index(description=FILENAME_DESCRIPTION, tf=FILENAME_TF):
+    """
+    Parse the dispatcher parameter files and return the index as a
+    structured array of dtype INDEX_DTYPE, sorted by name. The parameters
+    only present in the TF file have the number -1 and the type -1.
+
+    """
+    entries = {}
+
+    def entry(name):
+        if name not in entries:
+            entries[name] = {'name': name, 'number': -1, 'type': -1,
+                             'size': 1, 'use_tf': False, 'unit': '',
+                             'lowalert': -np.inf, 'lowwarn': -np.inf,
+                             'highwarn': np.inf, 'highalert': np.inf}
+        return entries[name]
+
+    numbers = {}
+    for key, value in _read_lines(description):
+        if '\\' not in key:
+            continue
+        number, key = key.split('\\', 1)
+        numbers.setdefault(number, {})[key] = value
+    for number, values in numbers.items():
+        if 'name' not in values:
+            continue
+        e = entry(values['name'])
+        e['number'] = int(number)
+        e['type'] = int(values.get('type', -1))
+        e['size'] = int(values.get('array', 1))
+
+    e = None
+    enabled = {}
+    for key, value in _read_lines(tf):
+        if key.startswith('['):
+            e = entry(key[1:-1])
+            enabled = {}
+            continue
+        if e is None:
+            continue
+        if key == 'unit':
+            e['unit'] = value.rstrip('|')
+        elif key == 'useTF':
+            e['use_tf'] = value == '1'
+        elif key in THRESHOLDS:
+            enabled[key] = value == 'true'
+        elif key[:-1] in THRESHOLDS and key.endswith('v') and \
+             enabled.get(key[:-1]):
+            e[key[:-1]] = float(value)
+
+    out = np.zeros(len(entries), INDEX_DTYPE)
+    for i, name in enumerate(sorted(entries)):
+        e = entries[name]
+        for field in INDEX_DTYPE.names:
+            value = e[field]
+            if field in ('name', 'unit'):
+                value = value.encode('latin-1')
+            out[i][field] = value
+    return out
+
+
+def read_index(description=FILENAME_DESCRIPTION, tf=FILENAME_TF,
+               cache=True):
+    """
+    Return the index of the dispatcher parameter files returned by
+    build_index, memory-mapped from its cache file.
+
+    The cache file name depends on the hash of the source files, so that
+    they are only parsed after they have been modified. If the cache cannot
+    be written, the index is built in memory.
+
+    """
+    global _index
+    if not cache:
+        return build_index(description, tf)
+    default = (description, tf) == (FILENAME_DESCRIPTION, FILENAME_TF)
+    if default and _index is not None:
+        return _index
+    path = _index_cache_path(description, tf)
+    try:
+        index = np.load(path, mmap_mode='r')
+    except Exception:
+        index = build_index(description, tf)
+        tmp = '{0}.{1}.npy'.format(path[:-4], os.getpid())
+        try:
+            if not os.path.isdir(CACHE_DIR):
+                os.makedirs(CACHE_DIR)
+            np.save(tmp, index)
+            os.rename(tmp, path)
+            index = np.load(path, mmap_mode='r')
+        except (IOError, OSError):
+            pass
+        finally:
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+    if default:
+        _index = index
+    return index
+
+
+def alarm_parameters(index=None):
+    """
+    Return the names of the parameters with at least one enabled threshold,
+    which is empty if no threshold is enabled. The parameters which use a
+    transfer function are named by their TF counterpart (suffix '_TF'), whose
+    values are in the physical units of the thresholds.
+
+    """
+    if index is None:
+        index = read_index()
+    enabled = np.zeros(len(index), bool)
+    for field in THRESHOLDS:
+        enabled |= np.isfinite(index[field])
+    return [name.decode('latin-1') + ('_TF' if use_tf else '')
+            for name, use_tf in zip(index['name'][enabled],
+                                    index['use_tf'][enabled])]
+
+
+class AlarmEvaluator(object):
+    """
+    Vectorized evaluation of the thresholds of a set of parameters.
+
+    The values given to the evaluate and violations methods are in the order
+    of the names given to the constructor, as returned by the next method of
+    a request of these parameters. Without parameters, there is nothing to
+    evaluate and no violation is reported. The thresholds of the parameters
+    which use a transfer function are in physical units: these parameters
+    must be given by their TF counterpart (suffix '_TF'), which uses their
+    thresholds, and their raw values in ADU are rejected.
+
+    Parameters
+    ----------
+    names : sequence of str
+        The names of the parameters.
+    index : structured array, optional
+        The index returned by read_index.
+
+    """
+    def __init__(self, names, index=None):
+        if isinstance(names, str):
+            names = [_.strip() for _ in names.split(',')]
+        if index is None:
+            index = read_index()
+        self.names = list(names)
+        keys = np.array([_[:-3] if _.endswith('_TF') else _
+                         for _ in self.names], dtype=index['name'].dtype)
+        rows = np.searchsorted(index['name'], keys)
+        rows[rows == len(index)] = 0
+        missing = index['name'][rows] != keys
+        if np.any(missing):
+            raise ValueError('Unknown parameter(s): {0}.'.format(', '.join(
+                np.array(self.names)[missing])))
+        raw = index['use_tf'][rows] & (keys == np.array(self.names,
+                                                         dtype=keys.dtype))
+        if np.any(raw):
+            raise ValueError(
+                'The thresholds of the parameter(s) {0} are in physical units'
+                ': use their TF counterpart.'.format(', '.join(
+                    np.array(self.names)[raw])))
+        self.thresholds = np.array(index[rows][list(THRESHOLDS)])
+        self._sizes = None
+        self._expand(index['size'][rows])
+
+    def _expand(self, sizes):
+        # expand the thresholds to the elements of the parameters
+        sizes = np.asarray(sizes, int)
+        self._sizes = sizes
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self._parameter = np.repeat(np.arange(len(sizes)), sizes)
+        self._element = np.arange(self._offsets[-1]) - \
+            self._offsets[self._parameter]
+        self._lowalert, self._lowwarn, self._highwarn, self._highalert = \
+            (np.repeat(self.thresholds[_], sizes) for _ in THRESHOLDS)
+
+    def flatten(self, values):
+        """
+        Concatenate the values of the parameters into a vector.
+
+        """
+        if len(self.names) == 1:
+            values = (values,)
+        if len(values) != len(self.names):
+            raise ValueError('Expected {0} values.'.format(len(self.names)))
+        if len(values) == 0:
+            return np.zeros(0)
+        sizes = [np.size(_) for _ in values]
+        if not np.array_equal(sizes, self._sizes):
+            self._expand(sizes)
+        return np.concatenate([np.ravel(_) for _ in values]).astype(
+            np.float64)
+
+    def evaluate_flat(self, x):
+        """
+        Return the alarm levels (LOW_ALERT, LOW_WARNING, OK, HIGH_WARNING,
+        HIGH_ALERT) of the elements of a vector laid out as returned by the
+        flatten method.
+
+        """
+        out = np.zeros(x.shape, np.int8)
+        out[x > self._highwarn] = HIGH_WARNING
+        out[x > self._highalert] = HIGH_ALERT
+        out[x < self._lowwarn] = LOW_WARNING
+        out[x < self._lowalert] = LOW_ALERT
+        return out
+
+    def evaluate(self, values):
+        """
+        Return the alarm levels of the elements of all the parameters, as a
+        vector.
+
+        """
+        return self.evaluate_flat(self.flatten(values))
+
+    def violations(self, values):
+        """
+        Return the list of the (name, index, value, level) of the elements
+        whose level is not OK. The index is that of the element in the
+        flattened parameter value.
+
+        """
+        x = self.flatten(values)
+        levels = self.evaluate_flat(x)
+        where = np.flatnonzero(levels)
+        return [(self.names[p], int(e), float(v), int(l))
+                for p, e, v, l in zip(self._parameter[where],
+                                      self._element[where], x[where],
+                                      levels[where])]
+
+
+def _read_lines(filename):
+    # the files are in latin-1 with CRLF line endings
+    with io.open(filename, encoding='latin-1') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('['):
+                yield line, None
+            elif '=' in line:
+                key, value = line.split('=', 1)
+                yield key, value
+
+
+def _index_cache_path(description, tf):
+    h = hashlib.sha1()
+    h.update('{0}'.format(INDEX_VERSION).encode())
+    for source in (description, tf):
+        with open(source, 'rb') as f:
+            h.update(f.read())
+    return os.path.join(CACHE_DIR, 'index-{0}.npy'.format(h.hexdigest()))
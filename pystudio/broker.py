@@ -0,0 +1,507 @@
+"""
+Fan-out of the request chunks to local processes through shared memory.
+
+In the broker mode, a single process owns the dispatcher client and
+publishes the chunks of some persistent requests, the streams, into ring
+buffers in shared memory (multiprocessing.shared_memory, python >= 3.8).
+Any number of reader processes attach to a stream by its name and get the
+values as numpy arrays viewing the shared memory, without copy, without
+additional dispatcher clients and without additional network load.
+
+Each slot of a ring carries a sequence counter, which is odd while the slot
+is being written. A reader checks the counter before and after reading a
+slot, so that it detects the chunks overwritten because it fell behind by
+more than the number of slots. Since the values returned without copy keep
+viewing the slot, they are valid until the broker has published nslots - 1
+more chunks, which can be checked with the valid method of the reader.
+
+The counters and the values are plain numpy loads and stores, without
+memory barriers, which Python does not provide. The protocol relies on the
+memory ordering of x86-64, on which the 8-byte aligned counters are written
+atomically and the stores of a process are seen in program order by the
+other processes, as are its loads: a reader which sees the even counter of
+a slot also sees its values. On weakly ordered architectures, such as ARM or
+POWER, a reader may see the counter before the values and return a chunk
+being overwritten: the rings cannot be created or attached to on these
+architectures.
+
+The readers attach to a stream by its name only, without registering to the
+broker, which therefore cannot wake them up: a reader waiting for a chunk
+polls the head of the ring, first every POLL_PERIOD seconds, then with a
+period doubled up to MAX_POLL_PERIOD while no chunk is published, so that
+an idle reader does not spin.
+
+Example
+-------
+In the broker process:
+>>> broker = Broker(client)
+>>> broker.publish('timeline0', 'QUBIC_PixelScientificDataTimeLine_0')
+>>> broker.publish('fll', ['QUBIC_FLL_State', 'QUBIC_FLL_P'], 1000)
+
+or from the command line:
+     $ python -m pystudio.broker 192.168.2.8 \\
+           --stream timeline0=QUBIC_PixelScientificDataTimeLine_0 \\
+           --stream fll=QUBIC_FLL_State,QUBIC_FLL_P@1000
+
+In any number of reader processes:
+>>> reader = StreamReader('timeline0')
+>>> while True:
+...     timeline = reader.next()
+
+"""
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+import json
+import platform
+import struct
+import time
+import numpy as np
+
+__all__ = ['Broker', 'StreamReader']
+
+MAGIC = b'PSBROKER'
+VERSION = 1
+# magic, version, nslots, nparams, descriptor size, slot size
+HEADER = struct.Struct('<8sIIIIQ')
+ALIGNMENT = 64
+DEFAULT_PREFIX = 'pystudio'
+DEFAULT_NSLOTS = 64
+# periods in s at which the readers check for new chunks
+POLL_PERIOD = 0.0005
+MAX_POLL_PERIOD = 0.005
+# the architectures whose memory ordering the rings rely on
+ARCHITECTURES = ('x86_64', 'amd64')
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class _Layout(object):
+    """
+    Views of the header, the slot counters and the slot data of a ring.
+
+    The block is made of the HEADER, the head (number of published chunks),
+    the sequence counters and the timestamps of the slots, the lengths of the
+    last axis of the values in each slot, the JSON descriptor of the
+    parameters (name, dtype, maximal shape, offset in the slot), and the
+    slots.
+
+    """
+    def __init__(self, buf, nslots, nparams, descriptor_size, slot_size):
+        offset = _align(HEADER.size)
+        self.head = np.ndarray((), np.uint64, buf, offset)
+        offset += ALIGNMENT
+        self.sequences = np.ndarray(nslots, np.uint64, buf, offset)
+        offset += _align(8 * nslots)
+        self.timestamps = np.ndarray(nslots, np.float64, buf, offset)
+        offset += _align(8 * nslots)
+        self.counts = np.ndarray((nslots, nparams), np.uint32, buf, offset)
+        offset += _align(4 * nslots * nparams)
+        self.descriptor_offset = offset
+        offset += _align(descriptor_size)
+        self.slots = np.ndarray((nslots, slot_size), np.uint8, buf, offset)
+        self.size = offset + nslots * slot_size
+
+    @classmethod
+    def size_of(cls, nslots, nparams, descriptor_size, slot_size):
+        return (_align(HEADER.size) + ALIGNMENT + 2 * _align(8 * nslots) +
+                _align(4 * nslots * nparams) + _align(descriptor_size) +
+                nslots * slot_size)
+
+
+def _check_architecture():
+    machine = platform.machine()
+    if machine.lower() not in ARCHITECTURES:
+        raise RuntimeError(
+            'The shared memory rings require the memory ordering of x86-64, '
+            'not that of {0}.'.format(machine or 'an unknown architecture'))
+
+
+def _attach(name):
+    # attach to an existing block without registering it to the resource
+    # tracker, which would unlink it when the reader exits
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # python < 3.13: the registration is skipped, rather than undone,
+        # since the tracker is shared with the broker in its own process
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedRing(object):
+    """
+    Ring buffer of chunks in a shared memory block, written by the broker.
+
+    Parameters
+    ----------
+    name : str
+        The name of the shared memory block.
+    parameters : sequence of (name, dtype, maxshape)
+        The parameters of the chunks.
+    nslots : int
+        The number of slots of the ring.
+
+    """
+    def __init__(self, name, parameters, nslots=DEFAULT_NSLOTS):
+        _check_architecture()
+        descriptor = []
+        slot_size = 0
+        for pname, dtype, maxshape in parameters:
+            dtype = np.dtype(dtype)
+            descriptor.append({'name': pname, 'dtype': dtype.str,
+                               'maxshape': list(maxshape),
+                               'offset': slot_size})
+            slot_size += _align(dtype.itemsize * int(np.prod(maxshape)))
+        descriptor = json.dumps(descriptor).encode()
+        size = _Layout.size_of(nslots, len(parameters), len(descriptor),
+                               slot_size)
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        buf = self.shm.buf
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, nslots, len(parameters),
+                         len(descriptor), slot_size)
+        self.layout = _Layout(buf, nslots, len(parameters), len(descriptor),
+                              slot_size)
+        start = self.layout.descriptor_offset
+        buf[start:start+len(descriptor)] = descriptor
+        self.layout.head[...] = 0
+        self.layout.sequences[...] = 0
+        self.nslots = nslots
+        self.arrays = [_slot_arrays(self.layout.slots[i], json.loads(
+            descriptor.decode())) for i in range(nslots)]
+
+    def write(self, values):
+        """
+        Publish a chunk, as returned by the next method of the requests.
+
+        """
+        if len(self.arrays[0]) == 1:
+            values = (values,)
+        layout = self.layout
+        head = int(layout.head)
+        slot = head % self.nslots
+        layout.sequences[slot] = 2 * head + 1
+        for i, (array, value) in enumerate(zip(self.arrays[slot], values)):
+            value = np.asarray(value)
+            if value.ndim == 0:
+                array[...] = value
+                layout.counts[slot, i] = 1
+            else:
+                n = min(value.shape[-1], array.shape[-1])
+                array[..., :n] = value[..., :n]
+                layout.counts[slot, i] = n
+        layout.timestamps[slot] = time.time()
+        # no barrier: the stores are seen in program order on x86-64, see
+        # the module docstring
+        layout.sequences[slot] = 2 * head + 2
+        layout.head[...] = head + 1
+
+    def close(self):
+        """
+        Release and destroy the shared memory block.
+
+        """
+        self.arrays = None
+        self.layout = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class _InlineExecutor(object):
+    # run the callbacks of the subscriptions in the arrival thread
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class Broker(object):
+    """
+    Publisher of request streams into shared memory rings.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    prefix : str, optional
+        The prefix of the names of the shared memory blocks, so that several
+        brokers can run on the same host.
+
+    """
+    def __init__(self, client, prefix=DEFAULT_PREFIX):
+        self.client = client
+        self.prefix = prefix
+        self.streams = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def publish(self, stream, parameters, trigger=None, every=1,
+                nslots=DEFAULT_NSLOTS, timeout=None):
+        """
+        Send a persistent request and publish its chunks into a ring.
+
+        Parameters
+        ----------
+        stream : str
+            The name of the stream, to which the readers attach.
+        parameters : str or sequence of str
+            The requested parameters.
+        trigger : int or str, optional
+            The trigger of the request, see the request method of the client.
+        every : int, optional
+            See the request method of the client.
+        nslots : int, optional
+            The number of chunks held by the ring.
+        timeout : int, optional
+            The request timeout in ms.
+
+        """
+        if stream in self.streams:
+            raise ValueError("The stream '{0}' is already published.".format(
+                stream))
+        if isinstance(parameters, str):
+            parameters = parameters.split(',')
+        parameters = [_.strip() for _ in parameters]
+        # the dtypes are those of the values, which differ from those of the
+        # parameters for the converted (_TF) ones
+        values = self.client.fetch(parameters)
+        if len(parameters) == 1:
+            values = (values,)
+        table = self.client.parameters
+        ring = SharedRing(
+            _block_name(self.prefix, stream),
+            [(_, np.asarray(v).dtype, table[_].maxshape)
+             for _, v in zip(parameters, values)], nslots)
+        keywords = {} if timeout is None else {'timeout': timeout}
+        try:
+            subscription = self.client.subscribe(
+                parameters, trigger, ring.write, every=every,
+                executor=_InlineExecutor(), **keywords)
+        except Exception:
+            ring.close()
+            raise
+        self.streams[stream] = (ring, subscription)
+        return ring
+
+    def unpublish(self, stream):
+        """
+        Abort the request of a stream and destroy its ring.
+
+        """
+        ring, subscription = self.streams.pop(stream)
+        subscription.close()
+        ring.close()
+
+    def close(self):
+        """
+        Unpublish all the streams.
+
+        """
+        for stream in list(self.streams):
+            self.unpublish(stream)
+
+
+class StreamReader(object):
+    """
+    Reader of a stream published by a broker.
+
+    Parameters
+    ----------
+    stream : str
+        The name of the stream.
+    prefix : str, optional
+        The prefix of the broker.
+    start : 'latest' or 'oldest', optional
+        Whether the first chunk returned is the next one to be published or
+        the oldest one still in the ring.
+
+    Attributes
+    ----------
+    names : list of str
+        The names of the parameters.
+    sequence : int
+        The sequence number of the last chunk returned.
+    timestamp : float
+        The publication time of the last chunk returned.
+    overruns : int
+        The number of chunks lost because the reader fell behind.
+
+    """
+    def __init__(self, stream, prefix=DEFAULT_PREFIX, start='latest'):
+        if start not in ('latest', 'oldest'):
+            raise ValueError("Invalid start: '{0}'.".format(start))
+        _check_architecture()
+        self.shm = _attach(_block_name(prefix, stream))
+        buf = self.shm.buf
+        magic, version, nslots, nparams, descriptor_size, slot_size = \
+            HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError("Invalid stream '{0}'.".format(stream))
+        self.layout = _Layout(buf, nslots, nparams, descriptor_size,
+                              slot_size)
+        start_ = self.layout.descriptor_offset
+        descriptor = json.loads(bytes(
+            buf[start_:start_+descriptor_size]).decode())
+        self.names = [_['name'] for _ in descriptor]
+        self.nslots = nslots
+        self.arrays = [_slot_arrays(self.layout.slots[i], descriptor)
+                       for i in range(nslots)]
+        head = int(self.layout.head)
+        self._next = head if start == 'latest' else max(0, head - nslots + 1)
+        self.sequence = None
+        self.timestamp = None
+        self.overruns = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def pending(self):
+        """ Number of published chunks which have not been returned yet. """
+        return int(self.layout.head) - self._next
+
+    def next(self, timeout=None, copy=False):
+        """
+        Wait for the next chunk and return the values of the parameters, as
+        a single array or a tuple, like the next method of the requests.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The timeout in seconds, after which a TimeoutError is raised.
+        copy : boolean, optional
+            If False, the arrays view the shared memory.
+
+        """
+        end = None if timeout is None else time.time() + timeout
+        layout = self.layout
+        period = POLL_PERIOD
+        while True:
+            head = int(layout.head)
+            if head - self._next > self.nslots - 1:
+                # the oldest slot may be being overwritten
+                self.overruns += head - self._next - self.nslots + 1
+                self._next = head - self.nslots + 1
+            if self._next < head:
+                slot = self._next % self.nslots
+                expected = 2 * self._next + 2
+                # the loads are not reordered on x86-64, see the module
+                # docstring
+                if int(layout.sequences[slot]) == expected:
+                    out = tuple(self._values(slot, copy))
+                    timestamp = float(layout.timestamps[slot])
+                    if int(layout.sequences[slot]) == expected:
+                        self.sequence = self._next
+                        self.timestamp = timestamp
+                        self._next += 1
+                        return out[0] if len(out) == 1 else out
+                self.overruns += 1
+                self._next += 1
+                continue
+            if end is not None and time.time() >= end:
+                raise TimeoutError('No chunk was published in the stream.')
+            time.sleep(period)
+            period = min(2 * period, MAX_POLL_PERIOD)
+
+    def valid(self, sequence=None):
+        """
+        Return True if the arrays returned without copy for a chunk, by
+        default the last one, have not been overwritten.
+
+        """
+        if sequence is None:
+            sequence = self.sequence
+        if sequence is None:
+            return False
+        slot = sequence % self.nslots
+        return int(self.layout.sequences[slot]) == 2 * sequence + 2
+
+    def _values(self, slot, copy):
+        counts = self.layout.counts[slot]
+        for array, count in zip(self.arrays[slot], counts):
+            if array.ndim > 0:
+                array = array[..., :count]
+            yield array.copy() if copy else array
+
+    def close(self):
+        """
+        Detach from the stream. The arrays returned without copy must not be
+        used afterwards.
+
+        """
+        self.arrays = None
+        self.layout = None
+        self.shm.close()
+
+
+def _block_name(prefix, stream):
+    return '{0}-{1}'.format(prefix, stream)
+
+
+def _slot_arrays(slot, descriptor):
+    # the arrays of the parameters in a slot
+    return [np.ndarray(tuple(_['maxshape']), np.dtype(_['dtype']), slot,
+                       _['offset']) for _ in descriptor]
+
+
+def main():
+    import argparse
+    import signal
+    import sys
+    import pystudio
+    parser = argparse.ArgumentParser(
+        description='Publish request streams into shared memory.')
+    parser.add_argument('address', nargs='?', default=None,
+                        help='dispatcher address (default: localhost)')
+    parser.add_argument('--port', type=int, default=3002)
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX)
+    parser.add_argument('--nslots', type=int, default=DEFAULT_NSLOTS)
+    parser.add_argument('--stream', action='append', default=[],
+                        metavar='NAME=PARAMETERS[@TRIGGER]',
+                        help='stream of comma-separated parameters, with an '
+                        'optional trigger (period in ms or parameter)')
+    args = parser.parse_args()
+    if len(args.stream) == 0:
+        parser.error('No stream is specified.')
+    if args.address is None:
+        client = pystudio.DispatcherAccess()
+    else:
+        client = pystudio.DispatcherAccess(args.address, args.port)
+    with Broker(client, args.prefix) as broker:
+        for spec in args.stream:
+            stream, _, parameters = spec.partition('=')
+            parameters, _, trigger = parameters.partition('@')
+            if trigger == '':
+                trigger = None
+            elif trigger.isdigit():
+                trigger = int(trigger)
+            broker.publish(stream, parameters, trigger, nslots=args.nslots)
+            print('{0}: {1}'.format(stream, parameters))
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Pipelined sending of commands.
+
+In the waiting-for-ack mode, each send* method of the client blocks until the
+command is acknowledged, so that configuring the focal plane costs one round
+trip per command. A CommandQueue records the commands and sends them in a
+row with the waiting-for-ack mode disabled, except the last one which is
+acknowledged: since the dispatcher processes the commands of a client in
+order, its acknowledgement is a barrier for the whole queue. The commands
+which fail are not raised one by one, they are reported together once the
+queue is flushed.
+
+The dispatcher access library only reports the status of the acknowledged
+commands: the failures of the other commands of the queue are those that
+prevent them from being sent (commands locked, disconnection...), whereas
+their rejection by the dispatcher or a subsystem is lost. When this matters,
+the queue should be split at the commands to be checked, or these commands
+sent directly in the waiting-for-ack mode.
+
+Example
+-------
+>>> with client.command_queue() as queue:
+...     for asic in range(16):
+...         queue.sendSetAsicVicm(asic, 3)
+...         queue.sendSetAsicVocm(asic, 3)
+...         queue.sendSetOffsetTable(asic, offsets[asic])
+
+"""
+from __future__ import division
+from collections import namedtuple
+
+__all__ = ['CommandError', 'CommandQueue']
+
+CommandFailure = namedtuple('CommandFailure', 'index name args error')
+
+
+class CommandError(RuntimeError):
+    """
+    Error raised when some commands of a queue have failed. The attribute
+    failures is the list of the CommandFailure (index, name, args, error),
+    where error is the lastError of the client after the failure.
+
+    """
+    def __init__(self, failures, ncommands):
+        self.failures = failures
+        lines = ['{0} of {1} command(s) failed:'.format(len(failures),
+                                                       ncommands)]
+        lines += ['  [{0}] {1}{2}: {3}'.format(*_) for _ in failures]
+        RuntimeError.__init__(self, '\n'.join(lines))
+
+
+class CommandQueue(object):
+    """
+    Queue of commands sent in a row.
+
+    The send* methods of the client can be called on the queue, with the same
+    arguments. The commands are sent when the queue is flushed, which is done
+    on exit of the with statement, unless an exception has occurred.
+
+    The waiting-for-ack mode of the client is changed during the sending of
+    each command of the queue, while the other threads of the client cannot
+    call the dispatcher access library, so that their commands are
+    acknowledged according to their own mode. They can send commands and
+    requests between two commands of the queue.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    barrier : boolean, optional
+        If True, the last command is acknowledged, so that the flush returns
+        once all the commands have been processed by the dispatcher.
+        Otherwise, the flush returns as soon as the commands are sent.
+    raise_errors : boolean, optional
+        If True, a CommandError is raised by the flush if some commands have
+        failed. Otherwise, the failures are only stored in the attribute
+        failures.
+
+    """
+    def __init__(self, client, barrier=True, raise_errors=True):
+        self.client = client
+        self.barrier = barrier
+        self.raise_errors = raise_errors
+        self.commands = []
+        self.failures = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.commands = []
+
+    def __getattr__(self, name):
+        if not name.startswith('send'):
+            raise AttributeError(name)
+        # the command must exist, so that a typo is caught before the flush
+        getattr(self.client, name)
+
+        def send(*args):
+            self.commands.append((name, args))
+        send.__name__ = name
+        return send
+
+    def flush(self):
+        """
+        Send the queued commands and return the list of the failures, i.e.
+        the commands that could not be sent and the last command if it is
+        acknowledged and fails.
+
+        """
+        commands, self.commands = self.commands, []
+        if len(commands) == 0:
+            return []
+        failures = []
+        for index, (name, args) in enumerate(commands):
+            self.client._lock()
+            try:
+                ackmode = self.client.waitingForAckMode
+                try:
+                    self.client.waitingForAckMode = \
+                        index == len(commands) - 1 and (self.barrier or
+                                                        ackmode)
+                    getattr(self.client, name)(*args)
+                except RuntimeError as exc:
+                    failures.append(CommandFailure(index, name, args,
+                                                   str(exc)))
+                finally:
+                    self.client.waitingForAckMode = ackmode
+            finally:
+                self.client._unlock()
+        self.failures.extend(failures)
+        if len(failures) > 0 and self.raise_errors:
+            raise CommandError(failures, len(commands))
+        return failures
@@ -1,26 +1,51 @@
 from libcpp cimport bool
-from libhelpers cimport connect_request, slot_request
+from libhelpers cimport (
+    connect_request, delete_dispatcher_access, new_dispatcher_access,
+    resize_tm_buffer, slot_client_request, start_event_loop, stop_event_loop)
 from libqt cimport (
-    QApplication, QByteArray, QList, QString, fromRawData, qint16)
+    QByteArray, QList, QMutex, QString, Recursive, fromRawData, qint16)
 from libdispatcheraccess cimport TDispatcherAccess, TParamsComputer
 from collections import OrderedDict
 cimport cython
+from cython.parallel cimport prange
 cimport numpy as np
+import atexit
+import gc
 import numpy as np
 import re
+import threading
 import types
+import warnings
+import weakref
 
 __all__ = ['DispatcherAccess']
 
-cdef QApplication *_app = NULL
+# weak reference to the last client created, which is not kept alive by it
 _last_client = None
 DEFAULT_TIMEOUT = 5000  # ms
+# below this number of values, the transfer function is not tabulated
+MIN_SIZE_TRANSFER_TABLE = 1024
+# values at which the transfer functions are probed for being affine
+TRANSFER_PROBES = np.concatenate([-np.logspace(9, -3, 49), [0., 1.],
+                                  np.logspace(-3, 9, 49)])
 
 cdef class Parameter
 # cdef class ParameterTable
 cdef class RequestOneTime
 cdef class RequestPersistent
 
+@atexit.register
+def _stop_event_loop():
+    """
+    Stop the Qt event loop thread at exit, after the clients which are no
+    longer referenced have been released, so that the interpreter can exit.
+
+    """
+    gc.collect()
+    with nogil:
+        stop_event_loop()
+
+
 cdef class DispatcherAccess:
     """
     Dispatcher access class.
@@ -34,59 +59,131 @@ cdef class DispatcherAccess:
     # otherwise we get the cython error "cannot convert to python object"
     cdef TDispatcherAccess *_da
     cdef TParamsComputer *_pc
-
-    def __cinit__(self, str dispatcherAddress=None, int dispatcherPort=-1):
-        global _app, _last_client
-        cdef int argc = 0
+    # held during the calls into the library, which is not thread-safe,
+    # recursive so that a CommandQueue can hold it during its whole flush
+    cdef QMutex *_libraryMutex
+    # index of the client in the arrival flags of the requests
+    cdef int _index
+    cdef object _parameters
+    cdef int _parametersTFVersion
+    cdef int _transferTFVersion
+    cdef readonly dict _transferTables
+    cdef object _callbacks
+    cdef object _recorder
+    # the requests capturing their chunks for the session recorder, and the
+    # one-time requests among them, held until their chunk is recorded
+    cdef object _recorded
+    cdef object _recorded_held
+    cdef object _recording_thread
+    cdef object _active
+    cdef object _tm_buffer
+    cdef object _health_sampler
+    cdef object __weakref__
+
+    def __cinit__(self, str dispatcherAddress=None, int dispatcherPort=-1,
+                  *args, **keywords):
+        # the extra arguments are those of the __init__ of the subclasses
+        global _last_client
         cdef QByteArray dispatcherAddress_
         cdef QString dispatcherAddress__
-        
-        if _app is NULL:
-            _app = new QApplication(argc, <char**>NULL)
-        if dispatcherAddress is None:
-            self._da = new TDispatcherAccess()
-        else:
+        cdef QString *address = NULL
+
+        self._index = -1
+        self._libraryMutex = new QMutex(Recursive)
+
+        # The Qt event loop runs on a native thread started with the first
+        # client, in which the clients are created, so that the arrivals are
+        # processed whatever the Python threads are doing. If a Qt
+        # application already exists, its own event loop is used instead.
+        with nogil:
+            start_event_loop()
+        if dispatcherAddress is not None:
             dispatcherAddress_ = QByteArray(dispatcherAddress.encode('utf-8'),
                                             len(dispatcherAddress))
             dispatcherAddress__ = QString(dispatcherAddress_)
-            self._da = new TDispatcherAccess(dispatcherAddress__,
-                                             dispatcherPort)
+            address = &dispatcherAddress__
+        with nogil:
+            self._da = new_dispatcher_access(address, dispatcherPort)
         self.waitingForAckMode = False
         self.autoUpdateWithRequest = True
-        self._da.start()
-
-        ### cannot assign self.parameters because we get the runtime error
-        ### "objects is not writable"
-        ### this assignment is commented out,
-        ### but somehow, the parameters get assigned somewhere along the line... not sure where.
-        # self.parameters = get_parameters(self)
+        with nogil:
+            self._da.start()
+
+        # the parameter table is built on first access, see the property
+        # parameters
+        self._parameters = None
+        self._transferTables = {}
+        self._transferTFVersion = -1
+        self._callbacks = None
+        self._recorder = None
+        self._recorded = weakref.WeakSet()
+        self._recorded_held = set()
+        self._recording_thread = None
+        self._active = weakref.WeakValueDictionary()
+        self._tm_buffer = None
+        self._health_sampler = None
         self._pc = new TParamsComputer()
-        cdef slot_request slot = &requestArrived
-        connect_request(self._da, slot)
-        _last_client = self
+        self._index = acquire_client_index()
+        cdef slot_client_request slot = &requestArrived
+        connect_request(self._da, slot, self._index)
+        _last_client = weakref.ref(self)
 
     def __dealloc__(self):
-        del self._da
+        # The library object is deleted in the event loop thread, which then
+        # releases the index of the client. The GIL is not released meanwhile:
+        # the weak references to the client are only cleared after
+        # __dealloc__, and another thread could otherwise resurrect it.
+        delete_dispatcher_access(self._da, &release_client_index, self._index)
         del self._pc
-        # del self.parameters
+        del self._libraryMutex
 
-    
     property parameters:
+        """
+        The table of parameters, indexed by name or identifier.
+
+        It is built on first access and kept for the lifetime of the client.
+        It is rebuilt when the TF version loaded by the dispatcher changes or
+        after a call to invalidate_parameters.
+
+        """
         def __get__(self):
-            return get_parameters(self)
-    
+            cdef int version = self._tf_version()
+            if self._parameters is None or \
+               version != self._parametersTFVersion:
+                self._parameters = get_parameters(self)
+                self._parametersTFVersion = version
+            return self._parameters
+
+    def invalidate_parameters(self):
+        """
+        Discard the table of parameters and the cached transfer functions.
+        They will be rebuilt on next access.
+
+        """
+        self._parameters = None
+        self._transferTables.clear()
+        self._transferTFVersion = -1
+
     property connected:
         def __get__(self):
             return self._da.isConnected()
 
     property lastError:
         def __get__(self):
-            cdef string out = self._da.lastError().toStdString()
+            cdef string out
+            with nogil:
+                self._libraryMutex.lock()
+                out = self._da.lastError().toStdString()
+                self._libraryMutex.unlock()
             return out.decode('UTF-8')
 
     property state:
         def __get__(self):
-            cdef string out = self._da.state().toStdString()
+            cdef string out
+            with nogil:
+                self._libraryMutex.lock()
+                out = self._da.state().toStdString()
+                self._libraryMutex.unlock()
             return out.decode('UTF-8')
 
     def configure(self, str address, int port):
@@ -105,13 +202,23 @@ cdef class DispatcherAccess:
         cdef QString address__
         address_ = QByteArray(address, len(address))
         address__ = QString(address_)
-        self._da.configure(address__, port)
+        with nogil:
+            self._libraryMutex.lock()
+            self._da.configure(address__, port)
+            self._libraryMutex.unlock()
 
     def resizeTMBuffer(self, int bufferSize):
         """
         Définit la taille du buffer de télémétrie de la librairie.
-        À ne modifier que si cela est nécessaire dans le cas où un nombre
-        très important de requêtes doit être fait.
+
+        The buffer is resized in the thread of the Qt event loop, to which
+        the client object belongs.
+
+        While persistent requests are active, the buffer is resized
+        automatically by the manager returned by the tm_buffer property,
+        which also reports the overruns. The size set by this method becomes
+        the minimum of the manager, which may still grow the buffer. Its
+        attribute autosize can be set to False to keep this size.
 
         Parameters
         ----------
@@ -119,7 +226,15 @@ cdef class DispatcherAccess:
             New buffer size.
 
         """
-        self._da.resizeTMBuffer(bufferSize)
+        self._resize_tm_buffer(bufferSize)
+        if self._tm_buffer is not None:
+            self._tm_buffer._pin(bufferSize)
+
+    def _resize_tm_buffer(self, int bufferSize):
+        with nogil:
+            self._libraryMutex.lock()
+            resize_tm_buffer(self._da, bufferSize)
+            self._libraryMutex.unlock()
 
     property waitingForAckMode:
         """
@@ -129,7 +244,10 @@ cdef class DispatcherAccess:
         def __get__(self):
             return self._da.waitingForAckMode()
         def __set__(self, bool value):
-            self._da.setWaitingForAckMode(value)
+            with nogil:
+                self._libraryMutex.lock()
+                self._da.setWaitingForAckMode(value)
+                self._libraryMutex.unlock()
 
     property waitingForAckTimeOut:
         """
@@ -139,7 +257,10 @@ cdef class DispatcherAccess:
         def __get__(self):
             return self._da.waitingForAckTimeOut()
         def __set__(self, int value):
-            self._da.setWaitingForAckTimeOut(value)
+            with nogil:
+                self._libraryMutex.lock()
+                self._da.setWaitingForAckTimeOut(value)
+                self._libraryMutex.unlock()
 
     property subSystemsCommandsLocked:
         def __get__(self):
@@ -163,30 +284,55 @@ cdef class DispatcherAccess:
             self._da.setAutoUpdateWithRequest(value)
 
     def startSubsystemAccess(self):
-        return self._da.startSubsystemAccess()
+        cdef bool out
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.startSubsystemAccess()
+            self._libraryMutex.unlock()
+        return out
 
     def stopSubsystemAccess(self):
-        return self._da.stopSubsystemAccess()
+        cdef bool out
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.stopSubsystemAccess()
+            self._libraryMutex.unlock()
+        return out
 
     def stopDispatcher(self, int stopCode):
         """ Stop code is parameterCRC() """
-        return self._da.stopDispatcher(stopCode)
+        cdef bool out
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.stopDispatcher(stopCode)
+            self._libraryMutex.unlock()
+        return out
 
     def setDebug(self):
         self._da.setDebug()
 
     def waitMs(self, int milliseconds):
-        self._da.waitMs(milliseconds)
+        # the library is not locked, so that the other threads are not
+        # blocked during the wait
+        with nogil:
+            self._da.waitMs(milliseconds)
 
     def sendReloadTF(self):
-        return self._da.sendReloadTF()
+        cdef bool out
+        self.invalidate_parameters()
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendReloadTF()
+            self._libraryMutex.unlock()
+        return out
 
     property dispatcherTFVersionLoaded:
         def __get__(self):
-            return self._da.dispatcherTFVersionLoaded()
+            return self._tf_version()
 
     def run(self):
-        self._da.run()
+        with nogil:
+            self._da.run()
 
     property dispatcherAddress:
         def __get__(self):
@@ -199,7 +345,12 @@ cdef class DispatcherAccess:
 
     property stackSize:
         def __get__(self):
-            return self._da.stackSize()
+            cdef int out
+            with nogil:
+                self._libraryMutex.lock()
+                out = self._da.stackSize()
+                self._libraryMutex.unlock()
+            return out
 
     property stackOccupation:
         def __get__(self):
@@ -217,6 +368,31 @@ cdef class DispatcherAccess:
         def __get__(self):
             return self._da.nbOverlap()
 
+    property active_requests:
+        """ The list of the active persistent requests. """
+        def __get__(self):
+            return list(self._active.values())
+
+    property tm_buffer:
+        """
+        The TMBufferManager, which resizes the TM buffer and reports the
+        overruns while persistent requests are active.
+
+        """
+        def __get__(self):
+            from .tmbuffer import TMBufferManager
+            if self._tm_buffer is None:
+                self._tm_buffer = TMBufferManager(self)
+            return self._tm_buffer
+
+    def _register(self, request):
+        self._active[request.id] = request
+        self.tm_buffer.watch()
+
+    def _unregister(self, request):
+        if self._active.get(request.id) is request:
+            del self._active[request.id]
+
     def _emit_request_arrived(self, int num):
         """
         For testing purposes: emit signal that a request has arrived.
@@ -226,7 +402,191 @@ cdef class DispatcherAccess:
 
     def abort_requests(self):
         """ Abort all pending persistent requests. """
-        self._da.disableAllRequestedParameters()
+        with nogil:
+            self._libraryMutex.lock()
+            self._da.disableAllRequestedParameters()
+            self._libraryMutex.unlock()
+
+    def _lock(self):
+        """
+        Prevent the other threads from calling the library, e.g. to send
+        commands or change the waiting-for-ack mode, until _unlock is called
+        by this thread. The lock is recursive.
+
+        """
+        with nogil:
+            self._libraryMutex.lock()
+
+    def _unlock(self):
+        self._libraryMutex.unlock()
+
+    def command_queue(self, barrier=True, raise_errors=True):
+        """
+        Return a CommandQueue, which sends the commands in a row and waits
+        only for the acknowledgement of the last one.
+
+        """
+        from .commandqueue import CommandQueue
+        return CommandQueue(self, barrier, raise_errors)
+
+    def snapshot(self, group, int timeout=DEFAULT_TIMEOUT):
+        """
+        Fetch a group of housekeeping parameters in a single request and
+        return them as a numpy record, with the additional field 'time'.
+        The group is either a name of HK_GROUPS ('netquic', 'fll',
+        'acquisition', 'dispatcher', 'hk') or a sequence of parameter names.
+
+        Example
+        -------
+        >>> record = client.snapshot('fll')
+        >>> record['QUBIC_FLL_State']
+
+        """
+        from .snapshot import snapshot
+        return snapshot(self, group, timeout)
+
+    def subscribe(self, parameters, object trigger, callback, int every=1,
+                  executor=None, int maxsize=16, str policy='drop_oldest',
+                  on_error=None, int timeout=DEFAULT_TIMEOUT,
+                  int ring_size=DEFAULT_RING_SIZE):
+        """
+        Send a persistent request and pass each of its chunks to a callback,
+        without a consumer loop.
+
+        The arrivals of all the subscriptions of the client are waited for by
+        a single thread, which queues the chunks. The callbacks are run by an
+        executor, one at a time for a given subscription, in the order of
+        arrival.
+
+        Parameters
+        ----------
+        parameters : str or sequence of str
+            The requested parameters.
+        trigger : int or str
+            The trigger of the request, see the request method.
+        callback : callable
+            The function called with the values of the parameters, as
+            returned by the next method of the requests.
+        every : int, optional
+            See the request method.
+        executor : concurrent.futures.Executor, optional
+            The executor running the callbacks, such as a process pool. By
+            default, a pool of threads shared by the subscriptions.
+        maxsize : int, optional
+            The maximum number of chunks queued for the callback.
+        policy : 'drop_oldest' or 'block', optional
+            When the queue is full, either the oldest chunk is dropped or the
+            arrival thread waits for the callback to catch up.
+        on_error : callable, optional
+            The function called with the exceptions raised by the callback and
+            with a TimeoutError when the request has not arrived for timeout
+            ms. By default, a PyStudioWarning is issued.
+        timeout : int, optional
+            The request timeout in ms.
+        ring_size : int, optional
+            See the request method.
+
+        Returns
+        -------
+        subscription : CallbackSubscription
+            The subscription, whose close method aborts the request.
+
+        Example
+        -------
+        >>> s = client.subscribe('QUBIC_Nsample', 1000, print)
+        >>> s.close()
+
+        """
+        return self._callback_dispatcher().subscribe(
+            parameters, trigger, callback, every, executor, maxsize, policy,
+            on_error, timeout, ring_size)
+
+    def start_recording(self, directory, segment_size=None, int maxsize=1024):
+        """
+        Start recording the chunks received by the requests of the client into
+        an append-only log, and return the SessionRecorder. See the module
+        pystudio.recorder.
+
+        The chunks are captured at their arrival, whether they are consumed
+        or not, and passed to the recorder by a recording thread. The chunks
+        of the requests whose parameters cannot be buffered (strings...) are
+        recorded when they are consumed.
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the log segments.
+        segment_size : int, optional
+            The size in bytes after which a new segment is started.
+        maxsize : int, optional
+            The maximum number of chunks waiting to be written, after which
+            the chunks are dropped.
+
+        """
+        from .recorder import DEFAULT_SEGMENT_SIZE, SessionRecorder
+        if self._recorder is not None:
+            raise RuntimeError('The client is already recording.')
+        recorder = SessionRecorder(
+            directory, segment_size or DEFAULT_SEGMENT_SIZE, maxsize)
+        set_recording(self._index, True)
+        self._recorder = recorder
+        for request in self._active.values():
+            if request._start_recording():
+                self._recorded.add(request)
+        self._recording_thread = threading.Thread(
+            target=_run_recording, args=(self._index, self._recorded,
+                                         self._recorded_held, recorder),
+            name='pystudio recording')
+        self._recording_thread.daemon = True
+        self._recording_thread.start()
+        return recorder
+
+    def stop_recording(self):
+        """
+        Stop recording, after the queued chunks are written.
+
+        """
+        recorder = self._recorder
+        if recorder is None:
+            return
+        self._recorder = None
+        for request in list(self._recorded):
+            request._stop_recording()
+        set_recording(self._index, False)
+        self._recording_thread.join()
+        self._recording_thread = None
+        recorder.close()
+
+    property recorder:
+        """ The SessionRecorder of the client, or None. """
+        def __get__(self):
+            return self._recorder
+
+    property health_sampler:
+        """
+        The running HealthSampler of the client, or None, into which the
+        latencies of the requests are accumulated.
+
+        """
+        def __get__(self):
+            return self._health_sampler
+        def __set__(self, sampler):
+            self._health_sampler = sampler
+
+    def wait_any(self, requests, int timeout=DEFAULT_TIMEOUT):
+        """
+        Wait until at least one of the requests arrives or until timeout ms
+        have elapsed, and return the list of the arrived requests. Their
+        arrival is consumed, as by their test method.
+
+        """
+        return _wait_any(list(requests), timeout)
+
+    def _callback_dispatcher(self):
+        from .subscriptions import CallbackDispatcher
+        if self._callbacks is None:
+            self._callbacks = CallbackDispatcher(self)
+        return self._callbacks
 
     def fetch(self, parameters, object trigger=0, int timeout=DEFAULT_TIMEOUT):
         """
@@ -265,7 +625,7 @@ cdef class DispatcherAccess:
         return request.next()
 
     def request(self, parameters, object trigger=None, int every=1,
-                int timeout=DEFAULT_TIMEOUT):
+                int timeout=DEFAULT_TIMEOUT, int ring_size=DEFAULT_RING_SIZE):
         """
         Send a persistent request to the dispatcher.
 
@@ -283,6 +643,15 @@ cdef class DispatcherAccess:
         timeout : int, optional
             The request timeout in ms. It controls the duration after which
             calls to the wait method are aborted through a TimeoutException.
+        ring_size : int, optional
+            Number of chunks held by the ring buffer into which the parameter
+            values are copied when the request arrives. If the consumer falls
+            behind by more than ring_size chunks, the oldest chunks are lost
+            and counted in the overruns attribute of the request. If zero,
+            there is no ring buffer and the values are read from the
+            dispatcher parameter table when the next method is called, which
+            is also the case if one of the parameters is a string or of a
+            type that cannot be buffered.
 
         Examples
         --------
@@ -300,39 +669,423 @@ cdef class DispatcherAccess:
         """
         if isinstance(parameters, str):
             parameters = [_.strip() for _ in parameters.split(',')]
-        return RequestPersistent(self, parameters, timeout, trigger, every)
+        return RequestPersistent(self, parameters, timeout, trigger, every,
+                                 ring_size)
+
+    def afetch(self, parameters, object trigger=0, int timeout=DEFAULT_TIMEOUT):
+        """
+        Coroutine counterpart of the fetch method, to be awaited in an asyncio
+        event loop. The arguments are those of the fetch method.
+
+        Example
+        -------
+        >>> nsample, fll = await asyncio.gather(
+        ...     client.afetch('QUBIC_Nsample'),
+        ...     client.afetch('QUBIC_FLL_State'))
+
+        """
+        from .aio import fetch
+        if isinstance(parameters, str):
+            parameters = [_.strip() for _ in parameters.split(',')]
+        return fetch(RequestOneTime(self, parameters, timeout, trigger))
+
+    def arequest(self, parameters, object trigger=None, int every=1,
+                 int timeout=DEFAULT_TIMEOUT, int ring_size=DEFAULT_RING_SIZE):
+        """
+        Send a persistent request to the dispatcher and return an asynchronous
+        iterator over its arrivals. The arguments are those of the request
+        method.
+
+        Example
+        -------
+        >>> async for timeline in client.arequest(
+        ...         'QUBIC_PixelScientificDataTimeLine_0'):
+        ...     process(timeline)
+
+        """
+        from .aio import AsyncRequest
+        if isinstance(parameters, str):
+            parameters = [_.strip() for _ in parameters.split(',')]
+        return AsyncRequest(RequestPersistent(
+            self, parameters, timeout, trigger, every, ring_size))
+
+    def acquire_timeline(self, int asic, Py_ssize_t nsamples,
+                         int timeout=DEFAULT_TIMEOUT,
+                         int ring_size=DEFAULT_RING_SIZE,
+                         bool full_output=False, dtype=None):
+        """
+        Acquire nsamples samples of the scientific data timeline of an ASIC.
+
+        See acquire_timelines, of which this method is the single-ASIC case.
+
+        Returns
+        -------
+        timeline : ndarray
+            The C-contiguous timeline, of shape (128, nsamples).
+        info : dict, if full_output is true
+            See acquire_timelines.
+
+        """
+        out = self.acquire_timelines([asic], nsamples, timeout=timeout,
+                                     ring_size=ring_size,
+                                     full_output=full_output, dtype=dtype)
+        if not full_output:
+            return out[0]
+        return out[0][0], out[1]
+
+    def acquire_timelines(self, asics, Py_ssize_t nsamples,
+                          int timeout=DEFAULT_TIMEOUT,
+                          int ring_size=DEFAULT_RING_SIZE,
+                          bool full_output=False, dtype=None):
+        """
+        Acquire nsamples samples of the scientific data timelines of several
+        ASICs, through a single persistent request.
+
+        The chunks of the parameters QUBIC_PixelScientificDataTimeLine_<asic>
+        are written one after the other into the output array as they arrive.
+        Since they come from the same request, the chunks of the different
+        ASICs are transferred together and their boundaries are aligned.
+        A chunk whose sequence number is not greater than that of the
+        previous one has already been written and is discarded as a
+        duplicate. A gap is recorded when chunks have been lost because the
+        ring buffer of the request overran, or when a chunk arrives much later
+        than expected from the median interval between arrivals. If the
+        chunks are read from the parameter table instead of the ring buffer,
+        they have no sequence number and only the late arrivals are detected.
+        A PyStudioWarning is issued if gaps or duplicates are found.
+
+        Parameters
+        ----------
+        asics : sequence of int
+            The ASIC indices, as used by QubicStudio.
+        nsamples : int
+            The number of samples per pixel.
+        timeout : int, optional
+            The timeout in ms of the wait for each chunk.
+        ring_size : int, optional
+            The number of chunks held by the ring buffer of the request.
+        full_output : bool, optional
+            If true, also return information about the acquisition.
+        dtype : dtype, optional
+            The dtype of the timelines. By default, that of the parameters.
+            Otherwise, the samples are cast as they are copied from the ring
+            buffer.
+
+        Returns
+        -------
+        timelines : ndarray
+            The C-contiguous timelines, of shape (nasic, 128, nsamples).
+        info : dict, if full_output is true
+            rate : the effective sample rate, in Hz.
+            nchunks : the number of chunks stitched together.
+            timestamps : the arrival time of each chunk.
+            gaps : the indices in the timeline of the samples following a gap.
+            nlost : the number of chunks lost by the ring buffer.
+            nduplicates : the number of duplicate chunks discarded.
+
+        Example
+        -------
+        >>> timelines = client.acquire_timelines(range(2), 100000)
+
+        """
+        cdef Parameter param
+        cdef Py_ssize_t offset = 0, count
+        cdef int nduplicates = 0
+        cdef unsigned long long nlost = 0
+        asics = [int(_) for _ in asics]
+        if len(asics) == 0:
+            raise ValueError('No ASIC is specified.')
+        if nsamples < 0:
+            raise ValueError('Invalid number of samples.')
+        if ring_size < 1:
+            raise ValueError('The timeline acquisition requires a ring buffer.')
+        parameters = ['QUBIC_PixelScientificDataTimeLine_{}'.format(_)
+                      for _ in asics]
+        table = self.parameters
+        param = table[parameters[0]]
+        shape = param.max_shape()[:-1]
+        param_dtype = _DTYPES[param.type]
+        for parameter in parameters[1:]:
+            param = table[parameter]
+            if param.max_shape()[:-1] != shape or \
+               _DTYPES[param.type] is not param_dtype:
+                raise ValueError(
+                    "The parameter '{0}' is not compatible with '{1}'.".format(
+                        parameter, parameters[0]))
+        if dtype is None:
+            dtype = param_dtype
+        timelines = np.empty((len(asics),) + shape + (nsamples,), dtype)
+        if len(asics) == 1:
+            out = timelines[0]
+        else:
+            out = tuple(timelines)
+        counts = []
+        offsets = []
+        timestamps = []
+        gaps = []
+        last = None
+        # the chunk size, upper bound of the timeline parameters, is only
+        # updated in the parameter table when it is transferred
+        self.fetch('QUBIC_PixelScientificDataTimeLineSize', timeout=timeout)
+        request = RequestPersistent(self, parameters, timeout, None, 1,
+                                    ring_size)
+        try:
+            while offset < nsamples:
+                count_ = request.next_into(out, offset)
+                if len(asics) == 1:
+                    count = count_
+                else:
+                    # keep the chunk boundaries aligned across the ASICs
+                    count = min(count_)
+                sequence = request.sequence
+                if sequence is None:
+                    timestamp = time.time()
+                else:
+                    if last is not None and sequence <= last:
+                        # the chunk is overwritten by the next one
+                        nduplicates += 1
+                        continue
+                    if last is not None and sequence != last + 1:
+                        nlost += sequence - last - 1
+                        gaps.append(offset)
+                    last = sequence
+                    timestamp = request.timestamp
+                counts.append(count)
+                offsets.append(offset)
+                timestamps.append(timestamp)
+                offset += count
+        finally:
+            request.abort()
+
+        counts = np.array(counts)
+        timestamps = np.array(timestamps)
+        if len(timestamps) > 2:
+            # the last chunk may have been truncated
+            if timestamps[-2] > timestamps[0]:
+                rate = counts[1:-1].sum() / (timestamps[-2] - timestamps[0])
+            else:
+                rate = np.nan
+            intervals = np.diff(timestamps)
+            late = np.flatnonzero(intervals > 1.5 * np.median(intervals))
+            gaps.extend(offsets[i + 1] for i in late)
+        else:
+            rate = np.nan
+        gaps = np.array(sorted(set(gaps)), int)
+        if len(gaps) > 0 or nduplicates > 0:
+            from .utils import PyStudioWarning
+            warnings.warn(
+                'Timelines of ASIC(s) {0}: {1} gap(s), {2} lost chunk(s), {3} '
+                'duplicate chunk(s).'.format(', '.join(str(_) for _ in asics),
+                                             len(gaps), nlost, nduplicates),
+                PyStudioWarning)
+        if not full_output:
+            return timelines
+        info = {'rate': rate,
+                'nchunks': len(counts),
+                'timestamps': timestamps,
+                'gaps': gaps,
+                'nlost': nlost,
+                'nduplicates': nduplicates}
+        return timelines, info
+
+    cdef int _tf_version(self) noexcept:
+        """
+        Return the TF version loaded by the dispatcher.
+
+        """
+        cdef int out
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.dispatcherTFVersionLoaded()
+            self._libraryMutex.unlock()
+        return out
+
+    cdef int _parameter_id(self, parameter) except? -1:
+        if isinstance(parameter, int):
+            return parameter
+        return self.parameters[parameter].id
+
+    cdef int _update_transfer_functions(self) except -1:
+        """
+        Reload the transfer functions and discard the cached conversions if
+        the dispatcher has loaded a new TF version since the last conversion.
+
+        """
+        cdef int version = self._tf_version()
+        if version == self._transferTFVersion:
+            return 0
+        with nogil:
+            self._pc.updateTF()
+        self._transferTables.clear()
+        self._transferTFVersion = version
+        return 0
+
+    cdef object _transfer_table(self, int parameter_id, bool signed):
+        """
+        Return the values of the transfer function of a parameter for all the
+        16-bit integers, indexed by their unsigned representation. The table
+        is computed once per parameter and per TF version, serially and
+        with the GIL, since the params computer is not thread-safe.
+
+        """
+        cdef int i
+        cdef TParamsComputer *pc = self._pc
+        cdef double[::1] table_
+        key = (parameter_id, self._transferTFVersion,
+               'int16' if signed else 'uint16')
+        table = self._transferTables.get(key)
+        if table is not None:
+            return table
+        table = np.empty(65536)
+        table_ = table
+        for i in range(65536):
+            if signed and i >= 32768:
+                table_[i] = pc.calculate(parameter_id, i - 65536)
+            else:
+                table_[i] = pc.calculate(parameter_id, i)
+        self._transferTables[key] = table
+        return table
+
+    cdef object _transfer_coefficients(self, int parameter_id, bool inverse):
+        """
+        Return the coefficients (a, b) of the transfer function of a
+        parameter (or of its inverse) if it is affine, f(x) = a x + b, and
+        None otherwise. The function is deemed affine if it matches a x + b
+        at the probe values TRANSFER_PROBES, to a relative precision of
+        1e-12. The result is computed once per parameter and per TF version.
+
+        """
+        cdef Py_ssize_t i
+        key = (parameter_id, self._transferTFVersion,
+               'inverse' if inverse else 'direct')
+        if key in self._transferTables:
+            return self._transferTables[key]
+        x = TRANSFER_PROBES
+        y = np.empty_like(x)
+        for i in range(x.size):
+            if inverse:
+                y[i] = self._pc.invCalculate(parameter_id, x[i])
+            else:
+                y[i] = self._pc.calculate(parameter_id, x[i])
+        b = y[x == 0][0]
+        a = y[x == 1][0] - b
+        affine = a * x + b
+        out = None
+        if np.all(np.isfinite(y)) and np.all(
+                abs(y - affine) <= 1e-12 * (abs(a * x) + abs(b))):
+            out = a, b
+        self._transferTables[key] = out
+        return out
 
     @cython.boundscheck(False)
+    @cython.wraparound(False)
     def convertADU2Value(self, parameter, object x not None):
-        cdef int i, parameter_id
-        cdef double[::1] x__, out_
-        if isinstance(parameter, int):
-            parameter_id = parameter
+        """
+        Convert raw values (ADU) of a parameter into physical values, using
+        the transfer function of the parameter.
+
+        The 8-bit and 16-bit integers are converted through a lookup table of
+        the transfer function. Other values are converted as float64, using
+        the coefficients of the transfer function if it is affine. The table
+        lookups and the affine conversions are done in parallel, without the
+        GIL, whereas the transfer function itself, which is not thread-safe,
+        is evaluated serially. The tables and coefficients are cached until
+        the dispatcher loads a new TF version.
+
+        Parameters
+        ----------
+        parameter : str or int
+            The parameter name or identifier.
+        x : array-like
+            The raw values.
+
+        """
+        cdef Py_ssize_t i, n
+        cdef int parameter_id = self._parameter_id(parameter)
+        cdef TParamsComputer *pc = self._pc
+        cdef double[::1] x_, out_, table
+        cdef np.uint16_t[::1] index
+        cdef double a, b
+        self._update_transfer_functions()
+        x = np.asarray(x)
+        signed = x.dtype.kind == 'i'
+        if x.dtype.kind in 'iu' and x.dtype.itemsize <= 2 and \
+           (x.size > MIN_SIZE_TRANSFER_TABLE or
+            (parameter_id, self._transferTFVersion,
+             'int16' if signed else 'uint16') in self._transferTables):
+            table = self._transfer_table(parameter_id, signed)
+            x = np.asarray(x, np.int16 if signed else np.uint16, 'C')
+            index = x.view(np.uint16).ravel()
+            out = np.empty(x.shape)
+            out_ = out.ravel()
+            n = index.shape[0]
+            with nogil:
+                for i in prange(n, schedule='static'):
+                    out_[i] = table[index[i]]
         else:
-            parameter_id = self.parameters[parameter].id
-        x = np.asarray(x, np.float64, 'C')
-        x_ = x.ravel()
-        out = np.empty_like(x)
-        out_ = out.ravel()
-        for i in range(x_.size):
-            out_[i] = self._pc.calculate(parameter_id, x_[i])
+            x = np.asarray(x, np.float64, 'C')
+            x_ = x.ravel()
+            out = np.empty_like(x)
+            out_ = out.ravel()
+            n = x_.shape[0]
+            coefficients = None
+            if n > MIN_SIZE_TRANSFER_TABLE:
+                coefficients = self._transfer_coefficients(parameter_id, False)
+            if coefficients is not None:
+                a, b = coefficients
+                with nogil:
+                    for i in prange(n, schedule='static'):
+                        out_[i] = a * x_[i] + b
+            else:
+                for i in range(n):
+                    out_[i] = pc.calculate(parameter_id, x_[i])
         if x.ndim == 0:
             return out[()]
         return out
 
     @cython.boundscheck(False)
+    @cython.wraparound(False)
     def convertValue2ADU(self, parameter, object x not None):
-        cdef int i, parameter_id
-        cdef double[::1] x__, out_
+        """
+        Convert physical values of a parameter into raw values (ADU), using
+        the inverse of the transfer function of the parameter, or its cached
+        coefficients if it is affine. The affine conversion is done in
+        parallel, without the GIL, and the inverse transfer function, which
+        is not thread-safe, is evaluated serially.
+
+        Parameters
+        ----------
+        parameter : str
+            The parameter name.
+        x : array-like
+            The physical values.
+
+        """
+        cdef Py_ssize_t i, n
+        cdef int parameter_id
+        cdef TParamsComputer *pc = self._pc
+        cdef double[::1] x_, out_
+        cdef double a, b
+        self._update_transfer_functions()
         parameter_ = self.parameters[parameter]
         parameter_id = parameter_.id
         x = np.asarray(x, np.float64, 'C')
         x_ = x.ravel()
         out = np.empty_like(x)
         out_ = out.ravel()
-        for i in range(x_.size):
-            out_[i] = self._pc.invCalculate(parameter_id, x_[i])
-        out = np.array(out, dtype=parameter_.value.dtype, copy=False)
+        n = x_.shape[0]
+        coefficients = None
+        if n > MIN_SIZE_TRANSFER_TABLE:
+            coefficients = self._transfer_coefficients(parameter_id, True)
+        if coefficients is not None:
+            a, b = coefficients
+            with nogil:
+                for i in prange(n, schedule='static'):
+                    out_[i] = a * x_[i] + b
+        else:
+            for i in range(n):
+                out_[i] = pc.invCalculate(parameter_id, x_[i])
+        out = np.asarray(out, dtype=parameter_.value.dtype)
         if x.ndim == 0:
             return out[()]
         return out
@@ -350,9 +1103,16 @@ cdef class DispatcherAccess:
                 "The command body data type is not uint8.")
         cdef char[::1] corps_ = corps
         cdef QByteArray corps__ = fromRawData(&corps_[0], corps.size)
-        cdef bool out = self._da.sendCustomCommand(asicNum, id, cn, corps__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendCustomCommand(asicNum, id, cn, corps__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicParam(self, int asicNum, int address, int value):
         """
@@ -361,9 +1121,16 @@ cdef class DispatcherAccess:
         configure l'asic (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicParam(asicNum, address, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicParam(asicNum, address, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicApol(self, int asicNum, int value):
         """
@@ -372,9 +1139,16 @@ cdef class DispatcherAccess:
         polarisation des blocs analogiques (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicApol(asicNum, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicApol(asicNum, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicSpol(self, int asicNum, int value):
         """
@@ -383,9 +1157,16 @@ cdef class DispatcherAccess:
         polarisation des squids (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicSpol(asicNum, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicSpol(asicNum, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicVicm(self, int asicNum, int value):
         """
@@ -394,9 +1175,16 @@ cdef class DispatcherAccess:
         tension de mode commun Vicm (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicVicm(asicNum, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicVicm(asicNum, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicVocm(self, int asicNum, int value):
         """
@@ -405,9 +1193,16 @@ cdef class DispatcherAccess:
         tension de mode commun Vocm (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicVocm(asicNum, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicVocm(asicNum, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicSetColumn(self, int asicNum, int startStopCol):
         """
@@ -416,9 +1211,16 @@ cdef class DispatcherAccess:
         circuit d'adressage: position initiale et finale colonne (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicSetColumn(asicNum, startStopCol)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicSetColumn(asicNum, startStopCol)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicSelStartRow(self, int asicNum, int value):
         """
@@ -427,9 +1229,16 @@ cdef class DispatcherAccess:
         circuit d'adressage: position initiale ligne (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicSelStartRow(asicNum, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicSelStartRow(asicNum, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicSelLastRow(self, int asicNum, int value):
         """
@@ -438,9 +1247,16 @@ cdef class DispatcherAccess:
         circuit d'adressage: position finale ligne (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicSelLastRow(asicNum, value)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicSelLastRow(asicNum, value)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicRazb(self, int asicNum):
         """
@@ -449,9 +1265,16 @@ cdef class DispatcherAccess:
         Envoi une pulse RAZb (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicRazb(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicRazb(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicInib(self, int asicNum):
         """
@@ -460,9 +1283,16 @@ cdef class DispatcherAccess:
         Envoi une pulse INIb (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetAsicInib(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicInib(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetDiffDAC(self, int asicNum, int diffDACValue):
         """
@@ -471,9 +1301,16 @@ cdef class DispatcherAccess:
         configure le DAC différenciel avec la valeur diffDACValue pour l'asic asicNum (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetDiffDAC(asicNum, diffDACValue)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetDiffDAC(asicNum, diffDACValue)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetFeedbackTable(self, int asicNum, feedbackTable not None):
         """
@@ -486,9 +1323,16 @@ cdef class DispatcherAccess:
         if feedbackTable_.size != 128:
             raise ValueError("Expected array size of argument 'feedbackTable' is '128'.")
         cdef qint16[::1] feedbackTable__ = feedbackTable_
-        cdef bool out = self._da.sendSetFeedbackTable(asicNum, <quint16*>&feedbackTable__[0])
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetFeedbackTable(asicNum, <quint16*>&feedbackTable__[0])
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetOffsetTable(self, int asicNum, offsetTable not None):
         """
@@ -501,9 +1345,16 @@ cdef class DispatcherAccess:
         if offsetTable_.size != 128:
             raise ValueError("Expected array size of argument 'offsetTable' is '128'.")
         cdef qint16[::1] offsetTable__ = offsetTable_
-        cdef bool out = self._da.sendSetOffsetTable(asicNum, <quint16*>&offsetTable__[0])
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetOffsetTable(asicNum, <quint16*>&offsetTable__[0])
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetMask(self, int asicNum, mask not None):
         """
@@ -516,9 +1367,16 @@ cdef class DispatcherAccess:
         if mask_.size != 125:
             raise ValueError("Expected array size of argument 'mask' is '125'.")
         cdef quint8[::1] mask__ = mask_
-        cdef bool out = self._da.sendSetMask(asicNum, &mask__[0])
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetMask(asicNum, &mask__[0])
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetSlowDAC(self, int asicNum, int slowDACValue):
         """
@@ -527,9 +1385,16 @@ cdef class DispatcherAccess:
         configure le DAC lent avec la valeur DACValue pour l'asic asicNum (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetSlowDAC(asicNum, slowDACValue)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetSlowDAC(asicNum, slowDACValue)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetNSample(self, int Nsample):
         """
@@ -538,9 +1403,16 @@ cdef class DispatcherAccess:
         configure le Nsample pour tous les ASICs
 
         """
-        cdef bool out = self._da.sendSetNSample(Nsample)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetNSample(Nsample)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStartAcq(self, int asicNum):
         """
@@ -549,9 +1421,16 @@ cdef class DispatcherAccess:
         demarrage de l'acquisition de la carte NetQuic (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendStartAcq(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStartAcq(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStopAcq(self, int asicNum):
         """
@@ -560,9 +1439,16 @@ cdef class DispatcherAccess:
         arret de l'acquisition de la carte NetQuic (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendStopAcq(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStopAcq(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendResetNetquic(self, int asicNum):
         """
@@ -571,9 +1457,16 @@ cdef class DispatcherAccess:
         reset de la carte NetQuic (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendResetNetquic(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendResetNetquic(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetCycleRawMode(self, int asicNum, int undersampling):
         """
@@ -582,9 +1475,16 @@ cdef class DispatcherAccess:
         bascule en mode raw signal cycle (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetCycleRawMode(asicNum, undersampling)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetCycleRawMode(asicNum, undersampling)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetAsicConf(self, int asicNum, int signalId, int state):
         """
@@ -593,9 +1493,16 @@ cdef class DispatcherAccess:
         configure un signal a 1 ou 0
 
         """
-        cdef bool out = self._da.sendSetAsicConf(asicNum, signalId, state)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetAsicConf(asicNum, signalId, state)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendGetStatus(self, int asicNum):
         """
@@ -604,9 +1511,16 @@ cdef class DispatcherAccess:
         demande le paquet status de la carte NetQuic (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendGetStatus(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendGetStatus(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetFreqAcqPixel(self, int asicNum, int pixelAcqFreq):
         """
@@ -615,9 +1529,16 @@ cdef class DispatcherAccess:
         change la frequence de lecture des pixels 0-200=> 0=>2kHz (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetFreqAcqPixel(asicNum, pixelAcqFreq)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetFreqAcqPixel(asicNum, pixelAcqFreq)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetFreqSerialLink(self, int asicNum, int serialFreq):
         """
@@ -626,9 +1547,16 @@ cdef class DispatcherAccess:
         change la frequence du lien serie pour les commandes ASIC 0-200=> 0=>2kHz (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetFreqSerialLink(asicNum, serialFreq)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetFreqSerialLink(asicNum, serialFreq)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetFrequency(self, int asicNum, int frequencyId, int frequency):
         """
@@ -637,9 +1565,16 @@ cdef class DispatcherAccess:
         change la frequence en fonction de frequencyId (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetFrequency(asicNum, frequencyId, frequency)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetFrequency(asicNum, frequencyId, frequency)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetCalibPolar(self, int asicNum, int mode, int shape, int frequency, int amplitude, int offset):
         """
@@ -648,9 +1583,16 @@ cdef class DispatcherAccess:
         Specifie le signal de calib a injecter sur les TES/SQUID mode:0 pas de signal, 1 envoi du signal, shape: 0 sinus, 1 triangle, 2 continu  (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetCalibPolar(asicNum, mode, shape, frequency, amplitude, offset)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetCalibPolar(asicNum, mode, shape, frequency, amplitude, offset)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
 
     def sendConfigurePID(self, int asicNum, int P, int I, int D):
@@ -660,9 +1602,16 @@ cdef class DispatcherAccess:
         configure les parametres de la regul (si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendConfigurePID(asicNum, P, I, D)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendConfigurePID(asicNum, P, I, D)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendActivatePID(self, int asicNum, int onOff):
         """
@@ -671,9 +1620,16 @@ cdef class DispatcherAccess:
         active la regulation onOff = 1, desactive la regulation onOff = 0(si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendActivatePID(asicNum, onOff)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendActivatePID(asicNum, onOff)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendResetVOffset(self, int asicNum):
         """
@@ -682,9 +1638,16 @@ cdef class DispatcherAccess:
         reset des valeurs VOffset (mise a 0) de l'asic specifie(si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendResetVOffset(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendResetVOffset(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetVOffset(self, int asicNum, int pixelNum, float voffset):
         """
@@ -693,9 +1656,16 @@ cdef class DispatcherAccess:
         configure la valeur VOffset pour le pixel (ou tous les pixels si pixelNum = 0xFF) de l'asic specifie(si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetVOffset(asicNum, pixelNum, voffset)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetVOffset(asicNum, pixelNum, voffset)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetVOffsets(self, int asicNum, voffset not None):
         """
@@ -708,9 +1678,16 @@ cdef class DispatcherAccess:
         if voffset_.size != 128:
             raise ValueError("Expected array size of argument 'voffset' is '128'.")
         cdef float[::1] voffset__ = voffset_
-        cdef bool out = self._da.sendSetVOffsets(asicNum, &voffset__[0])
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetVOffsets(asicNum, &voffset__[0])
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendResetVout2IinCoeffs(self, int asicNum):
         """
@@ -719,9 +1696,16 @@ cdef class DispatcherAccess:
         reset des valeurs Vout2Iin (mise a 1) de l'asic specifie(si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendResetVout2IinCoeffs(asicNum)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendResetVout2IinCoeffs(asicNum)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetVout2IinCoeffs(self, int asicNum, float MinMfb, float Rfb):
         """
@@ -730,9 +1714,16 @@ cdef class DispatcherAccess:
         configure la valeur Vout2Iin =  Min/Mfb* Rfb pour l'asic specifie(si asicNum = 0xFF, la commande est envoyée a tous les ASIC, si asic num < 16, la commande est envoyée a l'ASIC asicNum, pour envoyer à une liste d'ASICs utiliser les bits 8 à 23 pour specifier la liste, ex asicNum = 0x00FF00 configurera les asic 0 à 7)
 
         """
-        cdef bool out = self._da.sendSetVout2IinCoeffs(asicNum, MinMfb, Rfb)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetVout2IinCoeffs(asicNum, MinMfb, Rfb)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetVout2IinsCoeffs(self, MinMfb not None, Rfb not None):
         """
@@ -749,9 +1740,16 @@ cdef class DispatcherAccess:
         if Rfb_.size != 16:
             raise ValueError("Expected array size of argument 'Rfb' is '16'.")
         cdef float[::1] Rfb__ = Rfb_
-        cdef bool out = self._da.sendSetVout2IinsCoeffs(&MinMfb__[0], &Rfb__[0])
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetVout2IinsCoeffs(&MinMfb__[0], &Rfb__[0])
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetScientificDataTfUsed(self, int tfused):
         """
@@ -760,9 +1758,16 @@ cdef class DispatcherAccess:
         applique la fonction de transfert : 0 => signal brut, 1 => Vout, 2 => Iin
 
         """
-        cdef bool out = self._da.sendSetScientificDataTfUsed(tfused)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetScientificDataTfUsed(tfused)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStartBackup(self, str sessionName, str comment):
         """
@@ -775,9 +1780,16 @@ cdef class DispatcherAccess:
         cdef QString sessionName__ = QString(sessionName_)
         cdef QByteArray comment_ = QByteArray(comment, len(comment))
         cdef QString comment__ = QString(comment_)
-        cdef bool out = self._da.sendStartBackup(sessionName__, comment__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStartBackup(sessionName__, comment__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStopBackup(self):
         """
@@ -786,9 +1798,16 @@ cdef class DispatcherAccess:
         stop backup
 
         """
-        cdef bool out = self._da.sendStopBackup()
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStopBackup()
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStartRawBackup(self, str sessionName):
         """
@@ -799,9 +1818,16 @@ cdef class DispatcherAccess:
         """
         cdef QByteArray sessionName_ = QByteArray(sessionName, len(sessionName))
         cdef QString sessionName__ = QString(sessionName_)
-        cdef bool out = self._da.sendStartRawBackup(sessionName__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStartRawBackup(sessionName__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStopRawBackup(self):
         """
@@ -810,9 +1836,16 @@ cdef class DispatcherAccess:
         stop raw backup
 
         """
-        cdef bool out = self._da.sendStopRawBackup()
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStopRawBackup()
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStartHKBackup(self, str sessionName, str comment):
         """
@@ -825,9 +1858,16 @@ cdef class DispatcherAccess:
         cdef QString sessionName__ = QString(sessionName_)
         cdef QByteArray comment_ = QByteArray(comment, len(comment))
         cdef QString comment__ = QString(comment_)
-        cdef bool out = self._da.sendStartHKBackup(sessionName__, comment__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStartHKBackup(sessionName__, comment__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendStopHKBackup(self):
         """
@@ -836,9 +1876,16 @@ cdef class DispatcherAccess:
         stop HK backup
 
         """
-        cdef bool out = self._da.sendStopHKBackup()
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendStopHKBackup()
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetBackupDir(self, str directory):
         """
@@ -849,9 +1896,16 @@ cdef class DispatcherAccess:
         """
         cdef QByteArray directory_ = QByteArray(directory, len(directory))
         cdef QString directory__ = QString(directory_)
-        cdef bool out = self._da.sendSetBackupDir(directory__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetBackupDir(directory__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendResetSubsystem(self, int subsystemId):
         """
@@ -860,9 +1914,16 @@ cdef class DispatcherAccess:
         reset the subsystem
 
         """
-        cdef bool out = self._da.sendResetSubsystem(subsystemId)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendResetSubsystem(subsystemId)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendResetDecommutationFlags(self, int subsytemId):
         """
@@ -871,9 +1932,16 @@ cdef class DispatcherAccess:
         reset the decommutation flags for the subsytem, if subsytemId = 0xFF reset all subsystems flags (DISP_DecommuteLastErrorCode, DISP_Decommute...)
 
         """
-        cdef bool out = self._da.sendResetDecommutationFlags(subsytemId)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendResetDecommutationFlags(subsytemId)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendAddToLogbook(self, str key, str comment):
         """
@@ -886,9 +1954,16 @@ cdef class DispatcherAccess:
         cdef QString key__ = QString(key_)
         cdef QByteArray comment_ = QByteArray(comment, len(comment))
         cdef QString comment__ = QString(comment_)
-        cdef bool out = self._da.sendAddToLogbook(key__, comment__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendAddToLogbook(key__, comment__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetLogBookFilename(self, str filename):
         """
@@ -899,9 +1974,16 @@ cdef class DispatcherAccess:
         """
         cdef QByteArray filename_ = QByteArray(filename, len(filename))
         cdef QString filename__ = QString(filename_)
-        cdef bool out = self._da.sendSetLogBookFilename(filename__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetLogBookFilename(filename__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
 
     def sendSetLogBookBaseDirectory(self, str directory):
         """
@@ -912,6 +1994,13 @@ cdef class DispatcherAccess:
         """
         cdef QByteArray directory_ = QByteArray(directory, len(directory))
         cdef QString directory__ = QString(directory_)
-        cdef bool out = self._da.sendSetLogBookBaseDirectory(directory__)
+        cdef bool out
+        cdef string error
+        with nogil:
+            self._libraryMutex.lock()
+            out = self._da.sendSetLogBookBaseDirectory(directory__)
+            if not out:
+                error = self._da.lastError().toStdString()
+            self._libraryMutex.unlock()
         if not out:
-            raise RuntimeError(self.lastError)
+            raise RuntimeError(error.decode('UTF-8'))
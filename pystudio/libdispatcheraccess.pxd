@@ -23,7 +23,7 @@ cdef extern from "tparamscomputer.h":
         TAbstractParamsComputer() except +
         double calculate(int, double) nogil
         double invCalculate(int, double) nogil
-        void updateTF()
+        void updateTF() nogil
         int fileVersion()
         QString unit(int)
         QString rawUnit(int)
@@ -41,93 +41,93 @@ cdef extern from "tdispatcheraccess.h":
         TDispatcherAccess(QString, int) except +
         TParametersTable* parameters() # Strictly: TAbstractParametersTable
         bool isConnected()
-        QString lastError()
-        QString state()
-        void configure(QString, int)
-        void resizeTMBuffer(quint16)
-        void setWaitingForAckMode(bool)
+        QString lastError() nogil
+        QString state() nogil
+        void configure(QString, int) nogil
+        void resizeTMBuffer(quint16) nogil
+        void setWaitingForAckMode(bool) nogil
         bool waitingForAckMode()
-        void setWaitingForAckTimeOut(int)
+        void setWaitingForAckTimeOut(int) nogil
         int waitingForAckTimeOut()
         void setSubSystemsCommandsLocked(bool)
         bool subSystemsCommandsLocked()
         void setFullCommandsLocked(bool)
         bool fullCommandsLocked()
         void setAutoUpdateWithRequest(bool)
-        bool startSubsystemAccess()
-        bool stopSubsystemAccess()
-        bool stopDispatcher(quint32)
+        bool startSubsystemAccess() nogil
+        bool stopSubsystemAccess() nogil
+        bool stopDispatcher(quint32) nogil
         void setDebug()
-        void waitMs(qint64)
-        bool disableOneRequestedParameters(quint8)
-        bool disableAllRequestedParameters()
-        int requestSynchroParameters(QList[quint32], quint32, quint16, bool*)
-        int requestTimeoutParameters(QList[quint32], quint16, bool*)
-        int requestOneTimeSynchroParameters(QList[quint32], quint32, bool*)
-        int requestOneTimeTimeoutParameters(QList[quint32], quint16, bool*)
+        void waitMs(qint64) nogil
+        bool disableOneRequestedParameters(quint8) nogil
+        bool disableAllRequestedParameters() nogil
+        int requestSynchroParameters(QList[quint32], quint32, quint16, bool*) nogil
+        int requestTimeoutParameters(QList[quint32], quint16, bool*) nogil
+        int requestOneTimeSynchroParameters(QList[quint32], quint32, bool*) nogil
+        int requestOneTimeTimeoutParameters(QList[quint32], quint16, bool*) nogil
         void requestArrived(int)
-        bool sendReloadTF()
-        int dispatcherTFVersionLoaded()
-        void run()
-        void start()
+        bool sendReloadTF() nogil
+        int dispatcherTFVersionLoaded() nogil
+        void run() nogil
+        void start() nogil
         QString dispatcherAddress()
         int dispatcherPort()
-        int stackSize()
+        int stackSize() nogil
         int stackOccupation()
         double requestRate()
         double dataRate()
         quint32 nbOverlap()
-        bool sendCustomCommand(quint32, quint8, quint8, QByteArray)
-        bool sendSetAsicParam(quint32, quint8, quint8)
-        bool sendSetAsicApol(quint32, quint8)
-        bool sendSetAsicSpol(quint32, quint8)
-        bool sendSetAsicVicm(quint32, quint8)
-        bool sendSetAsicVocm(quint32, quint8)
-        bool sendSetAsicSetColumn(quint32, quint8)
-        bool sendSetAsicSelStartRow(quint32, quint8)
-        bool sendSetAsicSelLastRow(quint32, quint8)
-        bool sendSetAsicRazb(quint32)
-        bool sendSetAsicInib(quint32)
-        bool sendSetDiffDAC(quint32, quint16)
-        bool sendSetFeedbackTable(quint32, quint16*)
-        bool sendSetOffsetTable(quint32, quint16*)
-        bool sendSetMask(quint32, quint8*)
-        bool sendSetSlowDAC(quint32, quint16)
-        bool sendSetNSample(quint16)
-        bool sendStartAcq(quint32)
-        bool sendStopAcq(quint32)
-        bool sendSetAcqScienceMode(quint32)
-        bool sendSetAcqTestPatternMode(quint32, quint16)
-        bool sendResetNetquic(quint32)
-        bool sendSetCycleRawMode(quint32, quint16)
-        bool sendSetRawModeList(quint32, quint8*)
-        bool sendSetAsicConf(quint32, quint8, quint8)
-        bool sendGetStatus(quint32)
-        bool sendSetFreqAcqPixel(quint32, quint8)
-        bool sendSetFreqSerialLink(quint32, quint8)
-        bool sendSetFrequency(quint32, quint8, quint8)
-        bool sendSetCalibPolar(quint32, quint8, quint8, quint8, quint16, quint16)
-        bool sendConfigurePID(quint32, quint16, quint16, quint16)
-        bool sendActivatePID(quint32, quint16)
-        bool sendResetVOffset(quint32)
-        bool sendSetVOffset(quint32, quint8, float)
-        bool sendSetVOffsets(quint32, float*)
-        bool sendResetVout2IinCoeffs(quint32)
-        bool sendSetVout2IinCoeffs(quint32, float, float)
-        bool sendSetVout2IinsCoeffs(float*, float*)
-        bool sendSetScientificDataTfUsed(quint8)
-        bool sendStartBackup(QString, QString)
-        bool sendStopBackup()
-        bool sendStartRawBackup(QString)
-        bool sendStopRawBackup()
-        bool sendStartHKBackup(QString, QString)
-        bool sendStopHKBackup()
-        bool sendSetBackupDir(QString)
-        bool sendResetSubsystem(quint8)
-        bool sendResetDecommutationFlags(quint8)
-        bool sendAddToLogbook(QString, QString)
-        bool sendSetLogBookFilename(QString)
-        bool sendSetLogBookBaseDirectory(QString)
+        bool sendCustomCommand(quint32, quint8, quint8, QByteArray) nogil
+        bool sendSetAsicParam(quint32, quint8, quint8) nogil
+        bool sendSetAsicApol(quint32, quint8) nogil
+        bool sendSetAsicSpol(quint32, quint8) nogil
+        bool sendSetAsicVicm(quint32, quint8) nogil
+        bool sendSetAsicVocm(quint32, quint8) nogil
+        bool sendSetAsicSetColumn(quint32, quint8) nogil
+        bool sendSetAsicSelStartRow(quint32, quint8) nogil
+        bool sendSetAsicSelLastRow(quint32, quint8) nogil
+        bool sendSetAsicRazb(quint32) nogil
+        bool sendSetAsicInib(quint32) nogil
+        bool sendSetDiffDAC(quint32, quint16) nogil
+        bool sendSetFeedbackTable(quint32, quint16*) nogil
+        bool sendSetOffsetTable(quint32, quint16*) nogil
+        bool sendSetMask(quint32, quint8*) nogil
+        bool sendSetSlowDAC(quint32, quint16) nogil
+        bool sendSetNSample(quint16) nogil
+        bool sendStartAcq(quint32) nogil
+        bool sendStopAcq(quint32) nogil
+        bool sendSetAcqScienceMode(quint32) nogil
+        bool sendSetAcqTestPatternMode(quint32, quint16) nogil
+        bool sendResetNetquic(quint32) nogil
+        bool sendSetCycleRawMode(quint32, quint16) nogil
+        bool sendSetRawModeList(quint32, quint8*) nogil
+        bool sendSetAsicConf(quint32, quint8, quint8) nogil
+        bool sendGetStatus(quint32) nogil
+        bool sendSetFreqAcqPixel(quint32, quint8) nogil
+        bool sendSetFreqSerialLink(quint32, quint8) nogil
+        bool sendSetFrequency(quint32, quint8, quint8) nogil
+        bool sendSetCalibPolar(quint32, quint8, quint8, quint8, quint16, quint16) nogil
+        bool sendConfigurePID(quint32, quint16, quint16, quint16) nogil
+        bool sendActivatePID(quint32, quint16) nogil
+        bool sendResetVOffset(quint32) nogil
+        bool sendSetVOffset(quint32, quint8, float) nogil
+        bool sendSetVOffsets(quint32, float*) nogil
+        bool sendResetVout2IinCoeffs(quint32) nogil
+        bool sendSetVout2IinCoeffs(quint32, float, float) nogil
+        bool sendSetVout2IinsCoeffs(float*, float*) nogil
+        bool sendSetScientificDataTfUsed(quint8) nogil
+        bool sendStartBackup(QString, QString) nogil
+        bool sendStopBackup() nogil
+        bool sendStartRawBackup(QString) nogil
+        bool sendStopRawBackup() nogil
+        bool sendStartHKBackup(QString, QString) nogil
+        bool sendStopHKBackup() nogil
+        bool sendSetBackupDir(QString) nogil
+        bool sendResetSubsystem(quint8) nogil
+        bool sendResetDecommutationFlags(quint8) nogil
+        bool sendAddToLogbook(QString, QString) nogil
+        bool sendSetLogBookFilename(QString) nogil
+        bool sendSetLogBookBaseDirectory(QString) nogil
 
 
 cdef extern from "tvirtualcommandencode.h":
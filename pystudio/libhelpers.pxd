@@ -1,7 +1,19 @@
+from libcpp cimport bool
 from libdispatcheraccess cimport TDispatcherAccess
+from libqt cimport QString, quint16
 
 ctypedef void (*slot_request)(int)
+ctypedef void (*slot_client_request)(int, int)
+ctypedef void (*release_client)(int) noexcept nogil
 
 cdef extern from "helpers.h":
     void connect_request(TDispatcherAccess*, slot_request)
- 
+    void connect_request(TDispatcherAccess*, slot_client_request, int)
+    bool start_event_loop() nogil
+    void stop_event_loop() nogil
+    TDispatcherAccess* new_dispatcher_access(const QString*, int) except + nogil
+    void delete_dispatcher_access(TDispatcherAccess*, release_client, int)
+    void resize_tm_buffer(TDispatcherAccess*, quint16) nogil
+    bool is_event_loop_thread() nogil
+    void wait_for_events(int) nogil
+    void wake_event_loop() nogil
@@ -1,3 +1,4 @@
+from libcpp cimport bool
 from libcpp.string cimport string
 
 cdef extern from "<QtCore>":
@@ -35,9 +36,20 @@ cdef extern from "<QList>" nogil:
         T first()
         T last()
 
+cdef extern from "<QElapsedTimer>" nogil:
+    cdef cppclass QElapsedTimer:
+        QElapsedTimer() except +
+        void start()
+        qint64 elapsed()
+
 cdef extern from "<QMutex>" nogil:
+    ctypedef enum RecursionMode "QMutex::RecursionMode":
+        Recursive "QMutex::Recursive"
     cdef cppclass QMutex:
         QMutex() except +
+        QMutex(RecursionMode) except +
+        void lock()
+        void unlock()
     cdef cppclass QMutexLocker:
         QMutexLocker(QMutex*) except +
 
@@ -46,3 +58,9 @@ cdef extern from "<QString>" nogil:
         QString() except +
         QString(QByteArray) except +
         string toStdString()
+
+cdef extern from "<QWaitCondition>" nogil:
+    cdef cppclass QWaitCondition:
+        QWaitCondition() except +
+        bool wait(QMutex*, unsigned long)
+        void wakeAll()
@@ -0,0 +1,12 @@
+from libcpp cimport bool
+from libdispatcheraccess cimport TDispatcherAccess
+from libqt cimport quint32
+
+cdef extern from "simulator.h":
+    void simulator_configure(TDispatcherAccess*, const char*) except + nogil
+    void simulator_set_time(TDispatcherAccess*, double) nogil
+    double simulator_time(TDispatcherAccess*) nogil
+    bool simulator_write(TDispatcherAccess*, quint32, const void*,
+                         quint32) nogil
+    void simulator_acquire(TDispatcherAccess*, const quint32*, int) nogil
+    int simulator_nbrequests(TDispatcherAccess*) nogil
@@ -0,0 +1,321 @@
+"""
+Sampling of the dispatcher health metrics.
+
+The HealthSampler periodically records, in a ring buffer of samples, the
+state of the telemetry (TM) buffer of the dispatcher access library
+(stackSize, stackOccupation, nbOverlap), its request and data rates, and the
+values of some dispatcher parameters DISP_*. While the sampler is running,
+it is attached to the client and the latencies of all its requests are
+accumulated in histograms: 'fetch' for the round trip of the one-time
+requests (fetch, acquire...) and 'next' for the waits of the persistent
+requests (next, next_into). The histograms can also be fed by the user
+through the methods observe and timer. Each sample is exported to a local
+file, either appended as a JSON line or in the Prometheus text format, which
+the textfile collector of the node exporter can read.
+
+Example
+-------
+>>> sampler = HealthSampler(client, period=10, output='pystudio.prom')
+>>> sampler.start()
+>>> with sampler.timer('acquire_timeline'):
+...     timeline = client.acquire_timeline(0, 100000)
+>>> sampler.stop()
+>>> [_['stackOccupation'] for _ in sampler.samples if _['saturated']]
+
+"""
+from __future__ import division
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+import json
+import numbers
+import os
+import re
+import threading
+import time
+import warnings
+import numpy as np
+from .utils import PyStudioWarning
+
+__all__ = ['HealthSampler', 'LatencyHistogram']
+
+CLIENT_METRICS = ('stackSize', 'stackOccupation', 'requestRate', 'dataRate',
+                  'nbOverlap')
+DISPATCHER_PARAMETERS = ('DISP_SubsystemsRate',
+                         'DISP_SubsystemsDataTransfered',
+                         'DISP_NbClientsConnected')
+# upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10)
+
+
+class LatencyHistogram(object):
+    """
+    Histogram of durations in seconds. The last bin counts the durations
+    greater than the last bucket bound.
+
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+class HealthSampler(object):
+    """
+    Background sampler of the dispatcher health metrics.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    period : float, optional
+        The sampling period in seconds.
+    size : int, optional
+        The number of samples kept in the ring buffer. The default keeps
+        12 hours of samples at the default period.
+    parameters : sequence of str, optional
+        The dispatcher parameters fetched at each sample.
+    output : str, optional
+        The file to which the samples are exported.
+    format : 'prometheus' or 'jsonl', optional
+        With 'prometheus', the file is replaced at each sample by the
+        current values. With 'jsonl', each sample is appended as a line.
+    saturation : float, optional
+        The fraction of the TM buffer above which it is considered saturated.
+        A PyStudioWarning is issued when the buffer becomes saturated.
+    timeout : int, optional
+        The timeout in ms of the requests of the dispatcher parameters.
+
+    Attributes
+    ----------
+    samples : list of dict
+        The samples in the ring buffer, oldest first. Besides the client
+        metrics and the dispatcher parameters, a sample has the keys 'time',
+        'saturated' and 'latencies', a snapshot of the latency histograms.
+    nsaturations : int
+        The number of samples for which the TM buffer was saturated.
+    nerrors : int
+        The number of failed requests of the dispatcher parameters.
+
+    """
+    def __init__(self, client, period=5., size=8640,
+                 parameters=DISPATCHER_PARAMETERS, output=None,
+                 format='prometheus', saturation=0.9, timeout=None):
+        if format not in ('prometheus', 'jsonl'):
+            raise ValueError("Invalid format: '{0}'.".format(format))
+        self.client = client
+        self.period = period
+        self.parameters = list(parameters)
+        self.output = output
+        self.format = format
+        self.saturation = saturation
+        self.timeout = timeout
+        self.nsaturations = 0
+        self.nerrors = 0
+        self._samples = deque(maxlen=size)
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start the sampling thread and attach the sampler to the client, so
+        that the latencies of its requests are recorded.
+
+        """
+        if self.running:
+            return
+        if self.client.health_sampler is not None:
+            raise RuntimeError('A health sampler is already running for the '
+                               'client.')
+        self.client.health_sampler = self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='pystudio health sampler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the sampling thread, after the completion of the current sample,
+        and detach the sampler from the client.
+
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.client.health_sampler is self:
+            self.client.health_sampler = None
+
+    def observe(self, name, seconds):
+        """
+        Add a duration in seconds to the latency histogram of a request.
+
+        """
+        with self._lock:
+            histogram = self._latencies.get(name)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                self._latencies[name] = histogram
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Context manager adding the duration of its block to the latency
+        histogram of a request. Failed requests are not counted.
+
+        """
+        start = time.time()
+        yield
+        self.observe(name, time.time() - start)
+
+    def latency(self, name):
+        """
+        Return the latency histogram of a request, as a dict.
+
+        """
+        with self._lock:
+            return self._latencies[name].as_dict()
+
+    def sample(self):
+        """
+        Record and export a sample of the health metrics, and return it.
+
+        """
+        out = {'time': time.time()}
+        for name in CLIENT_METRICS:
+            out[name] = getattr(self.client, name)
+        out.update(self._fetch())
+        size = out['stackSize']
+        out['saturated'] = size > 0 and \
+            out['stackOccupation'] >= self.saturation * size
+        with self._lock:
+            previous = self._samples[-1] if len(self._samples) > 0 else None
+            out['latencies'] = dict((k, v.as_dict())
+                                    for k, v in self._latencies.items())
+            self._samples.append(out)
+            if out['saturated']:
+                self.nsaturations += 1
+        if out['saturated'] and (previous is None or
+                                 not previous['saturated']):
+            warnings.warn(
+                'The TM buffer is saturated: {0} / {1}, {2} overlap(s).'.
+                format(out['stackOccupation'], size, out['nbOverlap']),
+                PyStudioWarning)
+        if self.output is not None:
+            self._export(out)
+        return out
+
+    def _fetch(self):
+        # fetch the dispatcher parameters. The request is timed by the
+        # client if the sampler is attached to it.
+        out = dict.fromkeys(self.parameters)
+        if len(self.parameters) == 0:
+            return out
+        kwargs = {} if self.timeout is None else {'timeout': self.timeout}
+        start = time.time()
+        try:
+            values = self.client.fetch(self.parameters, **kwargs)
+        except Exception:
+            self.nerrors += 1
+            return out
+        if self.client.health_sampler is not self:
+            self.observe('fetch', time.time() - start)
+        if len(self.parameters) == 1:
+            values = (values,)
+        for name, value in zip(self.parameters, values):
+            out[name] = np.asarray(value).tolist()
+        return out
+
+    def _run(self):
+        while not self._stopped.is_set():
+            start = time.time()
+            try:
+                self.sample()
+            except Exception as exc:
+                warnings.warn('Health sampling failed: {0}'.format(exc),
+                              PyStudioWarning)
+            self._stopped.wait(max(0, self.period - (time.time() - start)))
+
+    def _export(self, sample):
+        if self.format == 'jsonl':
+            with open(self.output, 'a') as f:
+                f.write(json.dumps(sample, sort_keys=True) + '\n')
+            return
+        # the file is replaced atomically, so that it is never read partially
+        tmp = self.output + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(prometheus(sample))
+        os.rename(tmp, self.output)
+
+
+def prometheus(sample):
+    """
+    Return a sample of the health metrics in the Prometheus text format.
+    The elements of the array parameters are labelled by their index.
+
+    """
+    lines = []
+    for name in sorted(sample):
+        if name in ('time', 'latencies'):
+            continue
+        value = sample[name]
+        metric = 'pystudio_' + _snake(name)
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, list):
+            values = [('{{index="{0}"}}'.format(i), v)
+                      for i, v in enumerate(np.ravel(value).tolist())]
+        else:
+            values = [('', value)]
+        values = [_ for _ in values if isinstance(_[1], numbers.Real)]
+        if len(values) == 0:
+            continue
+        lines.append('# TYPE {0} gauge'.format(metric))
+        for labels, v in values:
+            lines.append('{0}{1} {2!r}'.format(metric, labels, v))
+    metric = 'pystudio_request_latency_seconds'
+    if len(sample['latencies']) > 0:
+        lines.append('# TYPE {0} histogram'.format(metric))
+    for name in sorted(sample['latencies']):
+        histogram = sample['latencies'][name]
+        cumulative = np.cumsum(histogram['counts']).tolist()
+        bounds = [repr(float(_)) for _ in histogram['buckets']] + ['+Inf']
+        for bound, count in zip(bounds, cumulative):
+            lines.append('{0}_bucket{{request="{1}",le="{2}"}} {3}'.format(
+                metric, name, bound, count))
+        lines.append('{0}_sum{{request="{1}"}} {2!r}'.format(
+            metric, name, histogram['sum']))
+        lines.append('{0}_count{{request="{1}"}} {2}'.format(
+            metric, name, histogram['count']))
+    return '\n'.join(lines) + '\n'
+
+
+def _snake(name):
+    # DISP_NbClientsConnected -> disp_nb_clients_connected
+    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', name).lower()
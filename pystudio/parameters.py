@@ -1,11 +1,22 @@
 from __future__ import print_function
 from collections import namedtuple
 import csv
+import hashlib
+import io
 import itertools
+import pickle
 import re
 import os
+import sys
 
 FILENAME = os.path.join(os.path.dirname(__file__), 'data', 'parameters.csv')
+FILENAME_DISPATCHER = os.path.join(os.path.dirname(__file__), 'data',
+                                   'parameters_dispatcher.txt')
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME',
+                   os.path.join(os.path.expanduser('~'), '.cache')),
+    'pystudio')
+SCHEMA_VERSION = 2
 
 TYPE_CODE = {
     'uint8': 0x00,
@@ -51,7 +62,7 @@ def read_params(filename=FILENAME):
     """
     out = []
     nskip = 3
-    with open(filename) as f:
+    with io.open(filename, encoding='latin-1') as f:
         reader = csv.reader(f, delimiter=';', quotechar='|')
         for _ in range(nskip):
             next(reader)
@@ -85,9 +96,7 @@ def read_params(filename=FILENAME):
                 name, description, ptype, shape, ubound, use_tf)
             out.append(entry)
 
-    filename_dispatcher = os.path.join(os.path.dirname(__file__), 'data',
-                                       'parameters_dispatcher.txt')
-    with open(filename_dispatcher) as f:
+    with open(FILENAME_DISPATCHER) as f:
         for line in f:
             name, ptype, description = line.split(' ; ')
             entry = ParameterEntry(
@@ -120,3 +129,98 @@ def read_all_params(filename=FILENAME):
                     param.use_tf)
                 out.append(entry)
     return out
+
+
+def build_schema(filename=FILENAME):
+    """
+    Return the list of the parameters of the table built by get_parameters,
+    in the same order, as plain tuples
+        (name, type, shape, ubound, index, use_tf, meta)
+    where index is the index of the parameter in the dispatcher parameter
+    table, use_tf is True for the TF counterpart of a parameter and meta is
+    True for the META parameters described below.
+
+    """
+    rparams = read_all_params(filename)
+    out = []
+    for i, rparam in enumerate(rparams):
+        out.append((rparam.name, rparam.type, rparam.shape, rparam.ubound, i,
+                    False, False))
+        if rparam.use_tf:
+            out.append((rparam.name + '_TF', 0x27, rparam.shape,
+                        rparam.ubound, i, True, False))
+
+    # As of 28/09/2015, parameter access to 3-dimensional arrays through
+    # the Dispatcher Client is limited to either the whole array or each of
+    # the last dimension. We provide a transparent access to the last two
+    # dimensions by adding new parameters with the flag META.
+    # Example: 'QUBIC_WorkingRawData' accesses the whole array and
+    # 'QUBIC_WorkingRawData_0_0' accesses the timeline of the first TES
+    # of the first ASIC. Here we add 'QUBIC_WorkingRawData_0' to access
+    # the timelines of all the TES of the first ASIC.
+    for i, rparam in enumerate(rparams):
+        shape = rparam.shape
+        if len(shape) < 3:
+            continue
+        if rparam.use_tf:
+            import warnings
+            warnings.warn('Code should be updated to make meta-parameters han'
+                          'dle TF parameters.')
+            continue
+        for j in range(shape[0]):
+            out.append(('{0}_{1}'.format(rparam.name, j), rparam.type,
+                        shape[1:], rparam.ubound, i + j * shape[1] + 1, False,
+                        True))
+    return out
+
+
+def read_schema(filename=FILENAME, cache=True):
+    """
+    Return the parameter schema returned by build_schema.
+
+    The schema is cached in a binary file of the directory CACHE_DIR, whose
+    name depends on the hash of the source files, so that the source files
+    are only parsed after they have been modified. The file also stores the
+    format version and this hash, which are checked before the cached schema
+    is used. If the cache cannot be written, the schema is built without
+    error.
+
+    """
+    if not cache:
+        return build_schema(filename)
+    path, digest = _schema_cache_path(filename)
+    try:
+        with open(path, 'rb') as f:
+            version, digest_, schema = pickle.loads(f.read())
+        if version == SCHEMA_VERSION and digest_ == digest:
+            return schema
+    except Exception:
+        pass
+    schema = build_schema(filename)
+    tmp = '{0}.{1}'.format(path, os.getpid())
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        with open(tmp, 'wb') as f:
+            f.write(pickle.dumps((SCHEMA_VERSION, digest, schema),
+                                 pickle.HIGHEST_PROTOCOL))
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        pass
+    finally:
+        if os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+    return schema
+
+
+def _schema_cache_path(filename):
+    h = hashlib.sha1()
+    h.update('{0} {1}'.format(SCHEMA_VERSION, sys.version_info[0]).encode())
+    for source in (filename, FILENAME_DISPATCHER):
+        with open(source, 'rb') as f:
+            h.update(f.read())
+    digest = h.hexdigest()
+    return os.path.join(CACHE_DIR, 'schema-{0}.pickle'.format(digest)), digest
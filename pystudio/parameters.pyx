@@ -3,7 +3,7 @@ from libcpp cimport bool
 from libcpp.string cimport string
 from libdispatcheraccess cimport TParametersTable
 from libqt cimport quint8, quint16, quint32
-from .parameters import read_all_params, ParameterEntry
+from .parameters import read_schema
 
 
 cdef class DispatcherAccess
@@ -15,6 +15,13 @@ class ParameterTable(object):
 
     Except for the QString case, the parameter value is a view of
     the parameter member of TParametersTable class (i.e.: there is not copy).
+    The view is cached by the parameter and it is only rebuilt when the
+    upper bound of the parameter changes. Each access returns a new array
+    on the cached view, so that the changes of its shape or flags by a
+    caller are not seen by the others.
+
+    The parameters are indexed by name and by identifier. If several
+    parameters share the same identifier, the first one is returned.
 
     """
     #cdef object _params
@@ -23,19 +30,28 @@ class ParameterTable(object):
     
     def __init__(self, params):
         self._params = params
+        self._names = {}
+        self._ids = {}
         for param in params:
             setattr(self, param.name, param)
+            self._names[param.name] = param
+            self._ids.setdefault(param.id, param)
 
     def __getitem__(self, value):
         if isinstance(value, str):
-            if not hasattr(self, value):
+            try:
+                return self._names[value]
+            except KeyError:
                 raise ValueError("Invalid parameter name: '{}'.".format(value))
-            return getattr(self, value)
-        value = int(value)
-        for param in self._params:
-            if param.id == value:
-                return param
-        raise ValueError("Invalid parameter value: '{}'.".format(value))
+        try:
+            return self._ids[int(value)]
+        except KeyError:
+            raise ValueError("Invalid parameter value: '{}'.".format(value))
+
+    def __contains__(self, value):
+        if isinstance(value, str):
+            return value in self._names
+        return int(value) in self._ids
 
     def __len__(self):
         return len(self._params)
@@ -52,6 +68,8 @@ cdef class Parameter:
     cdef public int type
     cdef int ubound
     cdef int s1
+    cdef object _value
+    cdef int _value_bound
 
     def __cinit__(self, str name, int id, int ubound, int s1, *args):
         if s1 < 0:
@@ -60,6 +78,7 @@ cdef class Parameter:
         self.id = id
         self.ubound = ubound
         self.s1 = s1
+        self._value_bound = -1
 
     def __str__(self):
         out = '<{0} {1}'.format(type(self).__name__, self.name, self.value)
@@ -79,6 +98,25 @@ cdef class Parameter:
                 return ()
             return (self.get_bound(),)
 
+    property maxshape:
+        """ Shape of the parameter when its upper bound is maximal. """
+        def __get__(self):
+            return self.max_shape()
+
+    property value:
+        def __get__(self):
+            # the view is only rebuilt when the upper bound has changed
+            cdef int bound = self.get_bound()
+            if bound != self._value_bound:
+                self._value = self._view(bound)
+                self._value_bound = bound
+            return self._value.view()
+
+    cdef object _view(self, int bound):
+        """ Array view of the parameter value, for a given upper bound. """
+        raise TypeError("The value of parameter '{}' is not handled.".format(
+            self.name))
+
     cdef int get_bound(self):
         cdef int bound
         if self.ubound == -1:
@@ -91,6 +129,16 @@ cdef class Parameter:
             raise ValueError("Invalid bound type: '{}'.".format(self.ubound))
         return max(0, min(self.s1, bound))
 
+    cdef tuple max_shape(self):
+        """ Shape of the parameter when its upper bound is maximal. """
+        if self.s1 == 0:
+            return ()
+        return (self.s1,)
+
+    cdef int nouter(self):
+        """ Number of elements in the dimensions other than the last one. """
+        return 1
+
 
 cdef class Parameter2d(Parameter):
     cdef int s2
@@ -100,6 +148,12 @@ cdef class Parameter2d(Parameter):
         def __get__(self):
             return (self.s2, self.get_bound())
 
+    cdef tuple max_shape(self):
+        return (self.s2, self.s1)
+
+    cdef int nouter(self):
+        return self.s2
+
 
 cdef class Parameter3d(Parameter2d):
     cdef int s3
@@ -109,135 +163,121 @@ cdef class Parameter3d(Parameter2d):
         def __get__(self):
             return (self.s3, self.s2, self.get_bound())
 
+    cdef tuple max_shape(self):
+        return (self.s3, self.s2, self.s1)
+
+    cdef int nouter(self):
+        return self.s3 * self.s2
+
 
 cdef class ParameterUInt8(Parameter):
     def __cinit__(self, *args):
         self.type = 0x00
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.uint8_t[::1] view = <np.uint8_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.uint8_t[::1] view = <np.uint8_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterUInt16(Parameter):
     def __cinit__(self, *args):
         self.type = 0x01
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.uint16_t[::1] view = <np.uint16_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.uint16_t[::1] view = <np.uint16_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterUInt32(Parameter):
     def __cinit__(self, *args):
         self.type = 0x03
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.uint32_t[::1] view = <np.uint32_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.uint32_t[::1] view = <np.uint32_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterUInt64(Parameter):
     def __cinit__(self, *args):
         self.type = 0x07
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.uint64_t[::1] view = <np.uint64_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.uint64_t[::1] view = <np.uint64_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterInt8(Parameter):
     def __cinit__(self, *args):
         self.type = 0x08
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.int8_t[::1] view = <np.int8_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.int8_t[::1] view = <np.int8_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterInt16(Parameter):
     def __cinit__(self, *args):
         self.type = 0x09
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.int16_t[::1] view = <np.int16_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.int16_t[::1] view = <np.int16_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterInt32(Parameter):
     def __cinit__(self, *args):
         self.type = 0x0B
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.int32_t[::1] view = <np.int32_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.int32_t[::1] view = <np.int32_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterInt64(Parameter):
     def __cinit__(self, *args):
         self.type = 0x0F
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.int64_t[::1] view = <np.int64_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.int64_t[::1] view = <np.int64_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterFloat32(Parameter):
     def __cinit__(self, *args):
         self.type = 0x13
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.float32_t[::1] view = <np.float32_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.float32_t[::1] view = <np.float32_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterFloat64(Parameter):
     def __cinit__(self, *args):
         self.type = 0x27
-    property value:
-        def __get__(self):
-            cdef int bound = self.get_bound()
-            cdef np.float64_t[::1] view = <np.float64_t[:bound]> self._ptr
-            out = np.asarray(view)
-            if self.s1 == 0:
-                out.shape = ()
-            return out
+    cdef object _view(self, int bound):
+        cdef np.float64_t[::1] view = <np.float64_t[:bound]> self._ptr
+        out = np.asarray(view)
+        if self.s1 == 0:
+            out.shape = ()
+        return out
 
 
 cdef class ParameterString(Parameter):
@@ -253,241 +293,221 @@ cdef class ParameterString(Parameter):
 cdef class Parameter2dUInt8(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x00
-    property value:
-        def __get__(self):
-            cdef np.uint8_t[:, ::1] view = <np.uint8_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint8_t[:, ::1] view = <np.uint8_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dUInt16(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x01
-    property value:
-        def __get__(self):
-            cdef np.uint16_t[:, ::1] view = <np.uint16_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint16_t[:, ::1] view = <np.uint16_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dUInt32(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x03
-    property value:
-        def __get__(self):
-            cdef np.uint32_t[:, ::1] view = <np.uint32_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint32_t[:, ::1] view = <np.uint32_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dUInt64(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x07
-    property value:
-        def __get__(self):
-            cdef np.uint64_t[:, ::1] view = <np.uint64_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint64_t[:, ::1] view = <np.uint64_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dInt8(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x08
-    property value:
-        def __get__(self):
-            cdef np.int8_t[:, ::1] view = <np.int8_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int8_t[:, ::1] view = <np.int8_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dInt16(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x09
-    property value:
-        def __get__(self):
-            cdef np.int16_t[:, ::1] view = <np.int16_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int16_t[:, ::1] view = <np.int16_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dInt32(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x0B
-    property value:
-        def __get__(self):
-            cdef np.int32_t[:, ::1] view = <np.int32_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int32_t[:, ::1] view = <np.int32_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dInt64(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x0F
-    property value:
-        def __get__(self):
-            cdef np.int64_t[:, ::1] view = <np.int64_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int64_t[:, ::1] view = <np.int64_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dFloat32(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x13
-    property value:
-        def __get__(self):
-            cdef np.float32_t[:, ::1] view = <np.float32_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.float32_t[:, ::1] view = <np.float32_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter2dFloat64(Parameter2d):
     def __cinit__(self, *args):
         self.type = 0x27
-    property value:
-        def __get__(self):
-            cdef np.float64_t[:, ::1] view = <np.float64_t[:self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.float64_t[:, ::1] view = <np.float64_t[:self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :bound]
 
 
 cdef class Parameter3dUInt8(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x00
-    property value:
-        def __get__(self):
-            cdef np.uint8_t[:, :, ::1] view = <np.uint8_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint8_t[:, :, ::1] view = <np.uint8_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dUInt16(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x01
-    property value:
-        def __get__(self):
-            cdef np.uint16_t[:, :, ::1] view = <np.uint16_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint16_t[:, :, ::1] view = <np.uint16_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dUInt32(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x03
-    property value:
-        def __get__(self):
-            cdef np.uint32_t[:, :, ::1] view = <np.uint32_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint32_t[:, :, ::1] view = <np.uint32_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dUInt64(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x07
-    property value:
-        def __get__(self):
-            cdef np.uint64_t[:, :, ::1] view = <np.uint64_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.uint64_t[:, :, ::1] view = <np.uint64_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dInt8(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x08
-    property value:
-        def __get__(self):
-            cdef np.int8_t[:, :, ::1] view = <np.int8_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int8_t[:, :, ::1] view = <np.int8_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dInt16(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x09
-    property value:
-        def __get__(self):
-            cdef np.int16_t[:, :, ::1] view = <np.int16_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int16_t[:, :, ::1] view = <np.int16_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dInt32(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x0B
-    property value:
-        def __get__(self):
-            cdef np.int32_t[:, :, ::1] view = <np.int32_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int32_t[:, :, ::1] view = <np.int32_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dInt64(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x0F
-    property value:
-        def __get__(self):
-            cdef np.int64_t[:, :, ::1] view = <np.int64_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.int64_t[:, :, ::1] view = <np.int64_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dFloat32(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x13
-    property value:
-        def __get__(self):
-            cdef np.float32_t[:, :, ::1] view = <np.float32_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.float32_t[:, :, ::1] view = <np.float32_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class Parameter3dFloat64(Parameter3d):
     def __cinit__(self, *args):
         self.type = 0x27
-    property value:
-        def __get__(self):
-            cdef np.float64_t[:, :, ::1] view = <np.float64_t[:self.s3, :self.s2, :self.s1]> self._ptr
-            a = np.asarray(view)
-            if self.ubound == -1:
-                return a
-            return a[:, :, :self.get_bound()]
+    cdef object _view(self, int bound):
+        cdef np.float64_t[:, :, ::1] view = <np.float64_t[:self.s3, :self.s2, :self.s1]> self._ptr
+        a = np.asarray(view)
+        if self.ubound == -1:
+            return a
+        return a[:, :, :bound]
 
 
 cdef class ParameterUnhandled(Parameter):
@@ -495,8 +515,8 @@ cdef class ParameterUnhandled(Parameter):
         self.type = -1
 
 
-def convert_parameter(rparam, int iparam, params, bparams, use_tf,
-                      DispatcherAccess da not None):
+def convert_parameter(str name, int ptype, tuple shape, rubound, int iparam,
+                      params, bparams, use_tf, DispatcherAccess da not None):
     cdef int s1
     cdef int s2
     cdef int s3
@@ -505,26 +525,23 @@ def convert_parameter(rparam, int iparam, params, bparams, use_tf,
 
     if use_tf:
         id |= cTF_FLAG
-    name = rparam.name
-    ptype = rparam.type
-    if rparam.ubound is not None:
+    if rubound is not None:
         try:
-            pbound = bparams[rparam.ubound]
+            pbound = bparams[rubound]
         except KeyError:
             try:
-                pbound = next(_ for _ in params if _.name == rparam.ubound)
+                pbound = next(_ for _ in params if _.name == rubound)
                 bparams[pbound.name] = pbound
-            except ValueError:
-                raise ValueError("Undefined parameter '{}'.".
-                                 format(rparam.ubound))
+            except (StopIteration, TypeError):
+                raise ValueError("Undefined parameter '{}'.".format(rubound))
         ubound = pbound.type
     else:
         ubound = -1
-    ndim = len(rparam.shape)
+    ndim = len(shape)
     if ndim == 0:
         s1 = 0
     else:
-        s1 = rparam.shape[-1]
+        s1 = shape[-1]
     if ndim <= 1:
         if ptype == 0x00:
             param = ParameterUInt8(name, id, ubound, s1)
@@ -558,7 +575,7 @@ def convert_parameter(rparam, int iparam, params, bparams, use_tf,
             print("Parameter '{}' of type '{}' is not handled.".
                   format(name, ptype))
     elif ndim == 2:
-        s2 = rparam.shape[0]
+        s2 = shape[0]
         if ptype == 0x00:
             param = Parameter2dUInt8(name, id, ubound, s1, s2)
         elif ptype == 0x01:
@@ -588,8 +605,8 @@ def convert_parameter(rparam, int iparam, params, bparams, use_tf,
             print("Parameter '{}' of type '{}' is not handled.".
                   format(name, ptype))
     elif ndim == 3:
-        s2 = rparam.shape[1]
-        s3 = rparam.shape[0]
+        s2 = shape[1]
+        s3 = shape[0]
         if ptype == 0x00:
             param = Parameter3dUInt8(name, id, ubound, s1, s2, s3)
         elif ptype == 0x01:
@@ -624,55 +641,21 @@ def convert_parameter(rparam, int iparam, params, bparams, use_tf,
     else:
         param._ptr = pt.paramAddress[iparam]
 
-    if rparam.ubound is not None:
+    if rubound is not None:
         param._ptr_bound = pt.paramAddress[pbound.id]
     return param
 
 
 def get_parameters(DispatcherAccess da):
-    cdef int i, j
-    # cdef TParametersTable _params
-
-    rparams = read_all_params()
     params = []
-    paramsTF = []
     bparams = {}
-    for i, rparam in enumerate(rparams):
-        param = convert_parameter(rparam, i, params, bparams, False, da)
-        params.append(param)
-        if rparam.use_tf:
-            rparam_tf = ParameterEntry(
-                rparam.name+'_TF', rparam.description, 0x27, rparam.shape,
-                rparam.ubound, False)
-            param = convert_parameter(rparam_tf, i, params, bparams, True, da)
-            params.append(param)
-   
-    # As of 28/09/2015, parameter access to 3-dimensional arrays through
-    # the Dispatcher Client is limited to either the whole array or each of
-    # the last dimension. We provide a transparent access to the last two
-    # dimensions by adding new parameters with the flag META.
-    # Example: 'QUBIC_WorkingRawData' accesses the whole array and
-    # 'QUBIC_WorkingRawData_0_0' accesses the timeline of the first TES
-    # of the first ASIC. Here we add 'QUBIC_WorkingRawData_0' to access
-    # the timelines of all the TES of the first ASIC.
-    for i, rparam in enumerate(rparams):
-        shape = rparam.shape
-        if len(shape) < 3:
-            continue
-        if rparam.use_tf:
-            import warnings
-            warnings.warn('Code should be updated to make meta-parameters han'
-                          'dle TF parameters.')
-            continue
-        for j in range(shape[0]):
-            iparam = i + j * shape[1] + 1
-            rparam_ = ParameterEntry(
-                '{0}_{1}'.format(rparam.name, j), rparam.description,
-                rparam.type, rparam.shape[1:], rparam.ubound, False)
-            param = convert_parameter(
-                rparam_, iparam, None, bparams, False, da)
+    for name, ptype, shape, ubound, iparam, use_tf, meta in read_schema():
+        if meta:
+            param = convert_parameter(name, ptype, shape, ubound, iparam, None,
+                                      bparams, False, da)
             param.id |= cMETA_FLAG
-            params.append(param)
-            # _params=params
+        else:
+            param = convert_parameter(name, ptype, shape, ubound, iparam,
+                                      params, bparams, use_tf, da)
+        params.append(param)
     return ParameterTable(params)
-    # return params
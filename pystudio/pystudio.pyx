@@ -7,6 +7,7 @@ _META_FLAG = cMETA_FLAG
 _MAX_NB_REQUEST_PER_CLIENT = cMAX_NB_REQUEST_PER_CLIENT
 
 include "parameters.pyx"
+include "ringbuffer.pyx"
 include "paramscomputer.pyx"
 include "dispatcheraccess.pyx"
 include "requests.pyx"
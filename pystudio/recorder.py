@@ -0,0 +1,385 @@
+"""
+Recording of the request payloads received by a client.
+
+Once a SessionRecorder is attached to a client by its start_recording method,
+each chunk received by the requests is appended to an append-only binary
+log, with the request number, the parameter identifiers, the sequence number
+and the arrival time of the chunk, and the raw bytes of the values. The
+chunks are captured at their arrival, next to the ring buffers of the
+requests, whether they are consumed by the client or not, and passed to the
+recorder by the recording thread of the client. The recorder only queues
+them: the log is written by a background thread and, if the writer falls
+behind by more than maxsize chunks, the new chunks are dropped and counted
+instead of stalling the acquisition, as are the chunks overwritten before
+the recording thread could pass them.
+
+The chunks of the requests whose parameters cannot be buffered (strings...)
+are recorded when they are consumed (next, next_into, drain).
+
+The log is split into segments of about segment_size bytes. Each segment
+session-NNNNNN.log comes with an index session-NNNNNN.idx, an array of
+INDEX_DTYPE records (offset, size, timestamp, parameter set...) from which
+the chunks can be selected and read without scanning the log, by parameter
+as well. The segments are self-contained: the names of the parameters and
+the parameter sets are written in each of them.
+
+Log format
+----------
+A record is a RECORD_HEADER (magic, kind, request number, sequence number,
+timestamp, number of parameters, payload size) followed by its payload. The
+payload of a KIND_NAME record is the identifier (uint32) and the UTF-8 name
+of a parameter. The payload of a KIND_SET record is the identifiers (uint32)
+of the parameters of the data records whose index entry has the set number
+given by the sequence number of the KIND_SET record. The payload of a
+KIND_DATA record is, for each parameter, a PARAMETER_HEADER (identifier,
+length of the dtype string, number of dimensions) followed by the dtype
+string, the dimensions (uint32), and then the raw bytes of the values in C
+order.
+
+Example
+-------
+>>> client.start_recording('/data/session-2019-02-14')
+>>> mean = integrate_scientific_data(...)
+>>> client.stop_recording()
+>>> reader = SessionReader('/data/session-2019-02-14')
+>>> for record in reader.select('QUBIC_PixelScientificDataTimeLine_0'):
+...     timeline = record.values['QUBIC_PixelScientificDataTimeLine_0']
+
+"""
+from __future__ import division
+from collections import namedtuple
+import glob
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+try:
+    import queue
+except ImportError:
+    # python 2
+    import Queue as queue
+
+__all__ = ['SessionReader', 'SessionRecorder']
+
+MAGIC = b'PSRC'
+KIND_DATA = 0
+KIND_NAME = 1
+KIND_SET = 2
+RECORD_HEADER = struct.Struct('<4sBxhqdIQ')
+PARAMETER_HEADER = struct.Struct('<IBB')
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('size', '<u8'),
+    ('timestamp', '<f8'),
+    ('sequence', '<i8'),
+    ('request', '<i2'),
+    ('kind', 'u1'),
+    ('set', '<i4'),
+])
+DEFAULT_SEGMENT_SIZE = 256 * 2**20
+
+Record = namedtuple('Record', 'request sequence timestamp values')
+
+_STOP = object()
+
+
+class SessionRecorder(object):
+    """
+    Append-only recorder of the request payloads.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the log segments, which is created if necessary.
+        The segments are numbered after those already in the directory.
+    segment_size : int, optional
+        The size in bytes after which a new segment is started.
+    maxsize : int, optional
+        The maximum number of chunks waiting to be written.
+
+    Attributes
+    ----------
+    nrecords : int
+        The number of chunks written.
+    nbytes : int
+        The number of bytes written, headers included.
+    dropped : int
+        The number of chunks dropped because the writer or the recording
+        thread fell behind.
+
+    """
+    def __init__(self, directory, segment_size=DEFAULT_SEGMENT_SIZE,
+                 maxsize=1024):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.nrecords = 0
+        self.nbytes = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize)
+        self._nsegments = len(_segments(directory))
+        self._log = None
+        self._index = None
+        self._names = set()
+        self._sets = {}
+        self._thread = threading.Thread(target=self._run,
+                                        name='pystudio recorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def closed(self):
+        return not self._thread.is_alive()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, request, ids, names, values, sequence=None,
+               timestamp=None):
+        """
+        Queue a chunk for writing. The values are copied, so that they can be
+        modified by the caller afterwards.
+
+        Parameters
+        ----------
+        request : int
+            The request number.
+        ids : sequence of int
+            The identifiers of the parameters.
+        names : sequence of str
+            The names of the parameters.
+        values : sequence of array-like
+            The values of the parameters.
+        sequence : int, optional
+            The sequence number of the chunk.
+        timestamp : float, optional
+            The arrival time of the chunk. By default, the current time.
+
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if sequence is None:
+            sequence = -1
+        values = [np.array(_, order='C') for _ in values]
+        try:
+            self._queue.put_nowait((request, tuple(ids), tuple(names), values,
+                                    sequence, timestamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Write the queued chunks and close the log.
+
+        """
+        if self.closed:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                self._write(*item)
+                # the files are flushed when the writer is idle
+                if self._queue.empty():
+                    self._log.flush()
+                    self._index.flush()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            if self._log is not None:
+                self._log.close()
+                self._index.close()
+
+    def _open_segment(self):
+        if self._log is not None:
+            self._log.close()
+            self._index.close()
+        path = os.path.join(self.directory,
+                            'session-{0:06}'.format(self._nsegments))
+        self._nsegments += 1
+        self._log = open(path + '.log', 'wb')
+        self._index = open(path + '.idx', 'wb')
+        self._names = set()
+        self._sets = {}
+
+    def _append(self, kind, request, sequence, timestamp, nparams, chunks,
+                nset=-1):
+        size = sum(len(_) for _ in chunks)
+        offset = self._log.tell()
+        self._log.write(RECORD_HEADER.pack(MAGIC, kind, request, sequence,
+                                           timestamp, nparams, size))
+        for chunk in chunks:
+            self._log.write(chunk)
+        entry = np.array((offset, RECORD_HEADER.size + size, timestamp,
+                          sequence, request, kind, nset), INDEX_DTYPE)
+        self._index.write(entry.tobytes())
+        self.nbytes += RECORD_HEADER.size + size
+
+    def _write(self, request, ids, names, values, sequence, timestamp):
+        if self._log is None or self._log.tell() >= self.segment_size:
+            self._open_segment()
+        for id, name in zip(ids, names):
+            if id in self._names:
+                continue
+            self._append(KIND_NAME, -1, -1, timestamp, 1,
+                         [struct.pack('<I', id), name.encode('utf-8')])
+            self._names.add(id)
+        nset = self._sets.get(ids)
+        if nset is None:
+            nset = self._sets[ids] = len(self._sets)
+            self._append(KIND_SET, -1, nset, timestamp, len(ids),
+                         [struct.pack('<{0}I'.format(len(ids)), *ids)])
+        headers = []
+        for id, value in zip(ids, values):
+            dtype = value.dtype.str.encode('ascii')
+            headers.append(PARAMETER_HEADER.pack(id, len(dtype), value.ndim))
+            headers.append(dtype)
+            headers.append(struct.pack('<{0}I'.format(value.ndim),
+                                       *value.shape))
+        self._append(KIND_DATA, request, sequence, timestamp, len(values),
+                     headers + [memoryview(_.reshape(-1).view(np.uint8))
+                                for _ in values], nset)
+        self.nrecords += 1
+
+
+class SessionReader(object):
+    """
+    Reader of the logs written by a SessionRecorder.
+
+    The attribute index is the concatenation of the indexes of the data
+    records of the segments, with the additional field 'segment', names maps
+    the parameter identifiers to their names and sets is the list of the
+    identifiers of the parameter sets, indexed by the field 'set' of the
+    index, which is numbered across the segments.
+
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = _segments(directory)
+        self.names = {}
+        self.sets = []
+        indexes = []
+        for segment, path in enumerate(self.segments):
+            index = np.fromfile(path + '.idx', INDEX_DTYPE)
+            nsets = len(self.sets)
+            with open(path + '.log', 'rb') as f:
+                for entry in index[index['kind'] == KIND_NAME]:
+                    header, payload = self._read_payload(f, entry)
+                    id, = struct.unpack_from('<I', payload)
+                    self.names[id] = payload[4:].decode('utf-8')
+                for entry in index[index['kind'] == KIND_SET]:
+                    header, payload = self._read_payload(f, entry)
+                    self.sets.append(struct.unpack(
+                        '<{0}I'.format(header[5]), payload))
+            index = index[index['kind'] == KIND_DATA]
+            index['set'] += nsets
+            out = np.empty(len(index), INDEX_DTYPE.descr + [
+                ('segment', '<i4')])
+            for field in INDEX_DTYPE.names:
+                out[field] = index[field]
+            out['segment'] = segment
+            indexes.append(out)
+        if len(indexes) == 0:
+            raise IOError("No session log in '{0}'.".format(directory))
+        self.index = np.concatenate(indexes)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        entry = self.index[i]
+        with open(self.segments[entry['segment']] + '.log', 'rb') as f:
+            return self._read(f, entry)
+
+    def __iter__(self):
+        return self.select()
+
+    def select(self, parameter=None, request=None, start=None, stop=None):
+        """
+        Iterate over the records, in their order of writing.
+
+        Parameters
+        ----------
+        parameter : str, optional
+            Only the records containing this parameter are returned. They
+            are selected from the index, without reading the other records.
+        request : int, optional
+            Only the records of this request number are returned.
+        start, stop : float, optional
+            Only the records whose timestamp is in [start, stop) are returned.
+
+        """
+        mask = np.ones(len(self.index), bool)
+        if parameter is not None:
+            ids = set(id for id, name in self.names.items()
+                      if name == parameter)
+            sets = [i for i, _ in enumerate(self.sets) if ids.intersection(_)]
+            mask &= np.isin(self.index['set'], sets)
+        if request is not None:
+            mask &= self.index['request'] == request
+        if start is not None:
+            mask &= self.index['timestamp'] >= start
+        if stop is not None:
+            mask &= self.index['timestamp'] < stop
+        files = {}
+        try:
+            for entry in self.index[mask]:
+                f = files.get(entry['segment'])
+                if f is None:
+                    f = open(self.segments[entry['segment']] + '.log', 'rb')
+                    files[entry['segment']] = f
+                yield self._read(f, entry)
+        finally:
+            for f in files.values():
+                f.close()
+
+    @staticmethod
+    def _read_payload(f, entry):
+        # return the payload of a record, as a bytes object
+        f.seek(int(entry['offset']))
+        data = f.read(int(entry['size']))
+        header = RECORD_HEADER.unpack_from(data)
+        if header[0] != MAGIC or \
+           len(data) != RECORD_HEADER.size + header[-1]:
+            raise IOError('Corrupted session log.')
+        return header, data[RECORD_HEADER.size:]
+
+    def _read(self, f, entry):
+        header, payload = self._read_payload(f, entry)
+        nparams = header[5]
+        offset = 0
+        headers = []
+        for i in range(nparams):
+            id, length, ndim = PARAMETER_HEADER.unpack_from(payload, offset)
+            offset += PARAMETER_HEADER.size
+            dtype = payload[offset:offset+length].decode('ascii')
+            offset += length
+            shape = struct.unpack_from('<{0}I'.format(ndim), payload, offset)
+            offset += 4 * ndim
+            headers.append((id, np.dtype(dtype), shape))
+        values = {}
+        for id, dtype, shape in headers:
+            count = int(np.prod(shape))
+            value = np.frombuffer(payload, dtype, count, offset)
+            offset += count * dtype.itemsize
+            values[self.names.get(id, id)] = value.reshape(shape)
+        return Record(int(entry['request']), int(entry['sequence']),
+                      float(entry['timestamp']), values)
+
+
+def _segments(directory):
+    # the paths of the segments, without extension
+    return [_[:-4] for _ in sorted(glob.glob(
+        os.path.join(directory, 'session-[0-9]*.log')))]
@@ -0,0 +1,213 @@
+"""
+Replay of a recorded session.
+
+ReplayDispatcherAccess has the interface of DispatcherAccess and serves the
+requests from a session log written by a SessionRecorder (see
+pystudio.recorder) instead of a dispatcher. It is a SimulatedDispatcherAccess
+whose simulated dispatcher does not generate timelines: the recorded chunks
+are written into its parameter table, which triggers the requests watching
+them, so that the requests arrive with the recorded values through the same
+client code as with an actual dispatcher. The chunk timestamps returned by
+the requests are, as always, their arrival times, not the recorded ones.
+
+The session is replayed on a virtual clock, starting at the time of the
+first recorded chunk, either at a multiple of the wall-clock speed or as
+fast as possible. In the latter case, the clock only advances when a request
+is served by the dispatcher, no TM packet is waiting to be decoded and no
+ring buffer is full, so that no chunk is lost however slow the consumer. The
+delays and periods of the requests are measured on the virtual clock, but as
+fast as possible, the periodic requests are only served once per replayed
+chunk. Once the session is over, the requests are no longer served and time
+out, unless the session is looped.
+
+Unmodified scripts are replayed by setting the environment variable
+PYSTUDIO_REPLAY to the directory of the session log, and optionally
+PYSTUDIO_REPLAY_SPEED to the speed factor, 'max' meaning as fast as
+possible:
+
+     $ PYSTUDIO_REPLAY=/data/session-2019-02-14 PYSTUDIO_REPLAY_SPEED=max \\
+           python run_iv.py
+
+The sleeps of the scripts themselves are not accelerated.
+
+"""
+from __future__ import division
+import os
+import threading
+import time
+import weakref
+import numpy as np
+from .recorder import SessionReader
+from .simulated import SimulatedDispatcherAccess, TimeoutError
+
+__all__ = ['ReplayDispatcherAccess', 'TimeoutError']
+
+# period in s at which the replay thread checks the consumers in the
+# as-fast-as-possible mode
+FAST_POLL_PERIOD = 0.001
+# maximum duration in s of a wait of the replay thread
+MAX_WAIT = 0.1
+
+
+class ReplayDispatcherAccess(SimulatedDispatcherAccess):
+    """
+    Dispatcher access class replaying a recorded session.
+
+    Parameters
+    ----------
+    dispatcherAddress : str, optional
+        Ignored.
+    dispatcherPort : int, optional
+        Ignored.
+    session : str or SessionReader, optional
+        The session log. By default, the directory given by the environment
+        variable PYSTUDIO_REPLAY.
+    speed : float or None, optional
+        The replay speed relative to the wall clock. If None or infinite, the
+        session is replayed as fast as possible. By default, the value of the
+        environment variable PYSTUDIO_REPLAY_SPEED or 1.
+    loop : boolean, optional
+        If True, the session is replayed again once it is over.
+
+    Attributes
+    ----------
+    now : float
+        The current time of the virtual clock, in the time base of the
+        recorded timestamps.
+    finished : boolean
+        True once the session is over.
+    nchunks : int
+        The number of chunks replayed.
+
+    """
+    def __init__(self, dispatcherAddress=None, dispatcherPort=-1,
+                 session=None, speed=-1, loop=False, **keywords):
+        if session is None:
+            session = os.environ.get('PYSTUDIO_REPLAY')
+            if not session:
+                raise ValueError('The session to be replayed is not '
+                                 'specified.')
+        if not isinstance(session, SessionReader):
+            session = SessionReader(session)
+        if speed == -1:
+            speed = os.environ.get('PYSTUDIO_REPLAY_SPEED', '1')
+            speed = None if speed == 'max' else float(speed)
+        if speed is not None and speed <= 0:
+            raise ValueError('Invalid replay speed: {0}.'.format(speed))
+        if speed is not None and np.isinf(speed):
+            speed = None
+        keywords.setdefault('ack_delay', 0)
+        SimulatedDispatcherAccess.__init__(
+            self, dispatcherAddress, dispatcherPort, **keywords)
+        self.session = session
+        self.speed = speed
+        self.loop = loop
+        self.finished = False
+        self.nchunks = 0
+        self._start = float(session.index['timestamp'][0])
+        self._duration = float(session.index['timestamp'][-1]) - self._start
+        self._offset = 0.
+        self._records = iter(session)
+        self._record = None
+        self._record_time = self._start
+        self._now = self._start
+        self._wall0 = time.time()
+        self._stopped = False
+        # the recorded chunks replace the synthetic timelines and the clock of
+        # the simulated dispatcher is the virtual clock
+        self._configure('source=none clock=external')
+        self._set_time(self._start)
+        self._thread = threading.Thread(target=_run, args=(weakref.ref(self),),
+                                        name='session replay')
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def now(self):
+        return self._clock()
+
+    def stop(self):
+        """
+        Stop the replay thread.
+
+        """
+        self._stopped = True
+
+    def _clock(self):
+        if self.speed is not None:
+            self._now = self._start + (time.time() - self._wall0) * \
+                self.speed
+        return self._now
+
+    def _next_record(self):
+        # Return the next record, whose time on the virtual clock is
+        # _record_time, or None if the session is over.
+        if self._record is None:
+            try:
+                self._record = next(self._records)
+            except StopIteration:
+                if not self.loop:
+                    return None
+                self._offset += self._duration + 1e-3
+                self._records = iter(self.session)
+                self._record = next(self._records)
+            self._record_time = max(self._record_time,
+                                    self._record.timestamp + self._offset)
+        return self._record
+
+    def _replay(self, record):
+        # write the values of a record into the table of the dispatcher and
+        # trigger the requests watching them, e.g. not those watching the
+        # timeline of another ASIC
+        ids = []
+        for name, value in record.values.items():
+            if value.dtype.kind == 'O':
+                continue
+            try:
+                ids += self._write(name, value)
+            except (TypeError, ValueError):
+                continue
+        self._acquire(ids)
+        self.nchunks += 1
+
+    def _demand(self):
+        # In the as-fast-as-possible mode, the clock advances if a request is
+        # served, the TM buffer is empty and no ring buffer is full.
+        if self._nbrequests() == 0 or self.stackOccupation > 0:
+            return False
+        return not any(_.ring is not None and _.ring.pending >= _.ring.size
+                       for _ in self.active_requests)
+
+    def _step(self):
+        # Replay the next record if it is due and return the time in s to be
+        # waited for before the next step.
+        if self.finished:
+            return MAX_WAIT
+        now = self._clock()
+        record = self._next_record()
+        if record is None:
+            self.finished = True
+            return 0
+        if self.speed is None:
+            if not self._demand():
+                return FAST_POLL_PERIOD
+            now = self._now = self._record_time
+        self._set_time(now)
+        if self._record_time > now:
+            return min(MAX_WAIT, (self._record_time - now) / self.speed)
+        self._record = None
+        self._replay(record)
+        return 0
+
+
+def _run(ref):
+    # the thread only holds a weak reference to the client, so that it stops
+    # once the client is garbage collected
+    while True:
+        client = ref()
+        if client is None or client._stopped:
+            return
+        wait = client._step()
+        del client
+        if wait > 0:
+            time.sleep(wait)
@@ -1,11 +1,58 @@
+from libc.stdlib cimport calloc, free
+from libc.string cimport memcpy
 from libcpp cimport bool
+from posix.unistd cimport write
 from libdispatcheraccess cimport TDispatcherAccess
-from libqt cimport processEvents, QList, QMutex, QMutexLocker, quint8, quint16, quint32
+from libhelpers cimport is_event_loop_thread, wait_for_events, wake_event_loop
+from libqt cimport (
+    QElapsedTimer, QList, QMutex, QMutexLocker, QWaitCondition, qint64, quint8,
+    quint16, quint32)
+import fcntl
+import os
 import time
 
+cdef enum:
+    MAX_NB_CLIENT = 16
+    NB_REQUEST_NUM = 256
+
+
+cdef struct Arrival:
+    # arrival state of a request, owned by the request
+    bool arrived
+    bool one_time
+    # the request is in the list of its key
+    bool attached
+    Ring *ring
+    # ring into which the chunks are captured for the session recorder
+    Ring *record
+    Arrival *next
+
+
 cdef QMutex _mutex
-cdef bool *_requestsArrived = 256 * [False]
+cdef QWaitCondition _arrival
+# The requests are attached to their key, client index * NB_REQUEST_NUM +
+# request number, since the request numbers are only unique within a client.
+# The library releases the number of a one-time request before emitting its
+# arrival, so that the number may be reused by a request sent in the
+# meantime: the requests of a key are listed in their order of sending and
+# an arrival goes to the first one. A one-time request is detached by its
+# arrival.
+cdef Arrival *_attached[MAX_NB_CLIENT * NB_REQUEST_NUM]
+# number of the arrivals of each key without attached request
+cdef unsigned int _unclaimed[MAX_NB_CLIENT * NB_REQUEST_NUM]
+cdef bool _clients[MAX_NB_CLIENT]
+# the chunks captured for the session recorder of a client since its
+# recording thread last woke up
+cdef bool _recording[MAX_NB_CLIENT]
+cdef unsigned int _recorded[MAX_NB_CLIENT]
+cdef int _notify_fd = -1
+_arrival_pipe = None
 MAX_UINT16 = 65535
+# number of chunks of a request captured for the session recorder which can
+# wait for the recording thread
+RECORD_RING_SIZE = 32
+# maximum duration in ms of a wait of the recording thread
+RECORD_WAIT = 1000
 
 
 class TimeoutError(Exception):
@@ -15,20 +62,320 @@ class TimeoutError(Exception):
 cdef class DispatcherAccess
 
 
-cdef void requestArrived(int num) nogil:
-    cdef QMutexLocker *locker = new QMutexLocker(&_mutex)
-    _requestsArrived[num] = True
-    del locker
+cdef void requestArrived(int client, int num) noexcept nogil:
+    if num < 0 or num >= NB_REQUEST_NUM:
+        return
+    cdef int key = client * NB_REQUEST_NUM + num
+    cdef Arrival *state
+    _mutex.lock()
+    state = _attached[key]
+    if state == NULL:
+        _unclaimed[key] += 1
+    else:
+        if state.ring != NULL:
+            ring_push(state.ring)
+        if state.record != NULL:
+            ring_push(state.record)
+            _recorded[client] += 1
+        state.arrived = True
+        if state.one_time:
+            _attached[key] = state.next
+            state.next = NULL
+            state.attached = False
+    _arrival.wakeAll()
+    _mutex.unlock()
+    wake_event_loop()
+    cdef char byte = <char>num
+    cdef ssize_t n
+    if _notify_fd >= 0:
+        n = write(_notify_fd, &byte, 1)
+
+
+def _arrival_fd():
+    """
+    Return the read end of a non-blocking pipe into which a byte is written
+    each time a request arrives, so that the reader thread of the asyncio
+    interface can watch the arrivals without polling.
+
+    """
+    global _notify_fd, _arrival_pipe
+    if _arrival_pipe is None:
+        _arrival_pipe = os.pipe()
+        for fd in _arrival_pipe:
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        _notify_fd = _arrival_pipe[1]
+    return _arrival_pipe[0]
+
+
+cdef int acquire_client_index() except -1:
+    """
+    Return a free client index, whose arrival flags are cleared.
+
+    """
+    cdef int index, key
+    cdef QMutexLocker *locker = lock_mutex()
+    try:
+        for index in range(MAX_NB_CLIENT):
+            if not _clients[index]:
+                break
+        else:
+            raise RuntimeError(
+                'There cannot be more than {0} clients.'.format(MAX_NB_CLIENT))
+        _clients[index] = True
+        _recording[index] = False
+        _recorded[index] = 0
+        for key in range(index * NB_REQUEST_NUM,
+                         (index + 1) * NB_REQUEST_NUM):
+            _attached[key] = NULL
+        return index
+    finally:
+        del locker
+
+
+cdef void release_client_index(int index) noexcept nogil:
+    """
+    Release the index of a client whose library object has been deleted.
+
+    """
+    _mutex.lock()
+    _clients[index] = False
+    _recording[index] = False
+    _arrival.wakeAll()
+    _mutex.unlock()
+
+
+cdef void snapshot_unclaimed(int base, unsigned int *out) noexcept nogil:
+    """
+    Copy the counts of unclaimed arrivals of the NB_REQUEST_NUM keys starting
+    at base.
+
+    """
+    _mutex.lock()
+    memcpy(out, &_unclaimed[base], NB_REQUEST_NUM * sizeof(unsigned int))
+    _mutex.unlock()
+
+
+cdef void attach_request(int key, unsigned int count,
+                         Arrival *state) noexcept nogil:
+    """
+    Attach a request which has just been sent to its key. If the count of
+    unclaimed arrivals of the key is no longer count, as before the request
+    was sent, the request has arrived already, but its chunk has not been
+    captured in the ring buffer and is read from the parameter table. It is
+    captured for the session recorder now, from the parameter table as well.
+    The earlier unclaimed arrivals are those of aborted requests.
+
+    The request mutex is not held while the request is sent, since the
+    library emits the arrivals while holding its own lock.
+
+    """
+    cdef Arrival **link = &_attached[key]
+    _mutex.lock()
+    if _unclaimed[key] != count:
+        state.arrived = True
+        if state.record != NULL:
+            ring_push(state.record)
+            _recorded[key // NB_REQUEST_NUM] += 1
+        if state.one_time:
+            _mutex.unlock()
+            return
+    while link[0] != NULL:
+        link = &link[0].next
+    link[0] = state
+    state.attached = True
+    _mutex.unlock()
+
+
+cdef bool detach_request(int key, Arrival *state) noexcept nogil:
+    """
+    Detach a request from its key and return True if it was attached, i.e.
+    if its request number has not been released by the library.
+
+    """
+    cdef Arrival **link = &_attached[key]
+    cdef bool out
+    _mutex.lock()
+    out = state.attached
+    if out:
+        while link[0] != state:
+            link = &link[0].next
+        link[0] = state.next
+        state.next = NULL
+        state.attached = False
+    _mutex.unlock()
+    return out
+
+
+cdef void set_recording(int client, bool recording) noexcept nogil:
+    """
+    Start or stop the recording thread of a client.
+
+    """
+    _mutex.lock()
+    _recording[client] = recording
+    _recorded[client] = 0
+    _arrival.wakeAll()
+    _mutex.unlock()
+
+
+cdef bool wait_recorded(int client, int timeout) noexcept nogil:
+    """
+    Block until chunks are captured for the session recorder of a client, or
+    until timeout ms have elapsed. Return False once the recording is
+    stopped.
+
+    """
+    cdef bool out
+    _mutex.lock()
+    if _recording[client] and _recorded[client] == 0:
+        _arrival.wait(&_mutex, timeout)
+    _recorded[client] = 0
+    out = _recording[client]
+    _mutex.unlock()
+    return out
+
+
+def _run_recording(int index, recorded, held, recorder):
+    """
+    Pass the chunks captured at their arrival by the requests of a client to
+    its session recorder, until the recording is stopped. The one-time
+    requests are held until their chunk is recorded.
+
+    """
+    cdef bool recording = True
+    cdef int timeout = RECORD_WAIT
+    while recording:
+        with nogil:
+            recording = wait_recorded(index, timeout)
+        for request in list(recorded):
+            if not request._flush_recording(recorder):
+                recorded.discard(request)
+                held.discard(request)
+
+
+cdef QMutexLocker *lock_mutex() except NULL:
+    """
+    Lock the request mutex from a thread holding the GIL. The GIL is released
+    while waiting for the mutex, since the threads sending requests hold the
+    mutex without the GIL and must be able to reacquire it afterwards.
+
+    """
+    cdef QMutexLocker *locker
+    with nogil:
+        locker = new QMutexLocker(&_mutex)
+    return locker
+
+
+cdef bool wait_request(Arrival *state, int timeout) noexcept nogil:
+    """
+    Block until a request arrives or until timeout ms have elapsed.
+    The arrival flag is consumed and returned.
+
+    The thread running the Qt event loop sleeps in the event loop, which is
+    woken up by the requestArrived slot. Other threads sleep on the arrival
+    condition. In both cases, there is no polling.
+
+    """
+    cdef QElapsedTimer timer
+    cdef qint64 remaining
+    cdef bool out
+    cdef bool pump = is_event_loop_thread()
+    timer.start()
+    _mutex.lock()
+    while not state.arrived:
+        remaining = timeout - timer.elapsed()
+        if remaining <= 0:
+            break
+        if pump:
+            _mutex.unlock()
+            wait_for_events(remaining)
+            _mutex.lock()
+        else:
+            _arrival.wait(&_mutex, remaining)
+    out = state.arrived
+    state.arrived = False
+    _mutex.unlock()
+    return out
+
+
+cdef int wait_requests(Arrival **states, bool *arrived, int n,
+                       int timeout) noexcept nogil:
+    """
+    Block until one of the n requests arrives or until timeout ms have
+    elapsed. The arrival flags are consumed and stored in arrived, and the
+    number of arrived requests is returned.
+
+    """
+    cdef QElapsedTimer timer
+    cdef qint64 remaining
+    cdef int i, count = 0
+    cdef bool pump = is_event_loop_thread()
+    timer.start()
+    _mutex.lock()
+    while True:
+        for i in range(n):
+            arrived[i] = states[i].arrived
+            if arrived[i]:
+                states[i].arrived = False
+                count += 1
+        if count > 0:
+            break
+        remaining = timeout - timer.elapsed()
+        if remaining <= 0:
+            break
+        if pump:
+            _mutex.unlock()
+            wait_for_events(remaining)
+            _mutex.lock()
+        else:
+            _arrival.wait(&_mutex, remaining)
+    _mutex.unlock()
+    return count
+
+
+def _wait_any(requests, int timeout):
+    """
+    Wait until at least one of the requests arrives or until timeout ms have
+    elapsed, and return the list of the arrived requests, whose arrival flag
+    is consumed as by the test method. The GIL is released while waiting.
+
+    """
+    cdef AbstractRequest request
+    cdef int i, n = len(requests)
+    cdef Arrival **states
+    cdef bool *arrived
+    if n == 0:
+        return []
+    states = <Arrival**>calloc(n, sizeof(Arrival*))
+    arrived = <bool*>calloc(n, sizeof(bool))
+    if states == NULL or arrived == NULL:
+        free(states)
+        free(arrived)
+        raise MemoryError()
+    try:
+        for i in range(n):
+            request = requests[i]
+            if request.id < 0:
+                raise ValueError('The request has not been sent.')
+            states[i] = &request.state
+        with nogil:
+            wait_requests(states, arrived, n, timeout)
+        return [requests[i] for i in range(n) if arrived[i]]
+    finally:
+        free(states)
+        free(arrived)
 
 
 cdef int convert_requested_parameters(DispatcherAccess da, object parameters,
                                       QList[quint32] *meta_ids,
                                       QList[quint32] *out) except 1:
     cdef quint32 paramId
+    table = da.parameters
     for parameter in parameters:
         if not isinstance(parameter, str):
             raise TypeError('Invalid parameter type.')
-        param = da.parameters[parameter.strip()]
+        param = table[parameter.strip()]
         meta_ids.append(<quint32>param.id)
         if param.id & cMETA_FLAG:
             paramId = param.id & ~cMETA_FLAG
@@ -42,19 +389,89 @@ cdef int convert_requested_parameters(DispatcherAccess da, object parameters,
 
 cdef class AbstractRequest:
     cdef public int id
+    # client index * NB_REQUEST_NUM + id
+    cdef int key
+    cdef Arrival state
     cdef public int timeout
     cdef DispatcherAccess da
     cdef QList[quint32] paramMetaIds
-    cdef str error_msg
+    cdef readonly str error_msg
+    cdef readonly RingBuffer ring
+    # ring into which the chunks are captured for the session recorder
+    cdef RingBuffer _record_ring
+    cdef readonly object sequence
+    cdef readonly object timestamp
+    # time at which a one-time request is sent, -1 for persistent requests
+    cdef double _sent
+    cdef object __weakref__
 
     def __cinit__(self, DispatcherAccess da not None, object parameters,
                   int timeout, *args):
+        self.id = -1
         self.da = da
         self.timeout = timeout
+        self._sent = -1
+        self.state.arrived = False
+        self.state.one_time = False
+        self.state.attached = False
+        self.state.ring = NULL
+        self.state.record = NULL
+        self.state.next = NULL
 
     def __dealloc__(self):
-        if self.id >= 0:
-            self.da._da.disableOneRequestedParameters(<quint8>self.id)
+        if self.id >= 0 and self._detach():
+            self._disable()
+
+    cdef Ring *_ring_ptr(self):
+        if self.ring is None:
+            return NULL
+        return &self.ring.ring
+
+    cdef bool _detach(self):
+        cdef bool out
+        with nogil:
+            out = detach_request(self.key, &self.state)
+        return out
+
+    cdef void _disable(self):
+        cdef TDispatcherAccess *da = self.da._da
+        cdef QMutex *libraryMutex = self.da._libraryMutex
+        cdef quint8 num = <quint8>self.id
+        with nogil:
+            libraryMutex.lock()
+            da.disableOneRequestedParameters(num)
+            libraryMutex.unlock()
+
+    property overruns:
+        """
+        Number of chunks lost because the consumer fell behind the arrivals
+        by more than the size of the ring buffer.
+
+        """
+        def __get__(self):
+            if self.ring is None:
+                return 0
+            return self.ring.overruns
+
+    property nbytes:
+        """
+        Number of bytes of a chunk of the requested parameters.
+
+        """
+        def __get__(self):
+            table = self.da.parameters
+            return sum(table[self.paramMetaIds.at(i)].value.nbytes
+                       for i in range(self.paramMetaIds.count()))
+
+    property pending:
+        """
+        Number of arrived chunks which have not been returned yet.
+
+        """
+        def __get__(self):
+            if self.ring is None:
+                return int(self.state.arrived)
+            return self.ring.pending
 
     def _check(self, bool isValid, str watched=None):
         if self.id < 0:
@@ -71,17 +488,29 @@ cdef class AbstractRequest:
 
     def abort(self):
         """
-        Abort request.
+        Abort request. The chunks already captured in the ring buffer can
+        still be retrieved with the drain method.
 
         """
-        self.da._da.disableOneRequestedParameters(<quint8>self.id)
+        # the number of a one-time request which has arrived is released
+        if self._detach():
+            self._disable()
+        self.da._unregister(self)
 
     def next(self):
         """
         Wait until request completion and return the requested parameters.
 
-        A copy of the requested parameter values is returned. Here we precisely
-        do what TDispatcherKernelScriptEngine's ValueForId does, in the sense
+        If the request has a ring buffer, which is the default for persistent
+        requests, the chunks are returned in their order of arrival. They are
+        copied into the ring buffer as soon as they arrive, so that they are
+        not altered by the following transfers. The sequence number and the
+        arrival time of the last chunk returned are stored in the attributes
+        sequence and timestamp.
+
+        Otherwise, a copy of the requested parameter values is returned. Here
+        we precisely do what TDispatcherKernelScriptEngine's ValueForId does,
+        in the sense
         that there is no guarantee that the returned parameter value is what
         the dispatcher transferred when it sent a "request arrived" signal,
         because the unprotected buffer held by TParametersTable may have been
@@ -95,21 +524,244 @@ cdef class AbstractRequest:
 
         """
         self.wait()
-        out = tuple(self.da.parameters[self.paramMetaIds.at(i)].value.copy()
+        return self._values()
+
+    def next_into(self, out, Py_ssize_t offset=0):
+        """
+        Wait until request completion and copy the requested parameter values
+        into a caller-provided array, without allocating new arrays.
+
+        The samples of each parameter are written along the last axis of the
+        output array, starting at index offset. The other dimensions of the
+        output array must match those of the parameter. If the request has
+        several parameters, out must be a sequence of arrays, one for each
+        of them. The copy is a plain memory copy if the output array is
+        C-contiguous and has the parameter's dtype, otherwise the values are
+        cast by numpy.
+
+        Parameters
+        ----------
+        out : ndarray or sequence of ndarrays
+            The output array(s).
+        offset : int, optional
+            Index in the last axis of the output array(s) of the first sample.
+
+        Returns
+        -------
+        count : int or tuple of int
+            The number of samples written into the output array(s), which is
+            limited by the room left after offset.
+
+        Example
+        -------
+        >>> timeline = np.empty((128, 10000), np.float32)
+        >>> req = client.request('QUBIC_PixelScientificDataTimeLine_0')
+        >>> offset = 0
+        >>> while offset < timeline.shape[-1]:
+        ...     offset += req.next_into(timeline, offset)
+        >>> req.abort()
+
+        """
+        self.wait()
+        return self._values_into(out, offset)
+
+    def _values_into(self, out, Py_ssize_t offset):
+        """
+        Copy the requested parameter values into out, without waiting.
+
+        """
+        cdef int i, slot = -1
+        cdef int nparams = self.paramMetaIds.count()
+        cdef Py_ssize_t count = 0
+        cdef Py_ssize_t *counts = &count
+        cdef Parameter param
+        cdef QMutexLocker *locker
+        if nparams == 1:
+            outs = (out,)
+        else:
+            outs = tuple(out)
+            if len(outs) != nparams:
+                raise ValueError(
+                    'Expected {0} output arrays.'.format(nparams))
+            counts = <Py_ssize_t*>calloc(nparams, sizeof(Py_ssize_t))
+            if counts == NULL:
+                raise MemoryError()
+        try:
+            if self.ring is not None:
+                locker = lock_mutex()
+                try:
+                    slot = self.ring.pop_into(outs, offset, counts)
+                    self.state.arrived = self.ring.pending > 0
+                    if slot >= 0:
+                        self.sequence = self.ring.ring.sequences[slot]
+                        self.timestamp = self.ring.ring.timestamps[slot]
+                finally:
+                    del locker
+            if slot < 0:
+                table = self.da.parameters
+                for i in range(nparams):
+                    param = table[self.paramMetaIds.at(i)]
+                    try:
+                        dtype = _DTYPES[param.type]
+                    except KeyError:
+                        raise TypeError("The parameter '{}' is not an array."
+                                        .format(param.name))
+                    counts[i] = chunk_into(
+                        <char*>param._ptr, param.get_bound(),
+                        np.dtype(dtype).itemsize, dtype, param.max_shape(),
+                        outs[i], offset)
+            if self._record_ring is None and self.da._recorder is not None:
+                self._record(self.da._recorder,
+                             [outs[i][..., offset:offset+counts[i]]
+                              for i in range(nparams)],
+                             self.sequence if slot >= 0 else None,
+                             self.timestamp if slot >= 0 else None)
+            if nparams == 1:
+                return count
+            return tuple(counts[i] for i in range(nparams))
+        finally:
+            if counts != &count:
+                free(counts)
+
+    def drain(self):
+        """
+        Return, without waiting, the list of the chunks captured in the ring
+        buffer which have not been returned yet.
+
+        Without ring buffer (one-time requests, ring_size=0 or parameters
+        which cannot be buffered), the list holds at most one chunk, read
+        from the parameter table if the request has arrived since the last
+        returned chunk.
+
+        """
+        if self.ring is None:
+            if not self.test():
+                return []
+            return [self._values()]
+        out = []
+        while self.ring.pending > 0:
+            out.append(self._values())
+        return out
+
+    def _values(self):
+        """
+        Return a copy of the requested parameter values, without waiting.
+
+        """
+        cdef QMutexLocker *locker
+        if self.ring is not None:
+            locker = lock_mutex()
+            try:
+                chunk = self.ring.pop()
+                self.state.arrived = self.ring.pending > 0
+            finally:
+                del locker
+            if chunk is not None:
+                out, self.sequence, self.timestamp = chunk
+                if self._record_ring is None and \
+                   self.da._recorder is not None:
+                    self._record(self.da._recorder, out, self.sequence,
+                                 self.timestamp)
+                if len(out) == 1:
+                    out = out[0]
+                return out
+        table = self.da.parameters
+        out = tuple(table[self.paramMetaIds.at(i)].value.copy()
                     for i in range(self.paramMetaIds.count()))
+        if self._record_ring is None and self.da._recorder is not None:
+            self._record(self.da._recorder, out, None, None)
         if len(out) == 1:
             out = out[0]
         return out
 
+    def _start_recording(self):
+        """
+        Capture the chunks of the request at their arrival for the session
+        recorder of the client, and return True. Return False if the
+        parameters cannot be buffered: their chunks are recorded when they
+        are consumed.
+
+        """
+        cdef QMutexLocker *locker
+        cdef RingBuffer ring
+        table = self.da.parameters
+        params = [table[self.paramMetaIds.at(i)]
+                  for i in range(self.paramMetaIds.count())]
+        if not all(_.type in _DTYPES for _ in params):
+            return False
+        ring = RingBuffer(params, RECORD_RING_SIZE)
+        locker = lock_mutex()
+        try:
+            # the sequence numbers are those of the ring buffer
+            if self.ring is not None:
+                ring.ring.head = ring.ring.tail = self.ring.ring.head
+            self._record_ring = ring
+            self.state.record = &ring.ring
+        finally:
+            del locker
+        return True
+
+    def _stop_recording(self):
+        """
+        Stop capturing the chunks for the session recorder. Those already
+        captured are still passed to it by _flush_recording.
+
+        """
+        cdef QMutexLocker *locker = lock_mutex()
+        self.state.record = NULL
+        del locker
+
+    def _flush_recording(self, recorder):
+        """
+        Pass the chunks captured for the session recorder to it, and return
+        False once no more chunk will be captured. The chunks overwritten
+        before they could be passed are counted as dropped by the recorder.
+
+        """
+        cdef QMutexLocker *locker
+        cdef RingBuffer ring = self._record_ring
+        cdef unsigned long long overruns
+        cdef bool capturing
+        if ring is None:
+            return False
+        while True:
+            locker = lock_mutex()
+            try:
+                chunk = ring.pop()
+                overruns = ring.ring.overruns
+                ring.ring.overruns = 0
+                capturing = self.state.record == &ring.ring and \
+                    self.state.attached
+            finally:
+                del locker
+            recorder.dropped += overruns
+            if chunk is None:
+                return capturing
+            values, sequence, timestamp = chunk
+            self._record(recorder, values,
+                         sequence if self.ring is not None else None,
+                         timestamp)
+
+    def _record(self, recorder, values, sequence, timestamp):
+        """
+        Pass a chunk to the session recorder of the client.
+
+        """
+        table = self.da.parameters
+        params = [table[self.paramMetaIds.at(i)]
+                  for i in range(self.paramMetaIds.count())]
+        recorder.record(self.id, [_.id for _ in params],
+                        [_.name for _ in params], values, sequence, timestamp)
+
     def test(self):
         """
         Return True if the request has arrived.
 
         """
-        cdef QMutexLocker *locker = new QMutexLocker(&_mutex)
-        out = _requestsArrived[self.id]
+        cdef QMutexLocker *locker = lock_mutex()
+        out = self.state.arrived
         if out:
-            _requestsArrived[self.id] = False
+            self.state.arrived = False
         del locker
         return out
 
@@ -117,16 +769,28 @@ cdef class AbstractRequest:
         """
         Wait until request arrives.
 
-        On timeout, raise a TimeoutError exception.
+        On timeout, raise a TimeoutError exception. The GIL is released
+        while waiting. If a HealthSampler is running for the client, the
+        round trip of a one-time request, from its sending to its arrival,
+        is added to its latency histogram 'fetch' and the wait of a
+        persistent request to its histogram 'next'.
 
         """
-        time0 = time.time()
-        while not self.test():
-            time.sleep(0.001)
-            processEvents()
-            if 1000 * (time.time() - time0) > self.timeout:
-                self.abort()
-                raise TimeoutError(self.error_msg)
+        cdef bool arrived
+        cdef Arrival *state = &self.state
+        cdef int timeout = self.timeout
+        cdef double start = time.time()
+        with nogil:
+            arrived = wait_request(state, timeout)
+        sampler = self.da._health_sampler
+        if arrived and sampler is not None:
+            if self._sent >= 0:
+                sampler.observe('fetch', time.time() - self._sent)
+            else:
+                sampler.observe('next', time.time() - start)
+        if not arrived:
+            self.abort()
+            raise TimeoutError(self.error_msg)
 
 
 cdef class RequestOneTime(AbstractRequest):
@@ -135,56 +799,105 @@ cdef class RequestOneTime(AbstractRequest):
         cdef QList[quint32] paramIds
         convert_requested_parameters(da, parameters, &self.paramMetaIds, &paramIds)
         cdef quint32 watchedId
+        cdef quint16 delay
         cdef bool isValid = False
-        cdef QMutexLocker *locker = new QMutexLocker(&_mutex)
-        if isinstance(trigger, str):
+        cdef bool synchro = isinstance(trigger, str)
+        cdef TDispatcherAccess *da_ = da._da
+        cdef int id
+        cdef int base = da._index * NB_REQUEST_NUM
+        cdef unsigned int unclaimed[NB_REQUEST_NUM]
+        cdef Arrival *state = &self.state
+        if synchro:
             watchedId = da.parameters[trigger].id & ~cMETA_FLAG
-            self.id = da._da.requestOneTimeSynchroParameters(paramIds, watchedId, &isValid)
-            self._check(isValid, trigger)
         else:
             trigger = max(int(trigger), 0)
             if trigger > MAX_UINT16:
                 raise ValueError('Delay cannot exceed {0} ms.'.
                                  format(MAX_UINT16))
-            self.id = da._da.requestOneTimeTimeoutParameters(paramIds, <quint16>trigger, &isValid)
+            delay = trigger
             self.timeout = max(timeout, trigger + trigger // 2)
-            self._check(isValid)
-        _requestsArrived[self.id] = False
-        del locker
+        self._sent = time.time()
+        state.one_time = True
+        recording = da._recorder is not None and self._start_recording()
+        with nogil:
+            da._libraryMutex.lock()
+            snapshot_unclaimed(base, unclaimed)
+            if synchro:
+                id = da_.requestOneTimeSynchroParameters(paramIds, watchedId,
+                                                         &isValid)
+            else:
+                id = da_.requestOneTimeTimeoutParameters(paramIds, delay,
+                                                         &isValid)
+            if id >= 0:
+                attach_request(base + id, unclaimed[id], state)
+            da._libraryMutex.unlock()
+        self.id = id
+        self.key = base + id
+        self._check(isValid, trigger if synchro else None)
+        if recording:
+            da._recorded.add(self)
+            da._recorded_held.add(self)
 
 
 cdef class RequestPersistent(AbstractRequest):
     def __cinit__(self, DispatcherAccess da not None, object parameters,
-                  int timeout, object trigger, int every=1):
+                  int timeout, object trigger, int every=1,
+                  int ring_size=DEFAULT_RING_SIZE):
         cdef QList[quint32] paramIds
         convert_requested_parameters(da, parameters, &self.paramMetaIds,
                                      &paramIds)
         cdef quint32 watchedId
+        cdef quint16 period
         cdef bool isValid = False
-        cdef QMutexLocker *locker = new QMutexLocker(&_mutex)
+        cdef TDispatcherAccess *da_ = da._da
+        cdef int id
+        cdef int base = da._index * NB_REQUEST_NUM
+        cdef unsigned int unclaimed[NB_REQUEST_NUM]
+        cdef Arrival *state = &self.state
+        if ring_size > 0:
+            table = da.parameters
+            params = [table[self.paramMetaIds.at(i)]
+                      for i in range(self.paramMetaIds.count())]
+            # the string parameters and those of unhandled types are read
+            # from the parameter table, as without ring buffer
+            if all(_.type in _DTYPES for _ in params):
+                self.ring = RingBuffer(params, ring_size)
+        state.ring = self._ring_ptr()
+        recording = da._recorder is not None and self._start_recording()
         if trigger is None:
             trigger = parameters[0]
-        if isinstance(trigger, str):
+        cdef bool synchro = isinstance(trigger, str)
+        if synchro:
             watchedId = da.parameters[trigger].id & ~cMETA_FLAG
             if every > MAX_UINT16:
                 raise ValueError(
                     'Argument every cannot exceed {0}.'.format(MAX_UINT16))
             every = max(every, 1)
-            self.id =  da._da.requestSynchroParameters(
-                paramIds, watchedId, <quint16>every, &isValid)
-            self._check(isValid, trigger)
         else:
             if every != 1:
                 raise ValueError(
-                    'Argument every can be specified only if the trigger is a '
-                    'parameter.')
+                    'Argument every can be specified only if the trigger is'
+                    ' a parameter.')
             trigger = max(int(trigger), 1)
             if trigger > MAX_UINT16:
                 raise ValueError('Period cannot exceed {0} ms.'.
                                  format(MAX_UINT16))
-            self.id = da._da.requestTimeoutParameters(
-                paramIds, <quint16>trigger, &isValid)
+            period = trigger
             self.timeout = max(timeout, trigger + trigger // 2)
-            self._check(isValid)
-        _requestsArrived[self.id] = False
-        del locker
+        with nogil:
+            da._libraryMutex.lock()
+            snapshot_unclaimed(base, unclaimed)
+            if synchro:
+                id = da_.requestSynchroParameters(
+                    paramIds, watchedId, <quint16>every, &isValid)
+            else:
+                id = da_.requestTimeoutParameters(paramIds, period, &isValid)
+            if id >= 0:
+                attach_request(base + id, unclaimed[id], state)
+            da._libraryMutex.unlock()
+        self.id = id
+        self.key = base + id
+        self._check(isValid, trigger if synchro else None)
+        if recording:
+            da._recorded.add(self)
+        da._register(self)
@@ -0,0 +1,273 @@
+from libc.stdlib cimport calloc, free
+from libc.string cimport memcpy
+from posix.time cimport clock_gettime, timespec, CLOCK_REALTIME
+from libqt cimport quint8, quint16
+cimport numpy as np
+import numpy as np
+
+DEFAULT_RING_SIZE = 8
+
+_DTYPES = {
+    0x00: np.uint8,
+    0x01: np.uint16,
+    0x03: np.uint32,
+    0x07: np.uint64,
+    0x08: np.int8,
+    0x09: np.int16,
+    0x0B: np.int32,
+    0x0F: np.int64,
+    0x13: np.float32,
+    0x27: np.float64,
+}
+
+
+cdef struct RingParameter:
+    char *src
+    void *src_bound
+    int ubound
+    int s1
+    int nouter
+    int itemsize
+    Py_ssize_t nbytes
+    char *dest
+
+
+cdef struct Ring:
+    int nparams
+    int size
+    RingParameter *params
+    int *bounds
+    unsigned long long *sequences
+    double *timestamps
+    unsigned long long head
+    unsigned long long tail
+    unsigned long long overruns
+
+
+cdef int ring_bound(RingParameter *p) noexcept nogil:
+    cdef int bound
+    if p.ubound == -1:
+        return max(1, p.s1)
+    if p.ubound == 0:
+        bound = (<quint8*>p.src_bound)[0]
+    else:
+        bound = (<quint16*>p.src_bound)[0]
+    return max(0, min(p.s1, bound))
+
+
+cdef void ring_push(Ring *r) noexcept nogil:
+    """
+    Copy the current values of the parameters into the next slot of the ring.
+    If the ring is full, the oldest chunk is overwritten and the overrun
+    counter is incremented.
+
+    """
+    cdef RingParameter *p
+    cdef int i, j, bound, slot
+    cdef Py_ssize_t stride
+    cdef timespec ts
+    if r.head - r.tail == <unsigned long long>r.size:
+        r.tail += 1
+        r.overruns += 1
+    slot = r.head % r.size
+    for i in range(r.nparams):
+        p = &r.params[i]
+        bound = ring_bound(p)
+        r.bounds[slot * r.nparams + i] = bound
+        if bound == max(1, p.s1):
+            memcpy(p.dest + slot * p.nbytes, p.src, p.nbytes)
+            continue
+        # only copy the valid part of the last dimension
+        stride = p.s1 * p.itemsize
+        for j in range(p.nouter):
+            memcpy(p.dest + slot * p.nbytes + j * stride, p.src + j * stride,
+                   bound * p.itemsize)
+    clock_gettime(CLOCK_REALTIME, &ts)
+    r.timestamps[slot] = ts.tv_sec + 1e-9 * ts.tv_nsec
+    r.sequences[slot] = r.head
+    r.head += 1
+
+
+cdef Py_ssize_t chunk_into(char *src, int bound, int itemsize, object dtype,
+                           tuple shape, object out,
+                           Py_ssize_t offset) except -1:
+    """
+    Copy the bound first samples of a chunk, laid out as an array of maximal
+    shape shape, into the array out along its last axis, starting at index
+    offset. Return the number of samples copied, which is limited by the size
+    of the last axis of out.
+
+    """
+    cdef Py_ssize_t count, nouter, j, src_stride, dest_stride
+    cdef np.uint8_t[::1] raw
+    cdef char *dest
+    if len(shape) == 0:
+        shape = (1,)
+    if not isinstance(out, np.ndarray) or out.ndim != len(shape) or \
+       out.shape[:-1] != shape[:-1]:
+        raise ValueError(
+            'The output array must have a shape (..., n) with leading '
+            'dimensions {0}.'.format(shape[:-1]))
+    if offset < 0 or offset > out.shape[-1]:
+        raise ValueError('Invalid offset: {0}.'.format(offset))
+    count = min(bound, out.shape[-1] - offset)
+    if count <= 0:
+        return 0
+    nouter = out.size // out.shape[-1]
+    if out.dtype != dtype or not out.flags.c_contiguous:
+        # one converting copy, done by numpy
+        raw = <np.uint8_t[:nouter * shape[-1] * itemsize]><np.uint8_t*>src
+        value = np.asarray(raw).view(dtype).reshape(shape)
+        np.copyto(out[..., offset:offset+count], value[..., :count],
+                  casting='unsafe')
+        return count
+    raw = out.reshape(-1).view(np.uint8)
+    src_stride = shape[-1] * itemsize
+    dest_stride = out.shape[-1] * itemsize
+    dest = <char*>&raw[0] + offset * itemsize
+    with nogil:
+        for j in range(nouter):
+            memcpy(dest + j * dest_stride, src + j * src_stride,
+                   count * itemsize)
+    return count
+
+
+cdef class RingBuffer:
+    """
+    Ring buffer into which the values of the parameters of a request are
+    copied as soon as the request arrives, i.e. in the dispatcher thread,
+    before they can be overwritten by the next transfer. Each chunk is tagged
+    with a sequence number and its arrival time.
+
+    The ring buffer is not thread-safe: the request owning it protects its
+    accesses with the request mutex.
+
+    """
+    cdef Ring ring
+    cdef readonly list buffers
+    cdef readonly object bounds
+    cdef readonly object sequences
+    cdef readonly object timestamps
+    cdef list scalars
+    cdef list shapes
+
+    def __cinit__(self, parameters, int size):
+        cdef int i
+        cdef Parameter param
+        cdef RingParameter *p
+        cdef np.uint8_t[::1] raw
+        cdef int[:, ::1] bounds
+        cdef unsigned long long[::1] sequences
+        cdef double[::1] timestamps
+        if size < 1:
+            raise ValueError('Invalid ring buffer size.')
+        parameters = list(parameters)
+        self.ring.params = <RingParameter*>calloc(len(parameters),
+                                                  sizeof(RingParameter))
+        if self.ring.params == NULL:
+            raise MemoryError()
+        self.ring.nparams = len(parameters)
+        self.ring.size = size
+        self.buffers = []
+        self.scalars = []
+        self.shapes = []
+        for i, param in enumerate(parameters):
+            try:
+                dtype = _DTYPES[param.type]
+            except KeyError:
+                raise TypeError("The parameter '{}' cannot be buffered.".
+                                format(param.name))
+            buf = np.zeros((size,) + param.max_shape(), dtype)
+            raw = buf.view(np.uint8).reshape(-1)
+            p = &self.ring.params[i]
+            p.src = <char*>param._ptr
+            p.src_bound = param._ptr_bound
+            p.ubound = param.ubound
+            p.s1 = param.s1
+            p.nouter = param.nouter()
+            p.itemsize = buf.itemsize
+            p.nbytes = buf.nbytes // size
+            p.dest = <char*>&raw[0]
+            self.buffers.append(buf)
+            self.scalars.append(param.s1 == 0)
+            self.shapes.append(param.max_shape())
+        self.bounds = np.zeros((size, max(1, self.ring.nparams)), np.intc)
+        self.sequences = np.zeros(size, np.ulonglong)
+        self.timestamps = np.zeros(size)
+        bounds = self.bounds
+        sequences = self.sequences
+        timestamps = self.timestamps
+        self.ring.bounds = &bounds[0, 0]
+        self.ring.sequences = &sequences[0]
+        self.ring.timestamps = &timestamps[0]
+
+    def __dealloc__(self):
+        free(self.ring.params)
+
+    property size:
+        """ Number of chunks the ring can hold. """
+        def __get__(self):
+            return self.ring.size
+
+    property pending:
+        """ Number of chunks captured and not consumed yet. """
+        def __get__(self):
+            return self.ring.head - self.ring.tail
+
+    property head:
+        """ Sequence number of the next chunk to be captured. """
+        def __get__(self):
+            return self.ring.head
+
+    property overruns:
+        """ Number of chunks overwritten before they could be consumed. """
+        def __get__(self):
+            return self.ring.overruns
+
+    cdef int tail_slot(self):
+        return self.ring.tail % self.ring.size
+
+    def pop(self):
+        """
+        Remove the oldest chunk from the ring and return it as a tuple
+        (values, sequence, timestamp), where values is a tuple containing
+        a copy of each parameter value. Return None if the ring is empty.
+
+        """
+        if self.ring.head == self.ring.tail:
+            return None
+        cdef int slot = self.tail_slot()
+        values = tuple(self._value(i, slot) for i in range(self.ring.nparams))
+        out = (values, int(self.sequences[slot]),
+               float(self.timestamps[slot]))
+        self.ring.tail += 1
+        return out
+
+    cdef int pop_into(self, object outs, Py_ssize_t offset,
+                      Py_ssize_t *counts) except -2:
+        """
+        Copy the oldest chunk into the arrays outs, one per parameter, and
+        remove it from the ring. The number of samples copied for each
+        parameter is stored in counts. Return the slot of the chunk, or -1
+        if the ring is empty.
+
+        """
+        cdef int i, slot
+        cdef RingParameter *p
+        if self.ring.head == self.ring.tail:
+            return -1
+        slot = self.tail_slot()
+        for i in range(self.ring.nparams):
+            p = &self.ring.params[i]
+            counts[i] = chunk_into(
+                p.dest + slot * p.nbytes,
+                self.ring.bounds[slot * self.ring.nparams + i], p.itemsize,
+                self.buffers[i].dtype, self.shapes[i], outs[i], offset)
+        self.ring.tail += 1
+        return slot
+
+    def _value(self, int i, int slot):
+        value = self.buffers[i][slot, ...]
+        if not self.scalars[i]:
+            value = value[..., :self.bounds[slot, i]]
+        return value.copy()
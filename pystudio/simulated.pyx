@@ -0,0 +1,188 @@
+"""
+Extension module linked with the simulated dispatcher access library.
+
+It compiles the same client code as pystudio.pystudio, the requests, ring
+buffers and transfer functions included, against a dispatcher access library
+whose TCP connection is replaced by an in-process dispatcher (see
+src/simulator). The simulated dispatcher serves the parameter table described
+by parameters.csv, generates synthetic TES timelines and executes the
+commands which have an effect on them (Nsample, start and stop of the
+acquisition, DAC values). It is used instead of pystudio.pystudio when the
+environment variable PYSTUDIO_SIMULATOR is set to a non-empty value, which
+may hold its options as whitespace-separated key=value pairs:
+
+     $ PYSTUDIO_SIMULATOR='rate=150000 asics=0,1,2' python benchmark_fetch.py
+
+The simulated ASICs sample their 128 TES at the rate 2MHz / 128 / Nsample
+and the timelines are transferred by chunks of
+QUBIC_PixelScientificDataTimeLineSize samples through the parameters
+QUBIC_PixelScientificDataTimeLine. The transfer functions are the identity.
+
+"""
+from libsimulator cimport (
+    simulator_acquire, simulator_configure, simulator_nbrequests,
+    simulator_set_time, simulator_time, simulator_write)
+
+include "pystudio.pyx"
+
+__all__ = ['SimulatedDispatcherAccess', 'TimeoutError']
+
+
+cdef class SimulatedDispatcherAccess(DispatcherAccess):
+    """
+    Simulated dispatcher access class.
+
+    The options which are not specified are those of the environment variable
+    PYSTUDIO_SIMULATOR or the defaults of the simulated dispatcher.
+
+    Parameters
+    ----------
+    dispatcherAddress : str, optional
+        Ignored.
+    dispatcherPort : int, optional
+        Ignored.
+    nsample : int, optional
+        The initial value of QUBIC_Nsample, which sets the TES sampling rate
+        2MHz / 128 / nsample.
+    rate : float, optional
+        The TES sampling rate in Hz, overriding the one set by nsample.
+    chunk_size : int, optional
+        The number of samples of the timeline chunks. By default, 10 chunks
+        are transferred per second.
+    asics : sequence of int, optional
+        The ASICs acquiring data initially.
+    seed : int, optional
+        The seed of the noise generator.
+    ack_delay : float, optional
+        The time in seconds taken by the acknowledgement of a command, in the
+        waiting-for-ack mode.
+
+    """
+    cdef dict _schema
+
+    def __init__(self, dispatcherAddress=None, dispatcherPort=-1,
+                 nsample=None, rate=None, chunk_size=None, asics=None,
+                 seed=None, ack_delay=None):
+        options = []
+        if nsample is not None:
+            options.append('nsample={0}'.format(int(nsample)))
+        if rate is not None:
+            options.append('rate={0!r}'.format(float(rate)))
+        if chunk_size is not None:
+            options.append('chunk={0}'.format(int(chunk_size)))
+        if asics is not None:
+            options.append('asics={0}'.format(
+                ','.join(str(int(_)) for _ in asics) or 'none'))
+        if seed is not None:
+            options.append('seed={0}'.format(int(seed)))
+        if ack_delay is not None:
+            options.append('ack={0!r}'.format(float(ack_delay) * 1000))
+        if len(options) > 0:
+            self._configure(' '.join(options))
+
+    def _configure(self, str options):
+        """
+        Update the options of the simulated dispatcher, given as in the
+        environment variable PYSTUDIO_SIMULATOR. The acquisition restarts.
+
+        """
+        cdef bytes options_ = options.encode('utf-8')
+        cdef const char *coptions = options_
+        with nogil:
+            self._libraryMutex.lock()
+            simulator_configure(self._da, coptions)
+            self._libraryMutex.unlock()
+
+    def _write(self, str name, value):
+        """
+        Write the value of a parameter into the table of the simulated
+        dispatcher and return the identifiers of the table entries which have
+        been written. The upper bound of a bounded parameter is set to the
+        last dimension of the value. The value of a TF parameter is written
+        into its raw counterpart, the transfer functions being the identity.
+
+        """
+        cdef int index
+        if self._schema is None:
+            self._schema = dict((_[0], _) for _ in read_schema())
+        try:
+            _, ptype, shape, ubound, index, use_tf, meta = self._schema[name]
+        except KeyError:
+            raise ValueError("Undefined parameter '{0}'.".format(name))
+        if use_tf:
+            ptype = self._schema[name[:-3]][1]
+        if ptype == 0x80:
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            self._write_raw(index, np.frombuffer(value, np.uint8))
+            return [index]
+        try:
+            dtype = _DTYPES[ptype]
+        except KeyError:
+            raise TypeError("The parameter '{0}' cannot be written.".format(
+                name))
+        value = np.ascontiguousarray(value, dtype)
+        out = []
+        if ubound is not None and value.ndim > 0:
+            out += self._write(ubound, value.shape[-1])
+        if not meta and (value.ndim <= 1 or value.shape[-1] == shape[-1]):
+            self._write_raw(index, value)
+            out.append(index)
+            return out
+        # the rows of the last dimension are the entries following the
+        # parameter, or the entries of a META parameter
+        first = index if meta else index + 1
+        for i, row in enumerate(value.reshape(-1, value.shape[-1])):
+            self._write_raw(first + i, row)
+            out.append(first + i)
+        return out
+
+    cdef void _write_raw(self, int index, value) except *:
+        cdef const np.uint8_t[::1] raw = value.reshape(-1).view(np.uint8)
+        cdef const void *data = NULL
+        cdef quint32 nbytes = raw.shape[0]
+        cdef bool ok
+        if nbytes > 0:
+            data = &raw[0]
+        with nogil:
+            self._libraryMutex.lock()
+            ok = simulator_write(self._da, index, data, nbytes)
+            self._libraryMutex.unlock()
+        if not ok:
+            raise ValueError('Invalid parameter identifier: {0}.'.format(
+                index))
+
+    def _acquire(self, ids):
+        """
+        Signal the acquisition of the table entries of given identifiers,
+        which triggers the synchronised requests watching them.
+
+        """
+        cdef np.uint32_t[::1] ids_ = np.ascontiguousarray(ids, np.uint32)
+        cdef int n = ids_.shape[0]
+        if n == 0:
+            return
+        with nogil:
+            self._libraryMutex.lock()
+            simulator_acquire(self._da, <const quint32*>&ids_[0], n)
+            self._libraryMutex.unlock()
+
+    def _set_time(self, double time):
+        """
+        Set the time in seconds of the external clock of the simulated
+        dispatcher (option clock=external), on which the delays and periods
+        of the requests are measured.
+
+        """
+        with nogil:
+            self._libraryMutex.lock()
+            simulator_set_time(self._da, time)
+            self._libraryMutex.unlock()
+
+    def _time(self):
+        """ Time of the clock of the simulated dispatcher, in seconds. """
+        return simulator_time(self._da)
+
+    def _nbrequests(self):
+        """ Number of requests served by the simulated dispatcher. """
+        return simulator_nbrequests(self._da)
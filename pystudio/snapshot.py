@@ -0,0 +1,163 @@
+"""
+Housekeeping snapshots as numpy structured records.
+
+A snapshot is the value of a group of scalar and small-array parameters,
+fetched in a single request and stored in a numpy record whose fields are
+the parameter names, plus the field 'time' (the UNIX time of the fetch).
+The record dtype of a group is built from the first fetch of a client and
+reused as long as the types and shapes of the values do not change, e.g.
+those of the bounded parameters, so that the snapshots can be stored in a
+SnapshotHistory, a preallocated record array in which an HK history of
+thousands of samples is one contiguous block.
+
+Example
+-------
+>>> history = SnapshotHistory(3600)
+>>> for i in range(3600):
+...     history.append(client.snapshot('fll'))
+...     time.sleep(1)
+>>> plot(history.data['time'], history.data['QUBIC_FLL_State'][:, 0])
+
+"""
+from __future__ import division
+import time
+import weakref
+import numpy as np
+
+__all__ = ['HK_GROUPS', 'SnapshotHistory', 'snapshot']
+
+HK_GROUPS = {
+    'netquic': ('NETQUIC_Status', 'NETQUIC_HeaderTM_ASIC',
+                'NETQUIC_HeaderTM_RSNum', 'NETQUIC_EchoCN', 'NETQUIC_rate',
+                'NETQUIC_Rate', 'NETQUIC_PIOValue', 'NETQUIC_CN_Failure',
+                'NETQUIC_CN_HKPacket', 'NETQUIC_CN_RawPacket',
+                'NETQUIC_CN_SciencePacket'),
+    'fll': ('QUBIC_FLL_State', 'QUBIC_FLL_P', 'QUBIC_FLL_I', 'QUBIC_FLL_D'),
+    'acquisition': ('QUBIC_Nsample', 'QUBIC_NsampleDesyncho',
+                    'QUBIC_Nsamples'),
+    'dispatcher': ('DISP_ActiveRequestsNumber', 'DISP_NbClientsConnected',
+                   'DISP_PercentIdle', 'DISP_RequestsRate',
+                   'DISP_RunningTime', 'DISP_SubsystemConnectionState',
+                   'DISP_SubsystemsDataTransfered', 'DISP_SubsystemsRate',
+                   'DISP_BackupsState', 'DISP_BackupsHkFilesSize',
+                   'DISP_BackupsRawFilesSize'),
+}
+HK_GROUPS['hk'] = sum((HK_GROUPS[_] for _ in ('netquic', 'fll', 'acquisition',
+                                              'dispatcher')), ())
+
+# record dtypes, by client and tuple of parameter names
+_dtypes = weakref.WeakKeyDictionary()
+
+
+def group_parameters(group):
+    """
+    Return the tuple of the parameter names of a group, which is either the
+    name of a group of HK_GROUPS, a comma-separated string or a sequence of
+    parameter names.
+
+    """
+    if isinstance(group, str):
+        if group in HK_GROUPS:
+            return HK_GROUPS[group]
+        group = group.split(',')
+    names = tuple(_.strip() for _ in group)
+    if len(names) == 0:
+        raise ValueError('The group of parameters is empty.')
+    if 'time' in names or len(set(names)) != len(names):
+        raise ValueError('Invalid group of parameters: {0}.'.format(
+            ', '.join(names)))
+    return names
+
+
+def snapshot(client, group, timeout=None):
+    """
+    Fetch the parameters of a group in a single request and return them as
+    a numpy record, with the additional field 'time'.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    group : str or sequence of str
+        The group of parameters, see group_parameters.
+    timeout : int, optional
+        The request timeout in ms.
+
+    """
+    names = group_parameters(group)
+    kwargs = {} if timeout is None else {'timeout': timeout}
+    values = client.fetch(list(names), **kwargs)
+    now = time.time()
+    if len(names) == 1:
+        values = (values,)
+    values = [np.asarray(_) for _ in values]
+    dtypes = _dtypes.setdefault(client, {})
+    dtype = dtypes.get(names)
+    if dtype is None or any(
+            dtype[n].base != v.dtype or dtype[n].shape != v.shape
+            for n, v in zip(names, values)):
+        dtype = np.dtype([('time', np.float64)] + [
+            (n, v.dtype, v.shape) for n, v in zip(names, values)])
+        dtypes[names] = dtype
+    out = np.empty((), dtype)
+    out['time'] = now
+    for name, value in zip(names, values):
+        out[name] = value
+    return out[()]
+
+
+class SnapshotHistory(object):
+    """
+    Preallocated record array of snapshots.
+
+    The array is allocated by the first append, with the dtype of the
+    snapshot, and its capacity is doubled when it is full. The snapshots
+    whose dtype differs, e.g. after the size of a bounded parameter has
+    changed, are rejected.
+
+    Parameters
+    ----------
+    size : int, optional
+        The initial capacity, in number of snapshots.
+
+    """
+    def __init__(self, size=1024):
+        if size <= 0:
+            raise ValueError('Invalid history size: {0}.'.format(size))
+        self.size = int(size)
+        self.count = 0
+        self._data = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def data(self):
+        """ The record array of the appended snapshots (not a copy). """
+        if self._data is None:
+            return None
+        return self._data[:self.count]
+
+    def append(self, record):
+        """
+        Append a snapshot to the history.
+
+        """
+        if self._data is None:
+            self._data = np.empty(self.size, record.dtype)
+        elif record.dtype != self._data.dtype:
+            raise ValueError('The snapshot does not match the dtype of the '
+                             'history.')
+        if self.count == len(self._data):
+            data = np.empty(2 * len(self._data), self._data.dtype)
+            data[:self.count] = self._data
+            self._data = data
+        self._data[self.count] = record
+        self.count += 1
+
+    def clear(self):
+        """
+        Remove the snapshots, without releasing the array.
+
+        """
+        self.count = 0
@@ -0,0 +1,572 @@
+"""
+Sharing of the dispatcher request slots between several consumers.
+
+A client can only have a few persistent requests at the same time (see
+MAX_NB_REQUEST_PER_CLIENT). The SubscriptionManager sends a single request
+for all the subscriptions with the same trigger: the union of their
+parameters is requested and each arrival is dispatched to the queues of the
+subscriptions, which only see their own parameters.
+
+Example
+-------
+>>> manager = SubscriptionManager(client)
+>>> fll = manager.subscribe(['QUBIC_FLL_State', 'QUBIC_FLL_P'], 1000)
+>>> dacs = manager.subscribe('QUBIC_diffDACValue', 1000)
+>>> manager.nslots
+1
+>>> state, p = fll.next()
+
+The callback subscriptions do not need a consumer loop: a single arrival
+thread per client waits for all their requests at once and the chunks are
+passed to the callbacks, which are run by an executor (a pool of threads by
+default, or any concurrent.futures executor, such as a process pool).
+
+>>> def check_fll(values):
+...     state, p = values
+...     if not state.all():
+...         print('FLL off:', np.flatnonzero(state == 0))
+>>> subscription = client.subscribe(['QUBIC_FLL_State', 'QUBIC_FLL_P'], 1000,
+...                                 check_fll)
+>>> subscription.close()
+
+"""
+from __future__ import division
+from collections import deque
+import threading
+import time
+import warnings
+from .utils import (
+    DEFAULT_RING_SIZE, DEFAULT_TIMEOUT, MAX_NB_REQUEST_PER_CLIENT,
+    PyStudioWarning, _backend)
+
+__all__ = ['CallbackDispatcher', 'SubscriptionManager']
+
+# policies when the queue of a callback subscription is full
+POLICIES = ('drop_oldest', 'block')
+# period in ms at which the arrival thread checks for new subscriptions
+POLL_PERIOD = 100
+
+
+def _split(parameters):
+    if isinstance(parameters, str):
+        parameters = parameters.split(',')
+    return tuple(_.strip() for _ in parameters)
+
+
+class Subscription(object):
+    """
+    Stream of the values of some parameters, shared with the other
+    subscriptions with the same trigger.
+
+    The attributes sequence and timestamp are those of the last chunk returned
+    by the next method. The attribute dropped counts the chunks discarded
+    because the queue of the subscription was full.
+
+    """
+    def __init__(self, group, parameters, maxsize):
+        self.group = group
+        self.parameters = parameters
+        self.queue = deque()
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.sequence = None
+        self.timestamp = None
+
+    def _push(self, values, sequence, timestamp):
+        if len(self.queue) == self.maxsize:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append((tuple(values[_] for _ in self.parameters),
+                           sequence, timestamp))
+
+    def next(self):
+        """
+        Wait for the next chunk and return the values of the subscribed
+        parameters, as a single value or a tuple, like the next method of the
+        requests.
+
+        """
+        out, self.sequence, self.timestamp = self.group.next(self)
+        if len(out) == 1:
+            return out[0]
+        return out
+
+    @property
+    def pending(self):
+        """ Number of chunks received and not returned yet. """
+        return len(self.queue)
+
+    def close(self):
+        """
+        Unsubscribe. The request is aborted when it has no subscriber left.
+
+        """
+        self.group.remove(self)
+
+
+class _Group(object):
+    """
+    The subscriptions sharing a dispatcher request.
+
+    The request is waited for by a single reader at a time, without holding
+    the lock of the group, so that subscribing and closing are not stalled by
+    the wait. Before the request is aborted, the reader is interrupted: it
+    stops polling within POLL_PERIOD ms and does not wait on a request slot
+    which may be reused by another request.
+
+    """
+    def __init__(self, manager, key):
+        self.manager = manager
+        self.key = key
+        self.subscriptions = []
+        self.parameters = ()
+        self.request = None
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self._reading = False
+        self._interrupt = 0
+
+    def add(self, parameters, maxsize):
+        subscription = Subscription(self, parameters, maxsize)
+        with self.lock:
+            missing = [_ for _ in parameters if _ not in self.parameters]
+            if self.request is None or len(missing) > 0:
+                self._send(self.parameters + tuple(missing))
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def remove(self, subscription):
+        with self.lock:
+            if subscription not in self.subscriptions:
+                return
+            self.subscriptions.remove(subscription)
+            empty = len(self.subscriptions) == 0
+            if empty:
+                self._quiesce()
+                self.request.abort()
+                self.request = None
+                self.condition.notify_all()
+        if empty:
+            self.manager._release(self)
+
+    def next(self, subscription):
+        """
+        Return the oldest chunk of a subscription. If there is none, one of
+        the callers waits for the shared request and dispatches its chunk to
+        all the subscriptions, while the other callers wait for the dispatch.
+
+        """
+        while True:
+            with self.condition:
+                while True:
+                    if subscription not in self.subscriptions:
+                        raise RuntimeError('The subscription is closed.')
+                    if len(subscription.queue) > 0:
+                        return subscription.queue.popleft()
+                    if not self._reading:
+                        break
+                    self.condition.wait()
+                self._reading = True
+            try:
+                self._read()
+            finally:
+                with self.condition:
+                    self._reading = False
+                    self.condition.notify_all()
+
+    def _read(self):
+        # wait for the shared request, without the lock, and dispatch its
+        # chunk. Return without chunk if the reader is interrupted.
+        client = self.manager.client
+        start = time.time()
+        while True:
+            with self.lock:
+                if self._interrupt > 0:
+                    return
+                if self.request is None:
+                    raise RuntimeError('The request of the subscription could'
+                                       ' not be sent.')
+                request = self.request
+            if len(client.wait_any([request], POLL_PERIOD)) > 0:
+                break
+            if time.time() - start > request.timeout / 1000:
+                raise _backend.TimeoutError(request.error_msg)
+        # the request cannot have been aborted while it was being read
+        with self.lock:
+            values = request._values()
+            if len(self.parameters) == 1:
+                values = (values,)
+            values = dict(zip(self.parameters, values))
+            for s in self.subscriptions:
+                s._push(values, request.sequence, request.timestamp)
+
+    def _quiesce(self):
+        # to be called with the lock held, before the request is aborted.
+        self._interrupt += 1
+        try:
+            while self._reading:
+                self.condition.wait()
+        finally:
+            self._interrupt -= 1
+
+    def _request(self, parameters):
+        trigger, every = self.key
+        return self.manager.client.request(
+            list(parameters), trigger, every, timeout=self.manager.timeout,
+            ring_size=self.manager.ring_size)
+
+    def _send(self, parameters):
+        # to be called with the lock held. The request is aborted before its
+        # replacement is sent, which therefore does not need an extra slot.
+        # The chunks not consumed yet are lost.
+        previous = None
+        if self.request is not None:
+            previous = self.parameters
+            self._quiesce()
+            self.request.abort()
+            self.request = None
+        try:
+            self.request = self._request(parameters)
+        except Exception:
+            if previous is not None:
+                # the slot just freed is used to restore the request
+                try:
+                    self.request = self._request(previous)
+                except Exception:
+                    pass
+            raise
+        self.parameters = parameters
+
+
+class SubscriptionManager(object):
+    """
+    Multiplexer of the dispatcher persistent requests.
+
+    The subscriptions with the same trigger and the same every argument are
+    served by a single request of the union of their parameters. Subscribing
+    to parameters not yet requested replaces the shared request by a larger
+    one. The number of request slots used is tracked, so that a subscription
+    requiring a new slot when none is left fails early.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    max_requests : int, optional
+        The number of request slots that the manager may use.
+    maxsize : int, optional
+        The default maximum number of chunks queued for each subscription.
+        When the queue is full, the oldest chunk is dropped.
+    timeout : int, optional
+        The timeout in ms of the requests.
+    ring_size : int, optional
+        The size of the ring buffer of the requests.
+
+    """
+    def __init__(self, client, max_requests=MAX_NB_REQUEST_PER_CLIENT,
+                 maxsize=16, timeout=DEFAULT_TIMEOUT,
+                 ring_size=DEFAULT_RING_SIZE):
+        self.client = client
+        self.max_requests = max_requests
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.ring_size = ring_size
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    @property
+    def nslots(self):
+        """ Number of request slots in use. """
+        return len(self.groups)
+
+    @property
+    def available(self):
+        """ Number of request slots which can still be used. """
+        return self.max_requests - len(self.groups)
+
+    def subscribe(self, parameters, trigger=None, every=1, maxsize=None):
+        """
+        Subscribe to parameters. The arguments are those of the request
+        method of the client.
+
+        Returns
+        -------
+        subscription : Subscription
+            The object whose next method returns the values of the
+            parameters.
+
+        """
+        parameters = _split(parameters)
+        if len(parameters) == 0:
+            raise ValueError('No parameter is specified.')
+        if trigger is None:
+            trigger = parameters[0]
+        key = (trigger, every)
+        with self.lock:
+            group = self.groups.get(key)
+            if group is None:
+                if self.available <= 0:
+                    raise RuntimeError(
+                        'No request slot available: {0} requests are already '
+                        'sent.'.format(self.nslots))
+                group = _Group(self, key)
+                self.groups[key] = group
+            try:
+                return group.add(parameters, maxsize or self.maxsize)
+            except Exception:
+                if len(group.subscriptions) == 0:
+                    del self.groups[key]
+                raise
+
+    def _release(self, group):
+        with self.lock:
+            # the group may have been reused in the meantime
+            if self.groups.get(group.key) is group and \
+               len(group.subscriptions) == 0:
+                del self.groups[group.key]
+
+    def close(self):
+        """
+        Abort all the requests.
+
+        """
+        with self.lock:
+            groups = list(self.groups.values())
+        for group in groups:
+            for subscription in list(group.subscriptions):
+                subscription.close()
+
+
+class CallbackSubscription(object):
+    """
+    Subscription whose chunks are passed to a callback.
+
+    The chunks are queued by the arrival thread and the callback is called
+    by the executor with the values of the parameters, as returned by the
+    next method of the requests. The callbacks of a subscription are called
+    one at a time, in the order of arrival, while those of different
+    subscriptions run concurrently.
+
+    Attributes
+    ----------
+    ncalls : int
+        The number of completed callbacks.
+    dropped : int
+        The number of chunks discarded because the queue was full.
+    nerrors : int
+        The number of callbacks which raised an exception, and of timeouts.
+    last_error : Exception
+        The last exception raised by the callback, or the last timeout.
+
+    """
+    def __init__(self, dispatcher, request, callback, executor, maxsize,
+                 policy, on_error):
+        self.dispatcher = dispatcher
+        self.request = request
+        self.callback = callback
+        self.executor = executor
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_error = on_error
+        self.queue = deque()
+        self.ncalls = 0
+        self.dropped = 0
+        self.nerrors = 0
+        self.last_error = None
+        self.last_arrival = time.time()
+        self.closed = False
+        self._running = False
+        self._condition = threading.Condition()
+
+    @property
+    def pending(self):
+        """ Number of chunks queued and not passed to the callback yet. """
+        return len(self.queue)
+
+    def close(self):
+        """
+        Abort the request and discard the queued chunks. The callback which
+        may be running is not interrupted.
+
+        """
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.clear()
+            self._condition.notify_all()
+        self.dispatcher._remove(self)
+
+    def _push(self, values):
+        # called by the arrival thread
+        with self._condition:
+            if self.policy == 'block':
+                while len(self.queue) >= self.maxsize and not self.closed:
+                    self._condition.wait()
+            if self.closed:
+                return
+            if len(self.queue) >= self.maxsize:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(values)
+            if self._running:
+                return
+            self._running = True
+            values = self.queue.popleft()
+        self._submit(values)
+
+    def _submit(self, values):
+        try:
+            future = self.executor.submit(self.callback, values)
+        except Exception as exc:
+            with self._condition:
+                self._running = False
+            self._error(exc)
+            return
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        exc = future.exception()
+        if exc is not None:
+            self._error(exc)
+        with self._condition:
+            self.ncalls += 1
+            self._condition.notify_all()
+            if len(self.queue) == 0 or self.closed:
+                self._running = False
+                return
+            values = self.queue.popleft()
+        self._submit(values)
+
+    def _error(self, exc):
+        self.nerrors += 1
+        self.last_error = exc
+        if self.on_error is not None:
+            self.on_error(exc)
+        else:
+            warnings.warn('Subscription callback {0!r} failed: {1}'.format(
+                self.callback, exc), PyStudioWarning)
+
+
+class CallbackDispatcher(object):
+    """
+    Dispatcher of the arrivals of persistent requests to callbacks.
+
+    Each callback subscription sends its own request. A single arrival thread,
+    which only runs while there are subscriptions, waits for all the requests
+    at once and queues the arrived chunks into the subscriptions. When the
+    queue of a subscription is full, the oldest chunk is dropped with the
+    'drop_oldest' policy, while with the 'block' policy, the arrival thread
+    waits for the callback to catch up. In the latter case, the chunks of the
+    other subscriptions accumulate in the ring buffers of their requests.
+    Before the request of a closed subscription is aborted, the arrival
+    thread completes the iteration in which it waits for it, so that it does
+    not wait on a request slot which may be reused by another request.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    max_workers : int, optional
+        The number of threads of the default executor.
+
+    """
+    def __init__(self, client, max_workers=4):
+        self.client = client
+        self.max_workers = max_workers
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self._executor = None
+        self._thread = None
+        self._waiting = ()
+
+    def subscribe(self, parameters, trigger, callback, every=1, executor=None,
+                  maxsize=16, policy='drop_oldest', on_error=None,
+                  timeout=DEFAULT_TIMEOUT, ring_size=DEFAULT_RING_SIZE):
+        """
+        Send a persistent request and pass its chunks to a callback. See
+        the subscribe method of the client.
+
+        """
+        if not callable(callback):
+            raise TypeError('The callback is not callable.')
+        if policy not in POLICIES:
+            raise ValueError("Invalid policy: '{0}'. Expected: {1}.".format(
+                policy, ', '.join(POLICIES)))
+        if maxsize < 1:
+            raise ValueError('Invalid queue size: {0}.'.format(maxsize))
+        if executor is None:
+            executor = self._default_executor()
+        request = self.client.request(_split(parameters), trigger, every,
+                                      timeout=timeout, ring_size=ring_size)
+        subscription = CallbackSubscription(self, request, callback, executor,
+                                            maxsize, policy, on_error)
+        with self.lock:
+            self.subscriptions[request] = subscription
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='pystudio arrivals')
+                self._thread.daemon = True
+                self._thread.start()
+        return subscription
+
+    def close(self):
+        """
+        Close all the subscriptions and shut the default executor down.
+
+        """
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            subscription.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _default_executor(self):
+        with self.lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(self.max_workers)
+            return self._executor
+
+    def _remove(self, subscription):
+        request = subscription.request
+        with self.condition:
+            if self.subscriptions.get(request) is subscription:
+                del self.subscriptions[request]
+            if threading.current_thread() is not self._thread:
+                while request in self._waiting:
+                    self.condition.wait()
+        request.abort()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self._waiting = ()
+                self.condition.notify_all()
+                requests = list(self.subscriptions)
+                if len(requests) == 0:
+                    self._thread = None
+                    return
+                self._waiting = requests
+            arrived = self.client.wait_any(requests, POLL_PERIOD)
+            now = time.time()
+            for request in requests:
+                subscription = self.subscriptions.get(request)
+                if subscription is None:
+                    continue
+                if request not in arrived:
+                    if now - subscription.last_arrival > \
+                       request.timeout / 1000:
+                        subscription.last_arrival = now
+                        subscription._error(
+                            _backend.TimeoutError(request.error_msg))
+                    continue
+                subscription.last_arrival = now
+                # the arrival consumed by wait_any is not seen by drain if
+                # the request has no ring buffer
+                chunks = request.drain() or [request._values()]
+                for values in chunks:
+                    subscription._push(values)
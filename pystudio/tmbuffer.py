@@ -0,0 +1,298 @@
+"""
+Automatic sizing of the telemetry (TM) buffer and detection of the overruns.
+
+While persistent requests are active, the TMBufferManager of a client
+periodically samples the occupation of the TM buffer of the dispatcher
+access library (stackOccupation, stackSize) and its overlap counter
+(nbOverlap), and resizes the buffer:
+
+    - it is doubled as soon as its occupation exceeds the fraction high of
+      its size, or as soon as an overlap occurs;
+    - it is never smaller than the room required by the active requests,
+      one slot per request times the headroom factor, nor than the size it
+      had when the manager was created: the library stores each TM packet,
+      which carries a chunk of a request, in one slot whatever its size;
+    - it is halved, down to this floor, after its occupation has stayed
+      below the fraction low of its size for shrink_after samples.
+
+The TM packets are stored in the buffer by the kernel thread of the library,
+which reads the socket of the client. The buffer is resized in the thread of
+the Qt event loop, to which the client object belongs, not in the sampling
+thread. The samples taken by check and by the sampling thread are
+serialized, so that a resize is decided from the size it replaces.
+
+A size set by the resizeTMBuffer method of the client becomes the minimum of
+the manager: the buffer can still be grown, but it is never shrunk below
+the size requested by the user.
+
+The overruns, i.e. the increments of the overlap counter of the library and
+of the overrun counters of the ring buffers of the requests, are recorded
+as OverrunEvents. The callbacks registered with on_overrun are called with
+each event (by default, a PyStudioWarning is issued) and the check method
+raises an OverrunError if events occurred since its previous call, so that
+an acquisition can fail explicitly instead of returning corrupted or
+duplicated chunks.
+
+Example
+-------
+>>> client.tm_buffer.on_overrun(lambda event: log.error(str(event)))
+>>> timeline = client.acquire_timeline(0, 100000)
+>>> client.tm_buffer.check()
+
+"""
+from __future__ import division
+from collections import deque, namedtuple
+import threading
+import time
+import warnings
+from .utils import PyStudioWarning
+
+__all__ = ['OverrunError', 'OverrunEvent', 'TMBufferManager']
+
+# the size of the TM buffer is a quint16
+MAX_TM_BUFFER_SIZE = 65535
+
+
+class OverrunEvent(namedtuple('OverrunEvent', 'time kind request count total '
+                                              'stackSize stackOccupation')):
+    """
+    Overrun detected by the TMBufferManager.
+
+    The kind is 'tm_buffer' for an overlap in the TM buffer of the library,
+    in which case request is None, or 'ring' for chunks lost by the ring
+    buffer of a request, whose number is given by request. The attribute
+    count is the increment of the counter and total its value.
+
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.kind == 'ring':
+            what = 'ring buffer of request {0}'.format(self.request)
+        else:
+            what = 'TM buffer'
+        return '{0} overrun(s) of the {1} ({2} in total), TM buffer: {3} / ' \
+               '{4}.'.format(self.count, what, self.total,
+                             self.stackOccupation, self.stackSize)
+
+
+class OverrunError(RuntimeError):
+    """
+    Error raised by TMBufferManager.check when overruns have occurred. The
+    attribute events is the list of the OverrunEvents.
+
+    """
+    def __init__(self, events):
+        self.events = events
+        RuntimeError.__init__(self, '\n'.join(str(_) for _ in events))
+
+
+class TMBufferManager(object):
+    """
+    Watcher of the TM buffer of a client, which resizes it and reports the
+    overruns. It is created by the tm_buffer property of the client and
+    started by the persistent requests.
+
+    Parameters
+    ----------
+    client : DispatcherAccess
+        The dispatcher client.
+    period : float, optional
+        The sampling period in seconds.
+    autosize : boolean, optional
+        If False, the buffer is not resized, but the overruns are still
+        reported.
+    minimum : int, optional
+        The minimum size of the buffer. By default, its size when the
+        manager is created. It is replaced by the size set by the
+        resizeTMBuffer method of the client.
+    maximum : int, optional
+        The maximum size of the buffer.
+    high, low : float, optional
+        The fractions of the size above which the buffer is grown and below
+        which it may be shrunk.
+    headroom : float, optional
+        The factor applied to the room required by the active requests.
+    shrink_after : int, optional
+        The number of samples of low occupation after which the buffer is
+        shrunk.
+
+    Attributes
+    ----------
+    noverlaps : int
+        The number of overlaps in the TM buffer since the manager started.
+    nring_overruns : int
+        The number of chunks lost by the ring buffers of the requests.
+    nresizes : int
+        The number of resizes of the buffer.
+    events : deque of OverrunEvent
+        The last overrun events.
+
+    """
+    def __init__(self, client, period=0.5, autosize=True, minimum=None,
+                 maximum=MAX_TM_BUFFER_SIZE, high=0.75, low=0.25,
+                 headroom=2., shrink_after=20):
+        if not 0 < low < high <= 1:
+            raise ValueError('Invalid occupation fractions.')
+        self.client = client
+        self.period = period
+        self.autosize = autosize
+        self.minimum = client.stackSize if minimum is None else minimum
+        self.maximum = min(maximum, MAX_TM_BUFFER_SIZE)
+        self.high = high
+        self.low = low
+        self.headroom = headroom
+        self.shrink_after = shrink_after
+        self.noverlaps = 0
+        self.nring_overruns = 0
+        self.nresizes = 0
+        self.events = deque(maxlen=1000)
+        self._callbacks = []
+        self._nchecked = 0
+        self._nevents = 0
+        self._overlap = None
+        self._ring_overruns = {}
+        self._nlow = 0
+        self._lock = threading.Lock()
+        self._sampling = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def on_overrun(self, callback):
+        """
+        Register a function called with each OverrunEvent, instead of the
+        warning.
+
+        """
+        self._callbacks.append(callback)
+
+    def watch(self):
+        """
+        Start the sampling thread, if it is not running. The thread stops by
+        itself when there are no more active requests.
+
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run,
+                                            name='pystudio TM buffer')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def check(self):
+        """
+        Raise an OverrunError if overruns have occurred since the previous
+        call.
+
+        """
+        self.sample()
+        with self._lock:
+            n = self._nevents - self._nchecked
+            self._nchecked = self._nevents
+            events = list(self.events)[-n:] if n > 0 else []
+        if n > 0:
+            raise OverrunError(events)
+
+    def required(self, requests=None):
+        """
+        Return the size of the buffer required by the active requests.
+
+        """
+        if requests is None:
+            requests = self.client.active_requests
+        return int(min(self.maximum, max(self.minimum,
+                                         self.headroom * len(requests))))
+
+    def sample(self):
+        """
+        Sample the TM buffer, record the overruns and resize the buffer if
+        necessary. Return the new size of the buffer.
+
+        """
+        with self._sampling:
+            size, events = self._sample()
+        for event in events:
+            self._report(event)
+        return size
+
+    def _pin(self, size):
+        # the buffer has been resized by the user
+        with self._sampling:
+            self.minimum = min(size, self.maximum)
+            self._nlow = 0
+
+    def _sample(self):
+        client = self.client
+        requests = client.active_requests
+        size = client.stackSize
+        occupation = client.stackOccupation
+        overlap = client.nbOverlap
+        events = []
+        with self._lock:
+            if self._overlap is not None and overlap > self._overlap:
+                self.noverlaps += overlap - self._overlap
+                events.append(OverrunEvent(
+                    time.time(), 'tm_buffer', None, overlap - self._overlap,
+                    overlap, size, occupation))
+            self._overlap = overlap
+            ring_overruns = {}
+            for request in requests:
+                key = id(request)
+                overruns = request.overruns
+                ring_overruns[key] = overruns
+                previous = self._ring_overruns.get(key, 0)
+                if overruns > previous:
+                    self.nring_overruns += overruns - previous
+                    events.append(OverrunEvent(
+                        time.time(), 'ring', request.id, overruns - previous,
+                        overruns, size, occupation))
+            self._ring_overruns = ring_overruns
+            self.events.extend(events)
+            self._nevents += len(events)
+        if not self.autosize:
+            return size, events
+        target = self._target(size, occupation, requests,
+                              any(_.kind == 'tm_buffer' for _ in events))
+        if target != size:
+            client._resize_tm_buffer(target)
+            self.nresizes += 1
+        return target, events
+
+    def _target(self, size, occupation, requests, overlapped):
+        floor = self.required(requests)
+        if overlapped or occupation >= self.high * size:
+            self._nlow = 0
+            return max(floor, min(self.maximum, 2 * size))
+        if occupation < self.low * size:
+            self._nlow += 1
+        else:
+            self._nlow = 0
+        if self._nlow >= self.shrink_after:
+            self._nlow = 0
+            return max(floor, size // 2)
+        return max(floor, size)
+
+    def _report(self, event):
+        if len(self._callbacks) == 0:
+            warnings.warn(str(event), PyStudioWarning)
+            return
+        for callback in self._callbacks:
+            callback(event)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if len(self.client.active_requests) == 0:
+                    self._thread = None
+                    self._overlap = None
+                    return
+            try:
+                self.sample()
+            except Exception as exc:
+                warnings.warn('TM buffer sampling failed: {0}'.format(exc),
+                              PyStudioWarning)
+            time.sleep(self.period)
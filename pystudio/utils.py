@@ -1,8 +1,17 @@
-from .pystudio import (
-    _MAX_NB_REQUEST_PER_CLIENT as MAX_NB_REQUEST_PER_CLIENT,
-    _META_FLAG as META_FLAG, _TF_FLAG as TF_FLAG)
+import os
 import warnings
 
+if os.environ.get('PYSTUDIO_SIMULATOR') or os.environ.get('PYSTUDIO_REPLAY'):
+    from . import simulated as _backend
+else:
+    from . import pystudio as _backend
+
+MAX_NB_REQUEST_PER_CLIENT = _backend._MAX_NB_REQUEST_PER_CLIENT
+META_FLAG = _backend._META_FLAG
+TF_FLAG = _backend._TF_FLAG
+DEFAULT_RING_SIZE = _backend.DEFAULT_RING_SIZE
+DEFAULT_TIMEOUT = _backend.DEFAULT_TIMEOUT
+
 
 class PyStudioWarning(UserWarning):
     pass
@@ -99,17 +99,10 @@ def integrate_scientific_data(self):
     self.debugmsg('period=%.3f msec' % (1000*period))
     self.debugmsg ('integration_time=%.2f' % self.tinteg)
     timeline_size = int(np.ceil(self.tinteg / period))
-    chunk_size = client.fetch('QUBIC_PixelScientificDataTimeLineSize')
-    timeline = np.empty((self.NPIXELS, timeline_size))
-    parameter = 'QUBIC_PixelScientificDataTimeLine_{}'.format(self.QS_asic_index)
-    req = client.request(parameter)
-    istart = 0
-    for i in range(int(np.ceil(timeline_size / chunk_size))):
-        delta = min(chunk_size, timeline_size - istart)
-        timeline[:, istart:istart+delta] = req.next()[:, :delta]
-        istart += chunk_size
-    req.abort()
-    return timeline
+    # the analysis expects double precision, as returned before: the samples
+    # are cast as they are copied into the timeline
+    return client.acquire_timeline(self.QS_asic_index, timeline_size,
+                                   dtype=np.float64)
 
 def set_VoffsetTES(self,tension, amplitude):
     client = self.connect_QubicStudio()
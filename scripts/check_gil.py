@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+'''
+$Id: check_gil.py
+$created: Fri 16 Oct 2026 15:02:11 CEST
+$license: GPLv3 or later, see https://www.gnu.org/licenses/gpl-3.0.txt
+
+          This is free software: you are free to change and
+          redistribute it.  There is NO WARRANTY, to the extent
+          permitted by law.
+
+check that a Python thread keeps running while the main thread is blocked
+in a call to the dispatcher access library: waitMs, acknowledged commands
+and request round trips.
+
+A counter thread increments a counter in a tight loop. For each blocking
+call, the number of increments per second is compared with that measured
+while the main thread sleeps. If the GIL is held during the call, the
+counter does not progress.
+
+     $ python check_gil.py 192.168.2.8
+     $ PYSTUDIO_SIMULATOR=1 python check_gil.py
+
+The check runs against the compiled extension in both cases: with
+PYSTUDIO_SIMULATOR, the client is the SimulatedDispatcherAccess of the
+extension pystudio.simulated, which compiles the same Cython code as
+pystudio.pystudio, only linked with the simulated dispatcher access library
+of src/simulator instead of the TCP one. The GIL release and the library
+lock are thus those of the actual client, but the blocking times are those
+of the simulated dispatcher.
+'''
+from __future__ import division, print_function
+import argparse
+import sys
+import threading
+import time
+import pystudio
+
+parser = argparse.ArgumentParser()
+parser.add_argument('address', nargs='?', default=None,
+                    help='dispatcher address (default: localhost)')
+parser.add_argument('--port', type=int, default=3002)
+parser.add_argument('--asic', type=int, default=0,
+                    help='ASIC to which the GetStatus commands are sent')
+parser.add_argument('--ncommands', type=int, default=20)
+parser.add_argument('--threshold', type=float, default=0.2,
+                    help='minimum progress of the counter thread, relative '
+                    'to its progress while the main thread sleeps')
+args = parser.parse_args()
+
+count = 0
+stopped = False
+
+
+def counter():
+    global count
+    while not stopped:
+        count += 1
+
+
+def progress(func):
+    # increments per second of the counter during the call of func
+    count0 = count
+    t0 = time.time()
+    func()
+    return (count - count0) / (time.time() - t0)
+
+
+if args.address is None:
+    client = pystudio.DispatcherAccess()
+else:
+    client = pystudio.DispatcherAccess(args.address, args.port)
+time.sleep(3)
+if not client.connected:
+    raise SystemExit('could not connect to the dispatcher')
+
+
+def commands():
+    client.waitingForAckMode = True
+    try:
+        for i in range(args.ncommands):
+            client.sendGetStatus(args.asic)
+    finally:
+        client.waitingForAckMode = False
+
+
+def fetches():
+    for i in range(args.ncommands):
+        client.fetch('QUBIC_Nsample')
+
+
+thread = threading.Thread(target=counter)
+thread.daemon = True
+thread.start()
+reference = progress(lambda: time.sleep(1))
+tests = [('waitMs(1000)', lambda: client.waitMs(1000)),
+         ('{} acknowledged commands'.format(args.ncommands), commands),
+         ('{} fetches'.format(args.ncommands), fetches)]
+failed = False
+print('client: {0}.{1}'.format(type(client).__module__,
+                               type(client).__name__))
+print('counter thread: {:.3g} increments/s while sleeping'.format(reference))
+for name, func in tests:
+    ratio = progress(func) / reference
+    status = 'ok' if ratio >= args.threshold else 'BLOCKED'
+    failed |= status != 'ok'
+    print('{:<30} {:6.1%}  {}'.format(name, ratio, status))
+stopped = True
+sys.exit(1 if failed else 0)
@@ -1,5 +1,6 @@
 #! /usr/bin/env python
 
+import glob
 import hooks
 import os
 import sys
@@ -18,7 +19,7 @@ LICENSE          = 'GPL'
 DOWNLOAD_URL     = 'https://github.com/satorchi/pystudio'
 VERSION          = '2.0.0'
 hooks.FILE_PREPROCESS = 'preprocess.py'
-hooks.MIN_VERSION_CYTHON = '0.23'
+hooks.MIN_VERSION_CYTHON = '0.29.31'
 
 with open('README.md') as f:
     long_description = f.readlines()
@@ -47,15 +48,82 @@ else:
 
 include_dirs = ['include', 'src'] + qt_include
 
+helpers = ('helpers',
+           {'language': 'c++',
+            'sources': ['src/helpers.cpp'],
+            'depends': ['src/helpers.h'],
+            'include_dirs': include_dirs})
 libraries = ['dispatcheraccess',
              'dispatchertf',
              'Qt5Core',
              'Qt5Gui',
-             ('helpers',
-              {'language': 'c++',
-               'sources': ['src/helpers.cpp'],
-               'depends': ['src/helpers.h'],
-               'include_dirs': include_dirs})]
+             helpers]
+
+# the simulated dispatcher access library, whose moc file and parameter table
+# are generated by preprocess.py
+simulator = ('simulator',
+             {'language': 'c++',
+              'sources': [os.path.join('src', 'simulator', _) for _ in (
+                  'moc_tdispatcheraccesskernel.cpp',
+                  'qdispatcherbytearray.cpp',
+                  'simulateddispatcher.cpp',
+                  'simulator.cpp',
+                  'tabstractparameterstable.cpp',
+                  'tcommandencode.cpp',
+                  'tdispatcheraccesskernel.cpp',
+                  'tparameterstable.cpp',
+                  'tparamscomputer.cpp')],
+              'depends': ['src/simulator/simulateddispatcher.h',
+                          'src/simulator/simulator.h'],
+              'include_dirs': include_dirs + ['src/simulator']})
+libraries_simulated = [simulator, helpers, 'Qt5Core', 'Qt5Network', 'Qt5Gui']
+
+depends = ['pystudio/dispatcheraccess.pyx',
+           'pystudio/parameters.pyx',
+           'pystudio/paramscomputer.pyx',
+           'pystudio/pystudio.pyx',
+           'pystudio/requests.pyx',
+           'pystudio/ringbuffer.pyx',
+           'pystudio/libdispatcheraccess.pxd',
+           'pystudio/libhelpers.pxd',
+           'pystudio/libqt.pxd']
+
+ext_modules = []
+
+# the extension module using the simulated dispatcher access library is only
+# built on request, since it requires the Qt moc tool
+if os.environ.get('PYSTUDIO_BUILD_SIMULATOR'):
+    ext_modules.append(
+        Extension('pystudio.simulated',
+                  ['pystudio/simulated.pyx'],
+                  language='c++',
+                  depends=depends + ['pystudio/libsimulator.pxd'],
+                  libraries=libraries_simulated,
+                  include_dirs=include_dirs + ['src/simulator'],
+                  extra_compile_args=['-fopenmp'],
+                  extra_link_args=['-fopenmp']))
+
+# the extension module using the QubicStudio libraries is only built if they
+# are available
+if glob.glob(os.path.join(libdispatcheraccess, 'libdispatcheraccess.*')):
+    ext_modules.append(
+        Extension('pystudio.pystudio',
+                  ['pystudio/pystudio.pyx'],
+                  language='c++',
+                  depends=depends,
+                  libraries=libraries,
+                  include_dirs=include_dirs,
+                  library_dirs=[libdispatcheraccess],
+                  extra_compile_args=['-fopenmp'],
+                  extra_link_args=['-fopenmp'],
+                  runtime_library_dirs=[libdispatcheraccess]))
+elif ext_modules:
+    print("The dispatcher access library is not found in '{0}': only the "
+          "simulated dispatcher is available.".format(libdispatcheraccess))
+else:
+    print("Warning: the dispatcher access library is not found in '{0}' and "
+          "the environment variable PYSTUDIO_BUILD_SIMULATOR is not set: no "
+          "extension module is built.".format(libdispatcheraccess))
 
 setup(install_requires=['numpy'],
       name=DISTNAME,
@@ -80,21 +148,4 @@ setup(install_requires=['numpy'],
           'License :: OSI Approved :: GNU General Public License (GPL)',
           'Topic :: Scientific/Engineering'],
       cmdclass=hooks.cmdclass,
-      ext_modules=[
-          Extension('pystudio.pystudio',
-                    ['pystudio/pystudio.pyx'],
-                    language='c++',
-                    depends=['pystudio/dispatcheraccess.pyx',
-                             'pystudio/parameters.pyx',
-                             'pystudio/paramscomputer.pyx',
-                             'pystudio/requests.pyx',
-                             'pystudio/libdispatcheraccess.pxd',
-                             'pystudio/libhelpers.pxd',
-                             'pystudio/libqt.pxd'],
-                    libraries=libraries,
-                    include_dirs=include_dirs,
-                    library_dirs=[libdispatcheraccess],
-                    runtime_library_dirs=[libdispatcheraccess]
-          )
-      ]
-)
+      ext_modules=ext_modules)
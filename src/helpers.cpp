@@ -1,5 +1,189 @@
 #include "helpers.h"
+#include <QAbstractEventDispatcher>
+#include <QCoreApplication>
+#include <QEvent>
+#include <QThread>
+#include <QTimer>
+#include <condition_variable>
+#include <exception>
+#include <functional>
+#include <mutex>
+#include <thread>
+
+namespace {
+
+// Event carrying a function to be called in the thread of its receiver.
+class FunctionEvent : public QEvent {
+public:
+  FunctionEvent(const std::function<void()>& function)
+    : QEvent(QEvent::User), function(function) {}
+  std::function<void()> function;
+};
+
+class Invoker : public QObject {
+public:
+  bool event(QEvent* event) {
+    if (event->type() != QEvent::User) return QObject::event(event);
+    static_cast<FunctionEvent*>(event)->function();
+    return true;
+  }
+};
+
+std::mutex loop_mutex;
+std::condition_variable loop_started;
+// Object living in the event loop thread started by start_event_loop.
+Invoker* invoker = NULL;
+// The event loop thread, joined by stop_event_loop.
+std::thread loop_thread;
+
+void run_in_event_loop(const std::function<void()>& function) {
+  // Call function in the event loop thread, if any, and wait for its
+  // completion. The exceptions are rethrown in the calling thread.
+  if (invoker == NULL || QThread::currentThread() == invoker->thread()) {
+    function();
+    return;
+  }
+  std::mutex mutex;
+  std::condition_variable condition;
+  bool done = false;
+  std::exception_ptr exception;
+  QCoreApplication::postEvent(invoker, new FunctionEvent([&]() {
+    try {
+      function();
+    } catch (...) {
+      exception = std::current_exception();
+    }
+    std::lock_guard<std::mutex> lock(mutex);
+    done = true;
+    condition.notify_all();
+  }));
+  std::unique_lock<std::mutex> lock(mutex);
+  condition.wait(lock, [&]() { return done; });
+  if (exception) std::rethrow_exception(exception);
+}
+
+void post_in_event_loop(const std::function<void()>& function) {
+  // Call function in the event loop thread, if any, without waiting for its
+  // completion. The functions posted before the event loop is stopped are
+  // still called by its thread.
+  {
+    std::lock_guard<std::mutex> lock(loop_mutex);
+    if (invoker != NULL && QThread::currentThread() != invoker->thread()) {
+      QCoreApplication::postEvent(invoker, new FunctionEvent(function));
+      return;
+    }
+  }
+  function();
+}
+
+}
 
 void connect_request(TDispatcherAccess* object, slot_request slot) {
   QObject::connect(object, &TDispatcherAccess::requestArrived, slot);
 }
+
+void connect_request(TDispatcherAccess* object, slot_client_request slot,
+                     int client) {
+  // The slot is also passed the index of the client, since the request
+  // numbers are only unique within a client.
+  QObject::connect(object, &TDispatcherAccess::requestArrived,
+                   [slot, client](int num) { slot(client, num); });
+}
+
+bool start_event_loop() {
+  // Start a native thread which creates the Qt application and runs its event
+  // loop until stop_event_loop is called. Return false if an application has
+  // already been created by someone else, whose event loop is used instead.
+  std::unique_lock<std::mutex> lock(loop_mutex);
+  if (invoker != NULL) return true;
+  if (QCoreApplication::instance() != NULL) return false;
+  loop_thread = std::thread([]() {
+    static int argc = 0;
+    QCoreApplication app(argc, NULL);
+    QCoreApplication::setQuitLockEnabled(false);
+    Invoker loop_invoker;
+    {
+      std::lock_guard<std::mutex> lock(loop_mutex);
+      invoker = &loop_invoker;
+    }
+    loop_started.notify_all();
+    app.exec();
+    // the functions are now called in the calling thread, those posted in
+    // the meantime are still called here
+    {
+      std::lock_guard<std::mutex> lock(loop_mutex);
+      invoker = NULL;
+    }
+    QCoreApplication::processEvents();
+  });
+  loop_started.wait(lock, []() { return invoker != NULL; });
+  return true;
+}
+
+void stop_event_loop() {
+  // Quit the event loop started by start_event_loop and join its thread, so
+  // that the process can exit. The clients deleted afterwards are deleted in
+  // the calling thread.
+  {
+    std::lock_guard<std::mutex> lock(loop_mutex);
+    if (invoker == NULL) return;
+    if (QThread::currentThread() == invoker->thread()) return;
+    QCoreApplication::postEvent(
+      invoker, new FunctionEvent([]() { QCoreApplication::quit(); }));
+  }
+  loop_thread.join();
+}
+
+TDispatcherAccess* new_dispatcher_access(const QString* address, int port) {
+  // The client is created in the event loop thread, so that its events are
+  // processed by the event loop.
+  TDispatcherAccess* out = NULL;
+  run_in_event_loop([&]() {
+    if (address == NULL) {
+      out = new TDispatcherAccess();
+    } else {
+      out = new TDispatcherAccess(*address, port);
+    }
+  });
+  return out;
+}
+
+void delete_dispatcher_access(TDispatcherAccess* object,
+                              release_client release, int client) {
+  // The object is deleted without waiting, so that the caller can keep the
+  // GIL. Then, unless it is negative, the index of the client is released,
+  // since the object can no longer signal arrivals for it.
+  post_in_event_loop([object, release, client]() {
+    delete object;
+    if (client >= 0) release(client);
+  });
+}
+
+void resize_tm_buffer(TDispatcherAccess* object, quint16 size) {
+  // The TM buffer is filled by the kernel thread of the library, which reads
+  // the socket. It is resized in the event loop thread, to which the client
+  // object belongs, like its creation and deletion.
+  run_in_event_loop([object, size]() { object->resizeTMBuffer(size); });
+}
+
+bool is_event_loop_thread() {
+  QCoreApplication* app = QCoreApplication::instance();
+  return app != NULL && QThread::currentThread() == app->thread();
+}
+
+void wait_for_events(int msecs) {
+  // Block in the event loop until an event is posted, the event loop is
+  // woken up by wake_event_loop or msecs have elapsed, whichever comes first.
+  QTimer timer;
+  timer.setSingleShot(true);
+  timer.start(msecs);
+  QCoreApplication::processEvents(QEventLoop::WaitForMoreEvents);
+}
+
+void wake_event_loop() {
+  QCoreApplication* app = QCoreApplication::instance();
+  if (app == NULL) return;
+  QAbstractEventDispatcher* dispatcher =
+    QAbstractEventDispatcher::instance(app->thread());
+  if (dispatcher != NULL) dispatcher->wakeUp();
+}
@@ -1,5 +1,17 @@
 #include "tdispatcheraccess.h"
 
 typedef void (* slot_request)(int);
+typedef void (* slot_client_request)(int, int);
+typedef void (* release_client)(int);
 
 void connect_request(TDispatcherAccess*, slot_request);
+void connect_request(TDispatcherAccess*, slot_client_request, int client);
+bool start_event_loop();
+void stop_event_loop();
+TDispatcherAccess* new_dispatcher_access(const QString* address, int port);
+void delete_dispatcher_access(TDispatcherAccess*, release_client release,
+                              int client);
+void resize_tm_buffer(TDispatcherAccess*, quint16 size);
+bool is_event_loop_thread();
+void wait_for_events(int msecs);
+void wake_event_loop();
@@ -0,0 +1,223 @@
+#! /usr/bin/env python
+"""
+Generate the parameter table of the simulated dispatcher access library,
+tparameterstable.cpp, from the parameter files of pystudio/data.
+
+The parameters are indexed as in pystudio.parameters.read_all_params, so
+that the table matches the one built by pystudio, whatever the header
+tparameterstable.h shipped with the library. The values of the numeric
+parameters and their TF counterparts are stored in a single zeroed block,
+in which the entries accessing a part of a multi-dimensional parameter point
+into the storage of the whole parameter.
+
+Usage:
+     $ python make_parameterstable.py tparameterstable.cpp
+
+"""
+from __future__ import print_function
+import os
+import runpy
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+PARAMETERS = os.path.join(ROOT, 'pystudio', 'parameters.py')
+ALIGNMENT = 8
+CODAGE_STRING = 0x80
+CODAGE_BYTEARR = 0x40
+NONE = 'SIZE_MAX'
+
+TEMPLATE = """\
+// File generated by src/simulator/make_parameterstable.py. Do not edit.
+#include "tparameterstable.h"
+#include "simulateddispatcher.h"
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+namespace {{
+
+const int NB_ENTRIES = {nentries};
+// the table has at least the NB_PARAMETERS entries of the library header
+const int TABLE_SIZE = NB_ENTRIES > NB_PARAMETERS ? NB_ENTRIES : NB_PARAMETERS;
+const size_t DATA_SIZE = {data_size};
+const int NB_STRINGS = {nstrings};
+
+const char* const NAMES[NB_ENTRIES] = {{
+{names}}};
+
+const quint32 CODAGES[NB_ENTRIES] = {{
+{codages}}};
+
+// offset in the data block, or index in the array of strings
+const size_t OFFSETS[NB_ENTRIES] = {{
+{offsets}}};
+
+// offset of the TF values in the data block, SIZE_MAX if none
+const size_t TF_OFFSETS[NB_ENTRIES] = {{
+{tf_offsets}}};
+
+}}
+
+TParametersTable::TParametersTable() : m_tfComputer(NULL) {{
+  // the data block and the array of strings are stored after the entries
+  // of paramAddress
+  dummyParameter = 0;
+  paramCodage = new quint32[TABLE_SIZE];
+  tfParamArraySize = new quint32[TABLE_SIZE];
+  paramAddress = new void*[TABLE_SIZE + 2];
+  paramAddressTF = new double*[TABLE_SIZE];
+  paramOptions = new quint8[TABLE_SIZE]();
+  paramOptionsInformations = new quint32[TABLE_SIZE]();
+  tabParamReceived = new quint16[TABLE_SIZE]();
+  char* data = static_cast<char*>(calloc(DATA_SIZE + {alignment}, 1));
+  QString* strings = new QString[NB_STRINGS + 1];
+  paramAddress[TABLE_SIZE] = data;
+  paramAddress[TABLE_SIZE + 1] = strings;
+  for (int i = 0; i < TABLE_SIZE; ++i) {{
+    if (i >= NB_ENTRIES) {{
+      // entry of the library header unknown to pystudio
+      paramCodage[i] = 1 << 8;
+      paramAddress[i] = data + DATA_SIZE;
+      paramAddressTF[i] = &dummyParameter;
+      tfParamArraySize[i] = 0;
+      continue;
+    }}
+    paramCodage[i] = CODAGES[i];
+    if (IS_STRING(CODAGES[i])) {{
+      paramAddress[i] = strings + OFFSETS[i];
+    }} else {{
+      paramAddress[i] = data + OFFSETS[i];
+    }}
+    if (TF_OFFSETS[i] == SIZE_MAX) {{
+      paramAddressTF[i] = &dummyParameter;
+      tfParamArraySize[i] = 0;
+    }} else {{
+      paramAddressTF[i] = reinterpret_cast<double*>(data + TF_OFFSETS[i]);
+      tfParamArraySize[i] = ARRAY_SIZE_OF_PARAMETER(CODAGES[i]);
+    }}
+  }}
+  isRunning = true;
+}}
+
+TParametersTable::~TParametersTable() {{
+  free(paramAddress[TABLE_SIZE]);
+  delete[] static_cast<QString*>(paramAddress[TABLE_SIZE + 1]);
+  delete[] paramCodage;
+  delete[] tfParamArraySize;
+  delete[] paramAddress;
+  delete[] paramAddressTF;
+  delete[] paramOptions;
+  delete[] paramOptionsInformations;
+  delete[] tabParamReceived;
+}}
+
+void TParametersTable::resetToDefaultValues() {{
+  memset(paramAddress[TABLE_SIZE], 0, DATA_SIZE + {alignment});
+  QString* strings = static_cast<QString*>(paramAddress[TABLE_SIZE + 1]);
+  for (int i = 0; i < NB_STRINGS; ++i) strings[i].clear();
+}}
+
+int simulatedParameterIndex(const char* name) {{
+  for (int i = 0; i < NB_ENTRIES; ++i) {{
+    if (strcmp(NAMES[i], name) == 0) return i;
+  }}
+  return -1;
+}}
+"""
+
+
+def element_size(ptype):
+    """ Number of bytes of an element, as in simulatedElementSize. """
+    if ptype == CODAGE_STRING:
+        return 0
+    if ptype == CODAGE_BYTEARR:
+        return 1
+    size = (ptype & 7) + 1
+    return 4 if size == 3 else size
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def build_layout(params):
+    """
+    Return the codages, offsets and TF offsets of the parameters returned by
+    read_all_params, the size of the data block and the number of strings.
+    The TF values are stored after the raw values.
+
+    """
+    codages = []
+    offsets = []
+    tf_offsets = []
+    size = 0
+    tf_size = 0
+    nstrings = 0
+    # index of the multi-dimensional parameter and number of its entries,
+    # which follow it in C order
+    parent, nentries = None, 0
+    for i, param in enumerate(params):
+        count = 1
+        for n in param.shape:
+            count *= n
+        codages.append(param.type | count << 8)
+        if parent is not None and i <= parent + nentries:
+            k = i - parent - 1
+            offsets.append(offsets[parent] +
+                           k * count * element_size(param.type))
+            tf_offsets.append(None if tf_offsets[parent] is None else
+                              tf_offsets[parent] + k * count * 8)
+            continue
+        parent = None
+        if param.type == CODAGE_STRING:
+            offsets.append(nstrings)
+            tf_offsets.append(None)
+            nstrings += 1
+            continue
+        offsets.append(size)
+        size = align(size + count * element_size(param.type))
+        if param.use_tf:
+            tf_offsets.append(tf_size)
+            tf_size = align(tf_size + count * 8)
+        else:
+            tf_offsets.append(None)
+        if len(param.shape) > 1:
+            parent, nentries = i, count // param.shape[-1]
+    tf_offsets = [None if _ is None else size + _ for _ in tf_offsets]
+    return codages, offsets, tf_offsets, size + tf_size, nstrings
+
+
+def format_array(values, width=72):
+    lines = []
+    line = ' '
+    for value in values:
+        item = ' {0},'.format(value)
+        if len(line) + len(item) > width:
+            lines.append(line)
+            line = ' '
+        line += item
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def main(filename):
+    params = runpy.run_path(PARAMETERS)['read_all_params']()
+    codages, offsets, tf_offsets, data_size, nstrings = build_layout(params)
+    out = TEMPLATE.format(
+        nentries=len(params),
+        data_size=data_size,
+        nstrings=nstrings,
+        alignment=ALIGNMENT,
+        names=format_array('"{0}"'.format(_.name) for _ in params),
+        codages=format_array('0x{0:x}'.format(_) for _ in codages),
+        offsets=format_array(offsets),
+        tf_offsets=format_array(NONE if _ is None else _ for _ in tf_offsets))
+    with open(filename, 'w') as f:
+        f.write(out)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(__doc__.split('Usage:')[1].strip(), file=sys.stderr)
+        sys.exit(1)
+    main(sys.argv[1])
@@ -0,0 +1,104 @@
+#include "qdispatcherbytearray.h"
+#include "qdispatchertcbytearray.h"
+#include "simulateddispatcher.h"
+#include <stdlib.h>
+
+QDispatcherByteArray::QDispatcherByteArray(quint32 capacity)
+  : m_byteArray(NULL), m_capacity(0), m_size(0) {
+  reserve(capacity);
+}
+
+QDispatcherByteArray::~QDispatcherByteArray() {
+  free(m_byteArray);
+}
+
+void QDispatcherByteArray::reserve(quint32 size) {
+  if (size <= m_capacity) return;
+  quint8* byteArray = static_cast<quint8*>(realloc(m_byteArray, size));
+  if (byteArray == NULL) qFatal("QDispatcherByteArray: out of memory.");
+  m_byteArray = byteArray;
+  m_capacity = size;
+}
+
+void QDispatcherByteArray::resize(quint32 size) {
+  reserve(size);
+  m_size = size;
+}
+
+int QDispatcherByteArray::capacity() {
+  return int(m_capacity);
+}
+
+int QDispatcherByteArray::size() {
+  return int(m_size);
+}
+
+void QDispatcherByteArray::clear() {
+  m_size = 0;
+}
+
+void QDispatcherByteArray::increaseArray(quint32 minimumNewSize) {
+  quint32 capacity = m_capacity < 64 ? 64 : 2 * m_capacity;
+  reserve(capacity < minimumNewSize ? minimumNewSize : capacity);
+}
+
+void QDispatcherByteArray::incSize(quint32 deltaSize) {
+  m_size += deltaSize;
+}
+
+void QDispatcherByteArray::prepareIncSize(quint32 deltaSize) {
+  if (m_size + deltaSize > m_capacity) increaseArray(m_size + deltaSize);
+}
+
+namespace {
+
+void startHeader(QDispatcherTCByteArray* tc, quint16 tcCN, quint8 kind,
+                 quint8 subsysID, quint16 tcID) {
+  tc->clear();
+  tc->append(&tcCN, sizeof(tcCN));
+  tc->append(kind);
+  tc->append(subsysID);
+  tc->append(&tcID, sizeof(tcID));
+}
+
+}
+
+QDispatcherTCByteArray::QDispatcherTCByteArray()
+  : QDispatcherByteArray(), m_subsytemTCStartIndex(SIMULATED_TC_HEADER_SIZE) {
+}
+
+void QDispatcherTCByteArray::startNewTC(quint16 tcCN) {
+  startHeader(this, tcCN, 0, 0, 0);
+}
+
+void QDispatcherTCByteArray::closeTC() {
+  // the simulated telecommands have no end of packet
+}
+
+void QDispatcherTCByteArray::startNewDispatcherKernelTC(quint16 tcCN,
+                                                        quint8 dispatcherTcId) {
+  startHeader(this, tcCN, KERNEL_TC, 0, dispatcherTcId);
+}
+
+void QDispatcherTCByteArray::startNewCustomTC(quint16 tcCN,
+                                              quint16 customTcNum) {
+  startHeader(this, tcCN, CUSTOM_TC, 0, customTcNum);
+}
+
+void QDispatcherTCByteArray::startNewInternTC(quint16 tcCN,
+                                              quint16 customTcNum) {
+  startHeader(this, tcCN, INTERN_TC, 0, customTcNum);
+}
+
+void QDispatcherTCByteArray::startNewSubsystemTC(quint16 tcCN, quint8 subsysID,
+                                                 quint16 tcID) {
+  startHeader(this, tcCN, SUBSYSTEM_TC, subsysID, tcID);
+}
+
+const quint8* QDispatcherTCByteArray::subsystemTCBuffer() {
+  return constData() + m_subsytemTCStartIndex;
+}
+
+quint32 QDispatcherTCByteArray::subsystemTCBufferSize() {
+  return size() - m_subsytemTCStartIndex;
+}
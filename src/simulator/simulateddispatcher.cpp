@@ -0,0 +1,581 @@
+#include "simulateddispatcher.h"
+#include "customdispatcher.h"
+#include "definitions.h"
+#include "tvirtualcommandencode.h"
+#include <QByteArray>
+#include <QString>
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <limits>
+#include <sstream>
+#include <stdexcept>
+
+namespace {
+
+const int NASIC = 16;
+const int NPIXEL = 128;
+const double PI = 3.14159265358979323846;
+// number of samples of the table of Gaussian noise
+const size_t NNOISE = 65536;
+
+std::mutex registry_mutex;
+std::map<TDispatcherAccessKernel*, SimulatedConnection*> registry;
+
+void invalidOption(const std::string& token) {
+  throw std::invalid_argument("Invalid simulator option: '" + token + "'.");
+}
+
+double parseNumber(const std::string& token, const std::string& value,
+                   double minimum, double maximum) {
+  size_t n = 0;
+  double out = 0;
+  try {
+    out = std::stod(value, &n);
+  } catch (const std::exception&) {
+    invalidOption(token);
+  }
+  if (n != value.size() || !(out >= minimum && out <= maximum))
+    invalidOption(token);
+  return out;
+}
+
+std::vector<int> asicList(quint32 asicNum) {
+  // decode the ASIC selection of the commands
+  std::vector<int> out;
+  for (int asic = 0; asic < NASIC; ++asic) {
+    if (asicNum == 0xFF || (asicNum < NASIC && int(asicNum) == asic) ||
+        (asicNum >= NASIC && asicNum & (1u << (asic + 8))))
+      out.push_back(asic);
+  }
+  return out;
+}
+
+// Reader of the arguments of a telecommand.
+struct Arguments {
+  Arguments(const quint8* data, quint32 size)
+    : data(data), size(size), ok(true) {}
+
+  template <typename T> T next() {
+    T out = T();
+    if (size < sizeof(T)) {
+      ok = false;
+      return out;
+    }
+    memcpy(&out, data, sizeof(T));
+    data += sizeof(T);
+    size -= sizeof(T);
+    return out;
+  }
+
+  const quint8* data;
+  quint32 size;
+  bool ok;
+};
+
+template <typename T> void append(QDispatcherByteArray& array, T value) {
+  array.append(&value, sizeof(T));
+}
+
+}
+
+int simulatedElementSize(quint32 codage) {
+  if (IS_STRING(codage)) return 0;
+  if (IS_BYTEARR(codage)) return 1;
+  // the 24-bit integers are stored in 32 bits
+  int size = SIZE_OF_PARAMETER(codage) / 8;
+  return size == 3 ? 4 : size;
+}
+
+quint32 simulatedParameterSize(TAbstractParametersTable* table,
+                               quint32 parameterId) {
+  quint32 codage = table->paramCodage[parameterId & TF_MASK];
+  return simulatedElementSize(codage) * ARRAY_SIZE_OF_PARAMETER(codage);
+}
+
+SimulatorOptions::SimulatorOptions()
+  : rate(0), nsample(100), chunk(0), seed(0), ack(5), decode(0),
+    timeline(true), external(false) {
+  asics.push_back(0);
+  asics.push_back(1);
+}
+
+void SimulatorOptions::parse(const std::string& options) {
+  std::istringstream stream(options);
+  std::string token;
+  while (stream >> token) {
+    if (token == "1") continue;
+    size_t equal = token.find('=');
+    if (equal == std::string::npos) invalidOption(token);
+    std::string key = token.substr(0, equal);
+    std::string value = token.substr(equal + 1);
+    if (key == "rate") {
+      rate = parseNumber(token, value, 0, 1e9);
+    } else if (key == "nsample") {
+      nsample = int(parseNumber(token, value, 1, 65535));
+    } else if (key == "chunk") {
+      chunk = int(parseNumber(token, value, 0, 65535));
+    } else if (key == "asics") {
+      asics.clear();
+      std::istringstream list(value == "none" ? "" : value);
+      std::string asic;
+      while (std::getline(list, asic, ','))
+        asics.push_back(int(parseNumber(token, asic, 0, NASIC - 1)));
+    } else if (key == "seed") {
+      seed = unsigned(parseNumber(token, value, 0, 4294967295.));
+    } else if (key == "ack") {
+      ack = parseNumber(token, value, 0, 60000);
+    } else if (key == "decode") {
+      decode = parseNumber(token, value, 0, 1e12);
+    } else if (key == "source" && (value == "timeline" || value == "none")) {
+      timeline = value == "timeline";
+    } else if (key == "clock" && (value == "steady" || value == "external")) {
+      external = value == "external";
+    } else {
+      invalidOption(token);
+    }
+  }
+}
+
+SimulatedDispatcher::SimulatedDispatcher(const SimulatorOptions& options,
+                                         const Sender& sender)
+  : m_options(options), m_sender(sender), m_tfVersion(0),
+    m_acquiring(NASIC), m_random(options.seed), m_noise(NNOISE),
+    m_offsets(NASIC * NPIXEL), m_frequencies(NASIC * NPIXEL),
+    m_cos(NASIC * NPIXEL), m_sin(NASIC * NPIXEL),
+    m_start(std::chrono::steady_clock::now()), m_externalTime(0),
+    m_stopped(false) {
+  m_nsampleId = simulatedParameterIndex("QUBIC_Nsample");
+  m_nsamplesId = simulatedParameterIndex("QUBIC_Nsamples");
+  m_timelineId = simulatedParameterIndex("QUBIC_PixelScientificDataTimeLine");
+  m_timelineSizeId =
+    simulatedParameterIndex("QUBIC_PixelScientificDataTimeLineSize");
+  m_scientificDataId = simulatedParameterIndex("QUBIC_AllPixelsScientificData");
+  m_scientificDataTFId =
+    simulatedParameterIndex("QUBIC_AllPixelsScientificData_TF");
+  m_diffDACId = simulatedParameterIndex("QUBIC_diffDACValue");
+  m_slowDACId = simulatedParameterIndex("QUBIC_slowDACValue");
+  m_feedbackDACId = simulatedParameterIndex("QUBIC_FeedbackDACValues");
+  m_offsetDACId = simulatedParameterIndex("QUBIC_OffsetDACValues");
+  int clientsId = simulatedParameterIndex("DISP_NbClientsConnected");
+  if (std::min({m_nsampleId, m_nsamplesId, m_timelineId, m_timelineSizeId,
+                m_scientificDataId, m_scientificDataTFId, m_diffDACId,
+                m_slowDACId, m_feedbackDACId, m_offsetDACId, clientsId}) < 0)
+    throw std::logic_error("The simulated parameter table is incomplete.");
+  *address<quint16>(clientsId) = 1;
+
+  std::normal_distribution<float> normal;
+  for (size_t i = 0; i < NNOISE; ++i) m_noise[i] = normal(m_random);
+  std::uniform_real_distribution<double> offset(-1e4, 1e4);
+  std::uniform_real_distribution<double> frequency(0.5, 5);
+  for (int i = 0; i < NASIC * NPIXEL; ++i) {
+    m_offsets[i] = offset(m_random);
+    m_frequencies[i] = frequency(m_random);
+  }
+  reset();
+  m_thread = std::thread(&SimulatedDispatcher::run, this);
+}
+
+SimulatedDispatcher::~SimulatedDispatcher() {
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_stopped = true;
+  }
+  m_wakeup.notify_all();
+  m_thread.join();
+}
+
+void SimulatedDispatcher::configure(const SimulatorOptions& options) {
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_options = options;
+    reset();
+  }
+  m_wakeup.notify_all();
+}
+
+SimulatorOptions SimulatedDispatcher::options() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return m_options;
+}
+
+bool SimulatedDispatcher::addRequest(quint8 requestNum, bool oneShot,
+                                     bool synchronised, quint32 parameterId,
+                                     quint16 frequency,
+                                     const QList<quint32>& parameterList,
+                                     QString* error) {
+  quint32 nbParameters = m_table.nbParameters();
+  for (int i = 0; i < parameterList.count(); ++i) {
+    if ((parameterList.at(i) & TF_MASK) >= nbParameters) {
+      *error = QString("Invalid parameter identifier: %1.")
+        .arg(parameterList.at(i));
+      return false;
+    }
+  }
+  if (synchronised && (parameterId & TF_MASK) >= nbParameters) {
+    *error = QString("Invalid parameter identifier: %1.").arg(parameterId);
+    return false;
+  }
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    Request request;
+    request.oneShot = oneShot;
+    request.synchronised = synchronised;
+    request.count = 0;
+    request.parameterList = parameterList;
+    if (synchronised) {
+      Range watched = range(parameterId);
+      request.watchedBegin = watched.first;
+      request.watchedEnd = watched.second;
+      request.every = std::max<quint16>(frequency, 1);
+      request.period = 0;
+      request.deadline = 0;
+    } else {
+      request.watchedBegin = request.watchedEnd = NULL;
+      request.every = 1;
+      // the period of the persistent requests is at least 1 ms
+      request.period = std::max<int>(frequency, oneShot ? 0 : 1) / 1000.;
+      request.deadline = now() + request.period;
+    }
+    m_requests[requestNum] = request;
+  }
+  m_wakeup.notify_all();
+  return true;
+}
+
+void SimulatedDispatcher::removeRequest(quint8 requestNum) {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  m_requests.erase(requestNum);
+}
+
+void SimulatedDispatcher::removeAllRequests() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  m_requests.clear();
+}
+
+int SimulatedDispatcher::nbRequests() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return int(m_requests.size());
+}
+
+quint8 SimulatedDispatcher::execute(quint8 subsysID, quint16 tcID,
+                                    const quint8* data, quint32 size) {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  if (subsysID != 0 &&
+      std::find(subsystemIds, subsystemIds + NB_SUB_SYSTEMS, subsysID) ==
+      subsystemIds + NB_SUB_SYSTEMS)
+    return ACK_UNKNOW_ID;
+  if (subsysID != MULTINETQUICMANAGER_ID) return ACK_NO_ERROR;
+  std::vector<Range> ranges;
+  Arguments arguments(data, size);
+  switch (tcID) {
+  case MULTINETQUICMANAGER_SETNSAMPLE_ID: {
+    quint16 nsample = arguments.next<quint16>();
+    if (!arguments.ok) break;
+    setNsample(nsample);
+    ranges.push_back(range(m_nsampleId));
+    ranges.push_back(range(m_nsamplesId));
+    ranges.push_back(range(m_timelineSizeId));
+    break;
+  }
+  case MULTINETQUICMANAGER_STARTACQ_ID:
+  case MULTINETQUICMANAGER_STOPACQ_ID: {
+    quint32 asicNum = arguments.next<quint32>();
+    if (!arguments.ok) break;
+    bool acquiring = std::find(m_acquiring.begin(), m_acquiring.end(),
+                               true) != m_acquiring.end();
+    for (int asic : asicList(asicNum))
+      m_acquiring[asic] = tcID == MULTINETQUICMANAGER_STARTACQ_ID;
+    if (!acquiring) m_nextChunk = now();
+    break;
+  }
+  case MULTINETQUICMANAGER_SETDIFFDAC_ID:
+  case MULTINETQUICMANAGER_SETSLOWDAC_ID: {
+    quint32 asicNum = arguments.next<quint32>();
+    quint16 value = arguments.next<quint16>();
+    if (!arguments.ok) break;
+    int id = tcID == MULTINETQUICMANAGER_SETDIFFDAC_ID ? m_diffDACId
+                                                       : m_slowDACId;
+    for (int asic : asicList(asicNum)) address<qint16>(id)[asic] = value;
+    ranges.push_back(range(id));
+    break;
+  }
+  case MULTINETQUICMANAGER_SETFEEDBACKTABLE_ID:
+  case MULTINETQUICMANAGER_SETOFFSETTABLE_ID: {
+    quint32 asicNum = arguments.next<quint32>();
+    quint16 values[NPIXEL];
+    for (int i = 0; i < NPIXEL; ++i) values[i] = arguments.next<quint16>();
+    if (!arguments.ok) break;
+    int id = tcID == MULTINETQUICMANAGER_SETFEEDBACKTABLE_ID
+      ? m_feedbackDACId : m_offsetDACId;
+    for (int asic : asicList(asicNum))
+      for (int i = 0; i < NPIXEL; ++i)
+        address<qint16>(id)[asic * NPIXEL + i] = values[i];
+    ranges.push_back(range(id));
+    break;
+  }
+  }
+  if (!arguments.ok) return ACK_INVALID_COMMAND;
+  trigger(ranges);
+  return ACK_NO_ERROR;
+}
+
+int SimulatedDispatcher::tfVersion() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return m_tfVersion;
+}
+
+void SimulatedDispatcher::reloadTF() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  ++m_tfVersion;
+}
+
+bool SimulatedDispatcher::write(quint32 parameterId, const void* data,
+                                quint32 size) {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  quint32 index = parameterId & TF_MASK;
+  if (index >= m_table.nbParameters()) return false;
+  if (IS_STRING(m_table.paramCodage[index])) {
+    *static_cast<QString*>(m_table.paramAddress[index]) =
+      QString::fromUtf8(static_cast<const char*>(data), int(size));
+    return true;
+  }
+  memcpy(m_table.paramAddress[index], data,
+         std::min(size, simulatedParameterSize(&m_table, index)));
+  return true;
+}
+
+void SimulatedDispatcher::acquire(const quint32* parameterIds, int n) {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  std::vector<Range> ranges;
+  for (int i = 0; i < n; ++i) {
+    if ((parameterIds[i] & TF_MASK) < m_table.nbParameters())
+      ranges.push_back(range(parameterIds[i]));
+  }
+  trigger(ranges);
+}
+
+void SimulatedDispatcher::setTime(double time) {
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_externalTime = time;
+  }
+  m_wakeup.notify_all();
+}
+
+double SimulatedDispatcher::time() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return now();
+}
+
+void SimulatedDispatcher::run() {
+  std::unique_lock<std::mutex> lock(m_mutex);
+  while (!m_stopped) {
+    double time = now();
+    bool acquiring = m_options.timeline &&
+      std::find(m_acquiring.begin(), m_acquiring.end(), true) !=
+      m_acquiring.end();
+    if (acquiring && time >= m_nextChunk) {
+      acquireChunk();
+      // when late, the chunks are sent without waiting
+      m_nextChunk = std::max(m_nextChunk + m_chunk / m_rate, time);
+      continue;
+    }
+    double wakeup = acquiring ? m_nextChunk
+                              : std::numeric_limits<double>::infinity();
+    for (auto it = m_requests.begin(); it != m_requests.end();) {
+      Request& request = it->second;
+      if (request.synchronised) {
+        ++it;
+        continue;
+      }
+      if (time >= request.deadline) {
+        send(it->first, request);
+        if (request.oneShot) {
+          it = m_requests.erase(it);
+          continue;
+        }
+        // the missed periods are skipped
+        request.deadline = std::max(request.deadline + request.period,
+                                    time + request.period / 2);
+      }
+      wakeup = std::min(wakeup, request.deadline);
+      ++it;
+    }
+    if (m_options.external || std::isinf(wakeup)) {
+      m_wakeup.wait(lock);
+    } else {
+      m_wakeup.wait_for(lock, std::chrono::duration<double>(wakeup - time));
+    }
+  }
+}
+
+double SimulatedDispatcher::now() {
+  // to be called with the lock held
+  if (m_options.external) return m_externalTime;
+  return std::chrono::duration<double>(std::chrono::steady_clock::now() -
+                                       m_start).count();
+}
+
+void SimulatedDispatcher::reset() {
+  // to be called with the lock held
+  std::fill(m_acquiring.begin(), m_acquiring.end(), false);
+  for (int asic : m_options.asics) m_acquiring[asic] = true;
+  std::fill(m_cos.begin(), m_cos.end(), 1.);
+  std::fill(m_sin.begin(), m_sin.end(), 0.);
+  m_nsamples = 0;
+  setNsample(m_options.nsample);
+  m_nextChunk = now();
+}
+
+void SimulatedDispatcher::setNsample(int nsample) {
+  // to be called with the lock held
+  m_nsample = std::max(nsample, 1);
+  m_rate = m_options.rate > 0 ? m_options.rate
+                              : 2e6 / NPIXEL / m_nsample;
+  int maxChunk = ARRAY_SIZE_OF_PARAMETER(m_table.paramCodage[m_timelineId]) /
+    (NASIC * NPIXEL);
+  if (m_options.chunk > 0) {
+    m_chunk = std::min(m_options.chunk, maxChunk);
+  } else {
+    m_chunk = std::max(1, std::min(maxChunk, int(m_rate / 10)));
+  }
+  *address<quint16>(m_nsampleId) = quint16(m_nsample);
+  for (int asic = 0; asic < NASIC; ++asic)
+    address<quint16>(m_nsamplesId)[asic] = quint16(m_nsample);
+  *address<quint16>(m_timelineSizeId) = quint16(m_chunk);
+}
+
+void SimulatedDispatcher::acquireChunk() {
+  // to be called with the lock held: generate a chunk of the timelines of
+  // the acquiring ASICs, as sinusoids with Gaussian noise
+  int stride = ARRAY_SIZE_OF_PARAMETER(m_table.paramCodage[m_timelineId]) /
+    (NASIC * NPIXEL);
+  float* timeline = address<float>(m_timelineId);
+  qint32* scientificData = address<qint32>(m_scientificDataId);
+  float* scientificDataTF = address<float>(m_scientificDataTFId);
+  size_t inoise = m_random();
+  std::vector<Range> ranges;
+  for (int asic = 0; asic < NASIC; ++asic) {
+    if (!m_acquiring[asic]) continue;
+    for (int pixel = 0; pixel < NPIXEL; ++pixel) {
+      int i = asic * NPIXEL + pixel;
+      float* row = timeline + size_t(i) * stride;
+      double step = 2 * PI * m_frequencies[i] / m_rate;
+      double cosStep = cos(step);
+      double sinStep = sin(step);
+      double c = m_cos[i];
+      double s = m_sin[i];
+      for (int j = 0; j < m_chunk; ++j) {
+        row[j] = float(m_offsets[i] + 1000 * s +
+                       100 * m_noise[inoise++ % NNOISE]);
+        double c_ = c * cosStep - s * sinStep;
+        s = s * cosStep + c * sinStep;
+        c = c_;
+      }
+      double norm = 1 / sqrt(c * c + s * s);
+      m_cos[i] = c * norm;
+      m_sin[i] = s * norm;
+      scientificData[i] = qint32(row[m_chunk - 1]);
+      scientificDataTF[i] = row[m_chunk - 1];
+    }
+    ranges.push_back(Range(
+      reinterpret_cast<const char*>(timeline + size_t(asic) * NPIXEL * stride),
+      reinterpret_cast<const char*>(timeline +
+                                    size_t(asic + 1) * NPIXEL * stride)));
+    ranges.push_back(Range(
+      reinterpret_cast<const char*>(scientificData + asic * NPIXEL),
+      reinterpret_cast<const char*>(scientificData + (asic + 1) * NPIXEL)));
+    ranges.push_back(Range(
+      reinterpret_cast<const char*>(scientificDataTF + asic * NPIXEL),
+      reinterpret_cast<const char*>(scientificDataTF + (asic + 1) * NPIXEL)));
+  }
+  ranges.push_back(range(m_timelineSizeId));
+  m_nsamples += m_chunk;
+  trigger(ranges);
+}
+
+void SimulatedDispatcher::trigger(const std::vector<Range>& ranges) {
+  // to be called with the lock held: send the synchronised requests whose
+  // watched parameter overlaps the acquired ranges of the table
+  for (auto it = m_requests.begin(); it != m_requests.end();) {
+    Request& request = it->second;
+    bool acquired = false;
+    for (const Range& range : ranges) {
+      if (range.first < request.watchedEnd &&
+          request.watchedBegin < range.second) {
+        acquired = true;
+        break;
+      }
+    }
+    if (!request.synchronised || !acquired ||
+        ++request.count % request.every != 0) {
+      ++it;
+      continue;
+    }
+    send(it->first, request);
+    if (request.oneShot) {
+      it = m_requests.erase(it);
+    } else {
+      ++it;
+    }
+  }
+}
+
+void SimulatedDispatcher::send(quint8 requestNum, const Request& request) {
+  // to be called with the lock held: encode the requested parameters of the
+  // table into a TM packet
+  m_tm.clear();
+  append<quint8>(m_tm, requestNum);
+  append<quint16>(m_tm, quint16(request.parameterList.count()));
+  for (int i = 0; i < request.parameterList.count(); ++i) {
+    quint32 parameterId = request.parameterList.at(i);
+    quint32 index = parameterId & TF_MASK;
+    append<quint32>(m_tm, parameterId);
+    if (IS_STRING(m_table.paramCodage[index])) {
+      QByteArray value =
+        static_cast<QString*>(m_table.paramAddress[index])->toUtf8();
+      append<quint32>(m_tm, quint32(value.size()));
+      m_tm.append(value.constData(), quint32(value.size()));
+    } else {
+      quint32 size = simulatedParameterSize(&m_table, index);
+      append<quint32>(m_tm, size);
+      m_tm.append(m_table.paramAddress[index], size);
+    }
+  }
+  m_sender(m_tm);
+}
+
+SimulatedDispatcher::Range SimulatedDispatcher::range(quint32 parameterId) {
+  quint32 index = parameterId & TF_MASK;
+  const char* begin = static_cast<const char*>(m_table.paramAddress[index]);
+  quint32 size = IS_STRING(m_table.paramCodage[index])
+    ? sizeof(QString) : simulatedParameterSize(&m_table, index);
+  return Range(begin, begin + std::max<quint32>(size, 1));
+}
+
+template <typename T> T* SimulatedDispatcher::address(int index) {
+  return static_cast<T*>(m_table.paramAddress[index]);
+}
+
+SimulatedConnection* SimulatedConnection::of(TDispatcherAccessKernel* kernel) {
+  std::lock_guard<std::mutex> lock(registry_mutex);
+  auto it = registry.find(kernel);
+  return it == registry.end() ? NULL : it->second;
+}
+
+void SimulatedConnection::add(TDispatcherAccessKernel* kernel,
+                              SimulatedConnection* connection) {
+  std::lock_guard<std::mutex> lock(registry_mutex);
+  registry[kernel] = connection;
+}
+
+SimulatedConnection* SimulatedConnection::remove(
+    TDispatcherAccessKernel* kernel) {
+  std::lock_guard<std::mutex> lock(registry_mutex);
+  auto it = registry.find(kernel);
+  if (it == registry.end()) return NULL;
+  SimulatedConnection* out = it->second;
+  registry.erase(it);
+  return out;
+}
@@ -0,0 +1,194 @@
+#ifndef SIMULATEDDISPATCHER_H
+#define SIMULATEDDISPATCHER_H
+
+#include "qdispatcherbytearray.h"
+#include "tparameterstable.h"
+#include <QElapsedTimer>
+#include <QList>
+#include <QSemaphore>
+#include <chrono>
+#include <condition_variable>
+#include <functional>
+#include <map>
+#include <mutex>
+#include <random>
+#include <string>
+#include <thread>
+#include <vector>
+
+class TDispatcherAccessKernel;
+
+// Index of a parameter of the simulated table given its name, -1 if unknown.
+// It is defined in the generated file tparameterstable.cpp.
+int simulatedParameterIndex(const char* name);
+
+// Number of bytes of an element of a parameter, 0 for the strings.
+int simulatedElementSize(quint32 codage);
+
+// Number of bytes of a parameter of the table, 0 for the strings.
+quint32 simulatedParameterSize(TAbstractParametersTable* table,
+                               quint32 parameterId);
+
+// Compute the TF values of a parameter of the table from its raw values. The
+// simulated transfer functions are the identity.
+void simulatedUpdateTF(TAbstractParametersTable* table, quint32 parameterId);
+
+// Layout of the telecommands built by QDispatcherTCByteArray: the command
+// number (quint16), the kind of telecommand (quint8), the subsystem (quint8)
+// and the command identifier (quint16), followed by the arguments encoded in
+// little-endian order. The strings and byte arrays are prefixed by their
+// number of bytes (quint32) and the strings are encoded in UTF-8.
+enum SimulatedTCKind {
+  KERNEL_TC = 1,
+  CUSTOM_TC,
+  INTERN_TC,
+  SUBSYSTEM_TC
+};
+const quint32 SIMULATED_TC_HEADER_SIZE = 6;
+
+// Options of the simulated dispatcher, read from the environment variable
+// PYSTUDIO_SIMULATOR as whitespace-separated key=value pairs, such as
+// "rate=150000 asics=0,1,2". The value 1 keeps the default options.
+struct SimulatorOptions {
+  SimulatorOptions();
+  void parse(const std::string& options);
+
+  double rate;       // TES sampling rate in Hz, 0 for 2MHz / 128 / nsample
+  int nsample;       // initial value of QUBIC_Nsample
+  int chunk;         // samples per timeline chunk, 0 for 10 chunks per second
+  std::vector<int> asics;  // ASICs acquiring initially
+  unsigned seed;     // seed of the noise generator
+  double ack;        // duration of the acknowledgement of a command in ms
+  double decode;     // decoding speed of the client in bytes/s, 0 if unlimited
+  bool timeline;     // the synthetic timelines are generated
+  bool external;     // the clock is set by simulator_set_time
+};
+
+// Simulated dispatcher, which stands for the QubicStudio dispatcher at the
+// other end of the TCP socket of a client. It holds its own parameter table,
+// generates the synthetic TES timelines, executes the commands and serves
+// the requests of the client by sending it TM packets, in its own thread.
+//
+// A TM packet is encoded as the request number (quint8), the number of
+// parameters (quint16) and, for each parameter, its identifier (quint32,
+// with the flag TF_FLAG if the TF value is requested), the number of bytes
+// of its value (quint32) and the value. The strings are encoded in UTF-8.
+class SimulatedDispatcher {
+public:
+  typedef std::function<void(QDispatcherByteArray&)> Sender;
+
+  SimulatedDispatcher(const SimulatorOptions& options, const Sender& sender);
+  ~SimulatedDispatcher();
+
+  // Replace the options. The acquisition restarts from the first sample.
+  void configure(const SimulatorOptions& options);
+  SimulatorOptions options();
+
+  bool addRequest(quint8 requestNum, bool oneShot, bool synchronised,
+                  quint32 parameterId, quint16 frequency,
+                  const QList<quint32>& parameterList, QString* error);
+  void removeRequest(quint8 requestNum);
+  void removeAllRequests();
+  int nbRequests();
+
+  // Execute a telecommand of a subsystem, or of the dispatcher itself if
+  // subsysID is 0, whose arguments are encoded in data. Return an ACK code.
+  quint8 execute(quint8 subsysID, quint16 tcID, const quint8* data,
+                 quint32 size);
+  int tfVersion();
+  void reloadTF();
+
+  // Write the value of a parameter of the dispatcher table.
+  bool write(quint32 parameterId, const void* data, quint32 size);
+  // Signal the acquisition of parameters, which triggers the synchronised
+  // requests watching them.
+  void acquire(const quint32* parameterIds, int n);
+  // Set the time of the external clock, in seconds.
+  void setTime(double time);
+  double time();
+
+private:
+  struct Request {
+    bool oneShot;
+    bool synchronised;
+    const char* watchedBegin;
+    const char* watchedEnd;
+    quint16 every;
+    quint32 count;
+    double period;
+    double deadline;
+    QList<quint32> parameterList;
+  };
+  typedef std::pair<const char*, const char*> Range;
+
+  void run();
+  double now();
+  void reset();
+  void setNsample(int nsample);
+  void acquireChunk();
+  void trigger(const std::vector<Range>& ranges);
+  void send(quint8 requestNum, const Request& request);
+  Range range(quint32 parameterId);
+  template <typename T> T* address(int index);
+
+  SimulatorOptions m_options;
+  Sender m_sender;
+  TParametersTable m_table;
+  std::map<quint8, Request> m_requests;
+  QDispatcherByteArray m_tm;
+  int m_tfVersion;
+
+  // synthetic timelines
+  int m_nsample;
+  int m_chunk;
+  double m_rate;
+  std::vector<bool> m_acquiring;
+  unsigned long long m_nsamples;
+  double m_nextChunk;
+  std::mt19937 m_random;
+  std::vector<float> m_noise;
+  std::vector<double> m_offsets;
+  std::vector<double> m_frequencies;
+  std::vector<double> m_cos;
+  std::vector<double> m_sin;
+
+  // indices of the parameters of the table
+  int m_nsampleId;
+  int m_nsamplesId;
+  int m_timelineId;
+  int m_timelineSizeId;
+  int m_scientificDataId;
+  int m_scientificDataTFId;
+  int m_diffDACId;
+  int m_slowDACId;
+  int m_feedbackDACId;
+  int m_offsetDACId;
+
+  std::chrono::steady_clock::time_point m_start;
+  double m_externalTime;
+  bool m_stopped;
+  std::mutex m_mutex;
+  std::condition_variable m_wakeup;
+  std::thread m_thread;
+};
+
+// Connection of a client to its simulated dispatcher. It stands for the TCP
+// socket of the dispatcher access library.
+struct SimulatedConnection {
+  SimulatedConnection(const SimulatorOptions& options,
+                      const SimulatedDispatcher::Sender& sender)
+    : dispatcher(options, sender) {}
+
+  static SimulatedConnection* of(TDispatcherAccessKernel* kernel);
+  static void add(TDispatcherAccessKernel* kernel,
+                  SimulatedConnection* connection);
+  static SimulatedConnection* remove(TDispatcherAccessKernel* kernel);
+
+  SimulatedDispatcher dispatcher;
+  // released for each TM packet received
+  QSemaphore received;
+  // time of the last update of the request and data rates
+  QElapsedTimer rateTimer;
+};
+
+#endif
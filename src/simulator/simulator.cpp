@@ -0,0 +1,38 @@
+#include "simulator.h"
+#include "simulateddispatcher.h"
+
+namespace {
+
+SimulatedDispatcher& dispatcher(TDispatcherAccess* object) {
+  return SimulatedConnection::of(object)->dispatcher;
+}
+
+}
+
+void simulator_configure(TDispatcherAccess* object, const char* options) {
+  SimulatorOptions out = dispatcher(object).options();
+  out.parse(options);
+  dispatcher(object).configure(out);
+}
+
+void simulator_set_time(TDispatcherAccess* object, double time) {
+  dispatcher(object).setTime(time);
+}
+
+double simulator_time(TDispatcherAccess* object) {
+  return dispatcher(object).time();
+}
+
+bool simulator_write(TDispatcherAccess* object, quint32 parameterId,
+                     const void* data, quint32 nbytes) {
+  return dispatcher(object).write(parameterId, data, nbytes);
+}
+
+void simulator_acquire(TDispatcherAccess* object, const quint32* parameterIds,
+                       int n) {
+  dispatcher(object).acquire(parameterIds, n);
+}
+
+int simulator_nbrequests(TDispatcherAccess* object) {
+  return dispatcher(object).nbRequests();
+}
@@ -0,0 +1,19 @@
+#include "tdispatcheraccess.h"
+
+// Control of the simulated dispatcher of a client, for the extension module
+// pystudio.simulated.
+
+// Update the options of the simulated dispatcher, given as in the
+// environment variable PYSTUDIO_SIMULATOR. The acquisition restarts.
+void simulator_configure(TDispatcherAccess* object, const char* options);
+// Set the time of the external clock, in seconds.
+void simulator_set_time(TDispatcherAccess* object, double time);
+double simulator_time(TDispatcherAccess* object);
+// Write the value of a parameter in the table of the dispatcher.
+bool simulator_write(TDispatcherAccess* object, quint32 parameterId,
+                     const void* data, quint32 nbytes);
+// Trigger the requests watching the given parameters.
+void simulator_acquire(TDispatcherAccess* object, const quint32* parameterIds,
+                       int n);
+// Number of requests served by the dispatcher.
+int simulator_nbrequests(TDispatcherAccess* object);
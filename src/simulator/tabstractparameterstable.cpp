@@ -0,0 +1,59 @@
+#include "tparameterstable.h"
+#include <QByteArray>
+#include <QMutexLocker>
+#include <string.h>
+
+// The layout of the simulated parameter table is defined in the generated
+// file tparameterstable.cpp.
+
+TAbstractParametersTable::TAbstractParametersTable()
+  : paramCodage(NULL), tfParamArraySize(NULL), paramAddress(NULL),
+    paramAddressTF(NULL), paramOptions(NULL), paramOptionsInformations(NULL),
+    tabParamReceived(NULL), isRunning(false) {}
+
+void TAbstractParametersTable::reloadTF() {}
+
+QString TAbstractParametersTable::stringValue(quint32 parameterId) {
+  QMutexLocker locker(&m_stringOrByteArrMutex);
+  quint32 index = parameterId & TF_MASK;
+  if (!IS_STRING(paramCodage[index])) return QString();
+  return *static_cast<QString*>(paramAddress[index]);
+}
+
+int TAbstractParametersTable::setStringValue(quint32 parameterId,
+                                             const char* string) {
+  QMutexLocker locker(&m_stringOrByteArrMutex);
+  quint32 index = parameterId & TF_MASK;
+  if (!IS_STRING(paramCodage[index])) return 0;
+  QString* value = static_cast<QString*>(paramAddress[index]);
+  *value = QString::fromUtf8(string);
+  return value->size();
+}
+
+QByteArray TAbstractParametersTable::byteArrayValue(quint32 parameterId) {
+  QMutexLocker locker(&m_stringOrByteArrMutex);
+  quint32 index = parameterId & TF_MASK;
+  if (!IS_BYTEARR(paramCodage[index])) return QByteArray();
+  return QByteArray(static_cast<const char*>(paramAddress[index]),
+                    ARRAY_SIZE_OF_PARAMETER(paramCodage[index]));
+}
+
+int TAbstractParametersTable::setByteArrayValue(quint32 parameterId,
+                                                const char* buffer, int size) {
+  QMutexLocker locker(&m_stringOrByteArrMutex);
+  quint32 index = parameterId & TF_MASK;
+  if (!IS_BYTEARR(paramCodage[index])) return 0;
+  int n = qMin(size, int(ARRAY_SIZE_OF_PARAMETER(paramCodage[index])));
+  memcpy(paramAddress[index], buffer, n);
+  return n;
+}
+
+void TParametersTable::initParamReceived() {
+  memset(tabParamReceived, 0, nbParameters() * sizeof(quint16));
+}
+
+quint32 TParametersTable::indexedArraySize(quint32 parameterId) {
+  return ARRAY_SIZE_OF_PARAMETER(paramCodage[parameterId & TF_MASK]);
+}
+
+void TParametersTable::resetDecommutationParameters(quint8) {}
@@ -0,0 +1,365 @@
+#include "tcommandencode.h"
+#include <QByteArray>
+
+// Encoding of the commands as simulated telecommands, whose layout is
+// described in simulateddispatcher.h.
+
+namespace {
+
+template <typename T> struct Array {
+  Array(const T* data, quint32 size) : data(data), size(size) {}
+  const T* data;
+  quint32 size;
+};
+
+template <typename T> Array<T> array(const T* data, quint32 size) {
+  return Array<T>(data, size);
+}
+
+template <typename T> void write(QDispatcherTCByteArray* tc, T value) {
+  tc->append(&value, sizeof(T));
+}
+
+template <typename T> void write(QDispatcherTCByteArray* tc, Array<T> value) {
+  tc->append(value.data, value.size * sizeof(T));
+}
+
+void write(QDispatcherTCByteArray* tc, const QByteArray& value) {
+  write<quint32>(tc, quint32(value.size()));
+  tc->append(value.constData(), quint32(value.size()));
+}
+
+void write(QDispatcherTCByteArray* tc, const QString& value) {
+  write(tc, value.toUtf8());
+}
+
+void encode(QDispatcherTCByteArray*) {}
+
+template <typename T, typename... Args>
+void encode(QDispatcherTCByteArray* tc, const T& value, const Args&... args) {
+  write(tc, value);
+  encode(tc, args...);
+}
+
+template <typename... Args>
+bool sendSubsystem(TVirtualCommandEncode* encoder, quint8 subsysID,
+                   quint16 tcID, const Args&... args) {
+  QDispatcherTCByteArray* tc = encoder->startNewSubsystemTC(subsysID, tcID);
+  encode(tc, args...);
+  encoder->buildSubsystemTcEOP(tc, subsysID, tcID);
+  return encoder->sendSubsystemTC(subsysID, tcID);
+}
+
+template <typename... Args>
+bool sendNetQuic(TVirtualCommandEncode* encoder, quint16 tcID,
+                 const Args&... args) {
+  return sendSubsystem(encoder, MULTINETQUICMANAGER_ID, tcID, args...);
+}
+
+template <typename... Args>
+bool sendIntern(TVirtualCommandEncode* encoder, quint16 tcID,
+                const Args&... args) {
+  QDispatcherTCByteArray* tc = encoder->startNewInternTC(tcID);
+  encode(tc, args...);
+  tc->closeTC();
+  return encoder->sendInternTC();
+}
+
+}
+
+TVirtualCommandEncode::TVirtualCommandEncode() {}
+
+TVirtualCommandEncode::~TVirtualCommandEncode() {}
+
+bool TVirtualCommandEncode::sendResetVOffset(quint32 asicNum) {
+  return sendIntern(this, DISP_RESETVOFFSET_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetVOffset(quint32 asicNum, quint8 pixelNum,
+                                           float voffset) {
+  return sendIntern(this, DISP_SETVOFFSET_ID, asicNum, pixelNum, voffset);
+}
+
+bool TVirtualCommandEncode::sendSetVOffsets(quint32 asicNum, float* voffset) {
+  return sendIntern(this, DISP_SETVOFFSETS_ID, asicNum, array(voffset, 128));
+}
+
+bool TVirtualCommandEncode::sendResetVout2IinCoeffs(quint32 asicNum) {
+  return sendIntern(this, DISP_RESETVOUT2IINCOEFFS_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetVout2IinCoeffs(quint32 asicNum,
+                                                  float MinMfb, float Rfb) {
+  return sendIntern(this, DISP_SETVOUT2IINCOEFFS_ID, asicNum, MinMfb, Rfb);
+}
+
+bool TVirtualCommandEncode::sendSetVout2IinsCoeffs(float* MinMfb, float* Rfb) {
+  return sendIntern(this, DISP_SETVOUT2IINSCOEFFS_ID, array(MinMfb, 16),
+                    array(Rfb, 16));
+}
+
+bool TVirtualCommandEncode::sendSetScientificDataTfUsed(quint8 tfused) {
+  return sendIntern(this, DISP_SETSCIENTIFICDATATFUSED_ID, tfused);
+}
+
+bool TVirtualCommandEncode::sendStartBackup(QString sessionName,
+                                            QString comment) {
+  return sendIntern(this, DISP_STARTBACKUP_ID, sessionName, comment);
+}
+
+bool TVirtualCommandEncode::sendStopBackup() {
+  return sendIntern(this, DISP_STOPBACKUP_ID);
+}
+
+bool TVirtualCommandEncode::sendStartRawBackup(QString sessionName) {
+  return sendIntern(this, DISP_STARTRAWBACKUP_ID, sessionName);
+}
+
+bool TVirtualCommandEncode::sendStopRawBackup() {
+  return sendIntern(this, DISP_STOPRAWBACKUP_ID);
+}
+
+bool TVirtualCommandEncode::sendStartHKBackup(QString sessionName,
+                                              QString comment) {
+  return sendIntern(this, DISP_STARTHKBACKUP_ID, sessionName, comment);
+}
+
+bool TVirtualCommandEncode::sendStopHKBackup() {
+  return sendIntern(this, DISP_STOPHKBACKUP_ID);
+}
+
+bool TVirtualCommandEncode::sendSetBackupDir(QString directory) {
+  return sendIntern(this, DISP_SETBACKUPDIR_ID, directory);
+}
+
+bool TVirtualCommandEncode::sendResetSubsystem(quint8 subsystemId) {
+  return sendIntern(this, DISP_RESETSUBSYSTEM_ID, subsystemId);
+}
+
+bool TVirtualCommandEncode::sendResetDecommutationFlags(quint8 subsytemId) {
+  return sendIntern(this, DISP_RESETDECOMMUTATIONFLAGS_ID, subsytemId);
+}
+
+bool TVirtualCommandEncode::sendAddToLogbook(QString key, QString comment) {
+  return sendIntern(this, DISP_ADDTOLOGBOOK_ID, key, comment);
+}
+
+bool TVirtualCommandEncode::sendSetLogBookFilename(QString filename) {
+  return sendIntern(this, DISP_SETLOGBOOKFILENAME_ID, filename);
+}
+
+bool TVirtualCommandEncode::sendSetLogBookBaseDirectory(QString directory) {
+  return sendIntern(this, DISP_SETLOGBOOKBASEDIRECTORY_ID, directory);
+}
+
+bool TVirtualCommandEncode::sendCustomCommand(quint32 asicNum, quint8 id,
+                                              quint8 cn, QByteArray corps) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_CUSTOMCOMMAND_ID, asicNum, id,
+                     cn, corps);
+}
+
+bool TVirtualCommandEncode::sendSetAsicParam(quint32 asicNum, quint8 address,
+                                             quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICPARAM_ID, asicNum,
+                     address, value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicApol(quint32 asicNum, quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICAPOL_ID, asicNum, value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicSpol(quint32 asicNum, quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICSPOL_ID, asicNum, value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicVicm(quint32 asicNum, quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICVICM_ID, asicNum, value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicVocm(quint32 asicNum, quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICVOCM_ID, asicNum, value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicSetColumn(quint32 asicNum,
+                                                 quint8 startStopCol) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICSETCOLUMN_ID, asicNum,
+                     startStopCol);
+}
+
+bool TVirtualCommandEncode::sendSetAsicSelStartRow(quint32 asicNum,
+                                                   quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICSELSTARTROW_ID, asicNum,
+                     value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicSelLastRow(quint32 asicNum,
+                                                  quint8 value) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICSELLASTROW_ID, asicNum,
+                     value);
+}
+
+bool TVirtualCommandEncode::sendSetAsicRazb(quint32 asicNum) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICRAZB_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetAsicInib(quint32 asicNum) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICINIB_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetDiffDAC(quint32 asicNum,
+                                           quint16 diffDACValue) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETDIFFDAC_ID, asicNum,
+                     diffDACValue);
+}
+
+bool TVirtualCommandEncode::sendSetFeedbackTable(quint32 asicNum,
+                                                 quint16* feedbackTable) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETFEEDBACKTABLE_ID, asicNum,
+                     array(feedbackTable, 128));
+}
+
+bool TVirtualCommandEncode::sendSetOffsetTable(quint32 asicNum,
+                                               quint16* offsetTable) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETOFFSETTABLE_ID, asicNum,
+                     array(offsetTable, 128));
+}
+
+bool TVirtualCommandEncode::sendSetMask(quint32 asicNum, quint8* mask) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETMASK_ID, asicNum,
+                     array(mask, 125));
+}
+
+bool TVirtualCommandEncode::sendSetSlowDAC(quint32 asicNum,
+                                           quint16 slowDACValue) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETSLOWDAC_ID, asicNum,
+                     slowDACValue);
+}
+
+bool TVirtualCommandEncode::sendSetNSample(quint16 Nsample) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETNSAMPLE_ID, Nsample);
+}
+
+bool TVirtualCommandEncode::sendStartAcq(quint32 asicNum) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_STARTACQ_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendStopAcq(quint32 asicNum) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_STOPACQ_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetAcqScienceMode(quint32 asicNum,
+                                                  quint16 testMode) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETACQSCIENCEMODE_ID, asicNum,
+                     testMode);
+}
+
+bool TVirtualCommandEncode::sendResetNetquic(quint32 asicNum) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_RESETNETQUIC_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetCycleRawMode(quint32 asicNum,
+                                                quint16 undersampling) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETCYCLERAWMODE_ID, asicNum,
+                     undersampling);
+}
+
+bool TVirtualCommandEncode::sendSetAsicConf(quint32 asicNum, quint8 signalId,
+                                            quint8 state) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETASICCONF_ID, asicNum,
+                     signalId, state);
+}
+
+bool TVirtualCommandEncode::sendGetStatus(quint32 asicNum) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_GETSTATUS_ID, asicNum);
+}
+
+bool TVirtualCommandEncode::sendSetFreqAcqPixel(quint32 asicNum,
+                                                quint8 pixelAcqFreq) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETFREQACQPIXEL_ID, asicNum,
+                     pixelAcqFreq);
+}
+
+bool TVirtualCommandEncode::sendSetFreqSerialLink(quint32 asicNum,
+                                                  quint8 serialFreq) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETFREQSERIALLINK_ID, asicNum,
+                     serialFreq);
+}
+
+bool TVirtualCommandEncode::sendSetFrequency(quint32 asicNum,
+                                             quint8 frequencyId,
+                                             quint8 frequency) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETFREQUENCY_ID, asicNum,
+                     frequencyId, frequency);
+}
+
+bool TVirtualCommandEncode::sendSetCalibPolar(quint32 asicNum, quint8 mode,
+                                              quint8 shape, quint8 frequency,
+                                              quint16 amplitude,
+                                              quint16 offset) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_SETCALIBPOLAR_ID, asicNum, mode,
+                     shape, frequency, amplitude, offset);
+}
+
+bool TVirtualCommandEncode::sendConfigurePID(quint32 asicNum, quint16 P,
+                                             quint16 I, quint16 D) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_CONFIGUREPID_ID, asicNum, P, I,
+                     D);
+}
+
+bool TVirtualCommandEncode::sendActivatePID(quint32 asicNum, quint16 onOff) {
+  return sendNetQuic(this, MULTINETQUICMANAGER_ACTIVATEPID_ID, asicNum, onOff);
+}
+
+bool TVirtualCommandEncode::sendSwitchesMsg(QString txtMsg) {
+  return sendSubsystem(this, SWITCHES_ID, SWITCHES_SWITCHESMSG_ID, txtMsg);
+}
+
+bool TVirtualCommandEncode::sendToIMARCTR1(QString txtMsg) {
+  return sendSubsystem(this, IMACRT1_ID, IMACRT1_TOIMARCTR1_ID, txtMsg);
+}
+
+bool TVirtualCommandEncode::sendToIMARCTR2(QString txtMsg) {
+  return sendSubsystem(this, IMACRT2_ID, IMACRT2_TOIMARCTR2_ID, txtMsg);
+}
+
+bool TVirtualCommandEncode::sendToIMARCTR3(QString txtMsg) {
+  return sendSubsystem(this, IMACRT3_ID, IMACRT3_TOIMARCTR3_ID, txtMsg);
+}
+
+bool TVirtualCommandEncode::sendToIMARCTR4(QString txtMsg) {
+  return sendSubsystem(this, IMACRT4_ID, IMACRT4_TOIMARCTR4_ID, txtMsg);
+}
+
+TCommandEncode::TCommandEncode() {}
+
+TCommandEncode::~TCommandEncode() {}
+
+void TCommandEncode::buildSubsystemTcEOP(QDispatcherTCByteArray* currentTC,
+                                         quint8, quint16) {
+  currentTC->closeTC();
+}
+
+void TCommandEncode::buildSubsystemTcHeader(QDispatcherTCByteArray*, quint8,
+                                            quint16, quint32) {
+  // the header is written by startNewSubsystemTC
+}
+
+bool TCommandEncode::sendSwitchesMsg(QString txtMsg) {
+  return TVirtualCommandEncode::sendSwitchesMsg(txtMsg);
+}
+
+bool TCommandEncode::sendToIMARCTR1(QString txtMsg) {
+  return TVirtualCommandEncode::sendToIMARCTR1(txtMsg);
+}
+
+bool TCommandEncode::sendToIMARCTR2(QString txtMsg) {
+  return TVirtualCommandEncode::sendToIMARCTR2(txtMsg);
+}
+
+bool TCommandEncode::sendToIMARCTR3(QString txtMsg) {
+  return TVirtualCommandEncode::sendToIMARCTR3(txtMsg);
+}
+
+bool TCommandEncode::sendToIMARCTR4(QString txtMsg) {
+  return TVirtualCommandEncode::sendToIMARCTR4(txtMsg);
+}
@@ -0,0 +1,540 @@
+#include "tdispatcheraccess.h"
+#include "simulateddispatcher.h"
+#include <QMutexLocker>
+#include <algorithm>
+#include <stdlib.h>
+#include <string.h>
+
+// Implementation of the dispatcher access library whose TCP connection to
+// the dispatcher is replaced by a SimulatedConnection. The TM packets sent
+// by the simulated dispatcher are stored in the circular buffer and decoded
+// into the parameter table by the thread of the client, which then emits
+// requestArrived, and the telecommands are executed by the simulated
+// dispatcher, as with the actual library.
+//
+// The mutex m_comMutex protects the buffer, the requests and the error
+// message. The simulated dispatcher is never called with m_comMutex held,
+// since it sends the TM packets with its own lock held.
+
+namespace {
+
+const quint16 DEFAULT_BUFFER_SIZE = 1000;
+
+template <typename T> T read(const quint8* data) {
+  T out;
+  memcpy(&out, data, sizeof(T));
+  return out;
+}
+
+}
+
+QMyTcpSocket::QMyTcpSocket() : QTcpSocket(), m_connected(false) {}
+
+bool QMyTcpSocket::isConnected() {
+  QMutexLocker locker(&m_connectMutex);
+  return m_connected;
+}
+
+void QMyTcpSocket::setConnected() {
+  QMutexLocker locker(&m_connectMutex);
+  m_connected = true;
+}
+
+void QMyTcpSocket::disconnected() {
+  QMutexLocker locker(&m_connectMutex);
+  m_connected = false;
+}
+
+TDispatcherAccessKernel::TDispatcherAccessKernel(quint16 maxTCSize)
+  : QThread(), m_parameters(NULL), m_subsystemControledAccessMode(false),
+    m_lastRequestNum(MAX_NB_REQUEST_PER_CLIENT - 1), m_debug(false),
+    m_dispatcherTFVersionLoaded(0), m_incompatibleLibrary(false),
+    m_subSystemsCommandsLocked(false), m_statusTMReceived(false),
+    m_fullCommandsLocked(false), m_socketClient(new QMyTcpSocket()),
+    m_tcCN(0), m_ACKStatus(ACK_NO_ERROR), m_ACKStatusReportsSize(0),
+    m_dataBuffer(NULL), m_bufferSize(0), m_popIndex(0), m_pushIndex(0),
+    m_nbElements(0), m_bufferOverlapped(false), m_running(false),
+    m_ackSem(0), m_waitingForACK(true), m_waitingForACKCN(0),
+    m_autoUpdate(false), m_dispatcherPort(-1), m_requestRate(0),
+    m_requestNumber(0), m_dataRate(0), m_dataNumber(0), m_ackTimeOut(5000),
+    m_currentState(0), m_nbOverlap(0), m_currentDecodingNB(0) {
+  memset(_ACKStatusReports, 0, sizeof(_ACKStatusReports));
+  m_currentTC.reserve(maxTCSize);
+}
+
+void TDispatcherAccessKernel::initDispatcherAccess(
+    TAbstractParametersTable* parameters, quint16 bufferSize,
+    QString dispatcherAddress, int dispatcherPort) {
+  m_parameters = parameters;
+  m_bufferSize = std::max<quint16>(bufferSize, 1);
+  m_dataBuffer = new QDispatcherByteArray*[m_bufferSize];
+  for (int i = 0; i < m_bufferSize; ++i)
+    m_dataBuffer[i] = new QDispatcherByteArray();
+  configure(dispatcherAddress, dispatcherPort);
+
+  // the options are read from the environment variable PYSTUDIO_SIMULATOR
+  SimulatorOptions options;
+  const char* env = getenv("PYSTUDIO_SIMULATOR");
+  if (env != NULL) options.parse(env);
+  SimulatedConnection* connection = new SimulatedConnection(
+    options, [this](QDispatcherByteArray& tm) {
+      // reception of a TM packet, in the thread of the simulated dispatcher
+      SimulatedConnection* connection = SimulatedConnection::of(this);
+      {
+        QMutexLocker locker(&m_comMutex);
+        if (m_nbElements == m_bufferSize) {
+          m_popIndex = (m_popIndex + 1) % m_bufferSize;
+          --m_nbElements;
+          ++m_nbOverlap;
+          m_bufferOverlapped = true;
+        }
+        QDispatcherByteArray* element = m_dataBuffer[m_pushIndex];
+        element->clear();
+        element->append(tm.constData(), tm.size());
+        m_pushIndex = (m_pushIndex + 1) % m_bufferSize;
+        ++m_nbElements;
+      }
+      // the connection is unregistered while the client is deleted
+      if (connection != NULL) connection->received.release();
+    });
+  connection->rateTimer.start();
+  SimulatedConnection::add(this, connection);
+  m_socketClient->setConnected();
+  m_running = true;
+}
+
+TDispatcherAccessKernel::~TDispatcherAccessKernel() {
+  m_running = false;
+  wait();
+  // the simulated dispatcher, which pushes into the buffer, is stopped first
+  delete SimulatedConnection::remove(this);
+  for (int i = 0; i < m_bufferSize; ++i) delete m_dataBuffer[i];
+  delete[] m_dataBuffer;
+  qDeleteAll(m_requests);
+  delete m_socketClient;
+  // the table is created by TDispatcherAccess
+  delete static_cast<TParametersTable*>(m_parameters);
+}
+
+void TDispatcherAccessKernel::configure(QString dispatcherAddress,
+                                        int dispatcherPort) {
+  m_dispatcherAddress = dispatcherAddress;
+  m_dispatcherPort = dispatcherPort < 0 ? DISPATCHER_SERVER_PORT
+                                        : dispatcherPort;
+}
+
+quint16 TDispatcherAccessKernel::getNbDataAvailable(bool& bufferOverlapped) {
+  QMutexLocker locker(&m_comMutex);
+  bufferOverlapped = m_bufferOverlapped;
+  m_bufferOverlapped = false;
+  return m_nbElements;
+}
+
+TAbstractParametersTable* TDispatcherAccessKernel::update(int* requestNum) {
+  int num = -1;
+  {
+    QMutexLocker locker(&m_comMutex);
+    if (m_nbElements > 0) {
+      QDispatcherByteArray* element = m_dataBuffer[m_popIndex];
+      decodeTM(element->data(), element->size());
+      m_popIndex = (m_popIndex + 1) % m_bufferSize;
+      --m_nbElements;
+      num = m_currentDecodingNB;
+    }
+  }
+  if (requestNum != NULL) *requestNum = num;
+  return m_parameters;
+}
+
+TAbstractParametersTable* TDispatcherAccessKernel::updateAll() {
+  int num = 0;
+  while (num >= 0) update(&num);
+  return m_parameters;
+}
+
+void TDispatcherAccessKernel::resizeTMBuffer(quint16 bufferSize) {
+  // the newest TM packets are kept, the others are lost
+  QMutexLocker locker(&m_comMutex);
+  bufferSize = std::max<quint16>(bufferSize, 1);
+  quint16 kept = std::min(m_nbElements, bufferSize);
+  quint16 dropped = m_nbElements - kept;
+  m_popIndex = (m_popIndex + dropped) % m_bufferSize;
+  if (dropped > 0) {
+    m_nbOverlap += dropped;
+    m_bufferOverlapped = true;
+  }
+  QDispatcherByteArray** buffer = new QDispatcherByteArray*[bufferSize];
+  for (int i = 0; i < m_bufferSize; ++i) {
+    int j = (m_bufferSize + i - m_popIndex) % m_bufferSize;
+    if (j < bufferSize) {
+      buffer[j] = m_dataBuffer[i];
+    } else {
+      delete m_dataBuffer[i];
+    }
+  }
+  for (int j = m_bufferSize; j < bufferSize; ++j)
+    buffer[j] = new QDispatcherByteArray();
+  delete[] m_dataBuffer;
+  m_dataBuffer = buffer;
+  m_bufferSize = bufferSize;
+  m_popIndex = 0;
+  m_pushIndex = kept % bufferSize;
+  m_nbElements = kept;
+}
+
+void TDispatcherAccessKernel::setWaitingForAckMode(bool waitingForACK) {
+  m_waitingForACK = waitingForACK;
+}
+
+void TDispatcherAccessKernel::setWaitingForAckTimeOut(int ackTimeOut) {
+  m_ackTimeOut = ackTimeOut;
+}
+
+bool TDispatcherAccessKernel::subSystemsCommandsLocked() {
+  return m_subSystemsCommandsLocked;
+}
+
+void TDispatcherAccessKernel::setSubSystemsCommandsLocked(bool commandMode) {
+  m_subSystemsCommandsLocked = commandMode;
+}
+
+bool TDispatcherAccessKernel::fullCommandsLocked() {
+  return m_fullCommandsLocked;
+}
+
+void TDispatcherAccessKernel::setFullCommandsLocked(bool commandMode) {
+  m_fullCommandsLocked = commandMode;
+}
+
+void TDispatcherAccessKernel::setAutoUpdateWithRequest(bool autoUpdate) {
+  m_autoUpdate = autoUpdate;
+  if (autoUpdate) SimulatedConnection::of(this)->received.release();
+}
+
+bool TDispatcherAccessKernel::startSubsystemAccess() {
+  m_subsystemControledAccessMode = true;
+  return true;
+}
+
+bool TDispatcherAccessKernel::stopSubsystemAccess() {
+  m_subsystemControledAccessMode = false;
+  return true;
+}
+
+bool TDispatcherAccessKernel::stopDispatcher(quint32) {
+  QMutexLocker locker(&m_comMutex);
+  m_errorMsg = "The simulated dispatcher cannot be stopped.";
+  return false;
+}
+
+void TDispatcherAccessKernel::setDebug() {
+  m_debug = true;
+}
+
+void TDispatcherAccessKernel::waitMs(qint64 milliseconds) {
+  QThread::msleep(milliseconds);
+}
+
+int TDispatcherAccessKernel::requestSynchroParameters(
+    QList<quint32> parameterList, quint32 parameterIdToSynchronize,
+    quint16 everyXParameters, bool* isValidRequest) {
+  int num = getNextEmptyRequest();
+  bool valid = num >= 0 &&
+    requestParameters(num, false, SynchronisedMode, parameterIdToSynchronize,
+                      everyXParameters, parameterList);
+  if (isValidRequest != NULL) *isValidRequest = valid;
+  return valid ? num : -1;
+}
+
+int TDispatcherAccessKernel::requestTimeoutParameters(
+    QList<quint32> parameterList, quint16 timeout, bool* isValidRequest) {
+  int num = getNextEmptyRequest();
+  bool valid = num >= 0 &&
+    requestParameters(num, false, TimeOutMode, 0, timeout, parameterList);
+  if (isValidRequest != NULL) *isValidRequest = valid;
+  return valid ? num : -1;
+}
+
+int TDispatcherAccessKernel::requestOneTimeSynchroParameters(
+    QList<quint32> parameterList, quint32 parameterIdToSynchronize,
+    bool* isValidRequest) {
+  int num = getNextEmptyRequest();
+  bool valid = num >= 0 &&
+    requestParameters(num, true, SynchronisedMode, parameterIdToSynchronize,
+                      1, parameterList);
+  if (isValidRequest != NULL) *isValidRequest = valid;
+  return valid ? num : -1;
+}
+
+int TDispatcherAccessKernel::requestOneTimeTimeoutParameters(
+    QList<quint32> parameterList, quint16 timeout, bool* isValidRequest) {
+  int num = getNextEmptyRequest();
+  bool valid = num >= 0 &&
+    requestParameters(num, true, TimeOutMode, 0, timeout, parameterList);
+  if (isValidRequest != NULL) *isValidRequest = valid;
+  return valid ? num : -1;
+}
+
+bool TDispatcherAccessKernel::disableOneRequestedParameters(quint8 reqNum) {
+  SimulatedConnection::of(this)->dispatcher.removeRequest(reqNum);
+  QMutexLocker locker(&m_comMutex);
+  delete m_requests.take(reqNum);
+  deleteRequestsFromBuffer(reqNum);
+  return true;
+}
+
+bool TDispatcherAccessKernel::disableAllRequestedParameters() {
+  SimulatedConnection::of(this)->dispatcher.removeAllRequests();
+  QMutexLocker locker(&m_comMutex);
+  qDeleteAll(m_requests);
+  m_requests.clear();
+  clearDataBuffer();
+  return true;
+}
+
+bool TDispatcherAccessKernel::sendReloadTF() {
+  SimulatedConnection::of(this)->dispatcher.reloadTF();
+  return true;
+}
+
+QString TDispatcherAccessKernel::lastError() {
+  QMutexLocker locker(&m_comMutex);
+  return m_errorMsg;
+}
+
+bool TDispatcherAccessKernel::isConnected() {
+  return m_socketClient->isConnected();
+}
+
+QString TDispatcherAccessKernel::state() {
+  return isConnected() ? "Connected" : "Not connected";
+}
+
+int TDispatcherAccessKernel::dispatcherTFVersionLoaded() {
+  return SimulatedConnection::of(this)->dispatcher.tfVersion();
+}
+
+int TDispatcherAccessKernel::getSubSystemStatusReports(quint8* statusReports) {
+  QMutexLocker locker(&m_comMutex);
+  memcpy(statusReports, _ACKStatusReports, m_ACKStatusReportsSize);
+  return m_ACKStatusReportsSize;
+}
+
+quint8 TDispatcherAccessKernel::getCommandStatus() {
+  QMutexLocker locker(&m_comMutex);
+  return m_ACKStatus;
+}
+
+void TDispatcherAccessKernel::run() {
+  // decode the TM packets as they are received and update the request and
+  // data rates every second
+  SimulatedConnection* connection = SimulatedConnection::of(this);
+  while (m_running) {
+    if (connection->received.tryAcquire(1, 100)) {
+      while (m_autoUpdate && processTM()) {}
+    }
+    qint64 elapsed = connection->rateTimer.elapsed();
+    if (elapsed >= 1000) {
+      QMutexLocker locker(&m_comMutex);
+      m_requestRate = m_requestNumber * 1000. / elapsed;
+      m_dataRate = m_dataNumber * 1000. / elapsed;
+      m_requestNumber = 0;
+      m_dataNumber = 0;
+      connection->rateTimer.restart();
+    }
+  }
+}
+
+bool TDispatcherAccessKernel::sendSubsystemTC(quint8, quint16) {
+  if (m_subSystemsCommandsLocked) {
+    QMutexLocker locker(&m_comMutex);
+    m_errorMsg = "The subsystem commands are locked.";
+    return false;
+  }
+  return sendTC();
+}
+
+bool TDispatcherAccessKernel::sendCustomTC() {
+  return sendTC();
+}
+
+bool TDispatcherAccessKernel::sendInternTC() {
+  return sendTC();
+}
+
+QDispatcherTCByteArray* TDispatcherAccessKernel::startNewCustomTC(
+    quint16 customTcNum) {
+  m_currentTC.startNewCustomTC(++m_tcCN, customTcNum);
+  return &m_currentTC;
+}
+
+QDispatcherTCByteArray* TDispatcherAccessKernel::startNewInternTC(
+    quint16 internTcNum) {
+  m_currentTC.startNewInternTC(++m_tcCN, internTcNum);
+  return &m_currentTC;
+}
+
+QDispatcherTCByteArray* TDispatcherAccessKernel::startNewSubsystemTC(
+    quint8 subsysID, quint16 tcID) {
+  m_currentTC.startNewSubsystemTC(++m_tcCN, subsysID, tcID);
+  return &m_currentTC;
+}
+
+bool TDispatcherAccessKernel::requestParameters(
+    quint8 reqNum, bool oneShot, freqtype freqType, quint32 parameterNum,
+    quint16 frequency, QList<quint32> parameterList) {
+  // the request number has been reserved by getNextEmptyRequest
+  {
+    QMutexLocker locker(&m_comMutex);
+    oneRequest* request = m_requests.value(reqNum);
+    request->oneShot = oneShot;
+    request->freqType = freqType;
+    request->parameterNum = parameterNum;
+    request->frequency = frequency;
+    request->nbParameters = parameterList.count();
+    request->parameterList = parameterList;
+  }
+  QString error;
+  if (parameterList.isEmpty()) {
+    error = "The request has no parameter.";
+  } else if (SimulatedConnection::of(this)->dispatcher.addRequest(
+               reqNum, oneShot, freqType == SynchronisedMode, parameterNum,
+               frequency, parameterList, &error)) {
+    return true;
+  }
+  QMutexLocker locker(&m_comMutex);
+  delete m_requests.take(reqNum);
+  m_errorMsg = error;
+  return false;
+}
+
+void TDispatcherAccessKernel::clearDataBuffer() {
+  // to be called with m_comMutex held
+  m_popIndex = m_pushIndex;
+  m_nbElements = 0;
+}
+
+bool TDispatcherAccessKernel::sendTC() {
+  m_currentTC.closeTC();
+  if (m_fullCommandsLocked) {
+    QMutexLocker locker(&m_comMutex);
+    m_ACKStatus = ACK_COMMAND_NOT_SENT;
+    m_errorMsg = "The commands are locked.";
+    return false;
+  }
+  SimulatedConnection* connection = SimulatedConnection::of(this);
+  const quint8* header = m_currentTC.constData();
+  quint8 kind = header[2];
+  quint16 tcID = read<quint16>(header + 4);
+  quint8 ack = connection->dispatcher.execute(
+    kind == SUBSYSTEM_TC ? header[3] : 0, tcID,
+    m_currentTC.subsystemTCBuffer(), m_currentTC.subsystemTCBufferSize());
+  if (!m_waitingForACK) {
+    QMutexLocker locker(&m_comMutex);
+    m_ACKStatus = ack;
+    return true;
+  }
+  double delay = connection->dispatcher.options().ack;
+  if (delay > m_ackTimeOut) {
+    QThread::msleep(m_ackTimeOut);
+    ack = ACK_TIMEOUT;
+  } else {
+    QThread::usleep(qint64(delay * 1000));
+  }
+  QMutexLocker locker(&m_comMutex);
+  m_ACKStatus = ack;
+  if (ack != ACK_NO_ERROR)
+    m_errorMsg = QString("The command was not acknowledged (%1).").arg(ack);
+  return ack == ACK_NO_ERROR;
+}
+
+void TDispatcherAccessKernel::decodeTM(quint8* tmBuff, int tmBuffSize) {
+  // to be called with m_comMutex held: update the parameter table with the
+  // values of a TM packet, whose encoding is described in
+  // simulateddispatcher.h
+  const quint8* end = tmBuff + tmBuffSize;
+  m_currentDecodingNB = tmBuff[0];
+  quint16 nbParameters = read<quint16>(tmBuff + 1);
+  const quint8* data = tmBuff + 3;
+  for (int i = 0; i < nbParameters && data + 8 <= end; ++i) {
+    quint32 parameterId = read<quint32>(data);
+    quint32 size = read<quint32>(data + 4);
+    data += 8;
+    quint32 index = parameterId & TF_MASK;
+    if (index >= m_parameters->nbParameters() || data + size > end) break;
+    if (IS_STRING(m_parameters->paramCodage[index])) {
+      *static_cast<QString*>(m_parameters->paramAddress[index]) =
+        QString::fromUtf8(reinterpret_cast<const char*>(data), int(size));
+    } else {
+      memcpy(m_parameters->paramAddress[index], data,
+             std::min(size, simulatedParameterSize(m_parameters, index)));
+      if (IS_TF_REQUEST(parameterId)) simulatedUpdateTF(m_parameters, index);
+    }
+    ++m_parameters->tabParamReceived[index];
+    data += size;
+  }
+  ++m_requestNumber;
+  m_dataNumber += tmBuffSize;
+}
+
+int TDispatcherAccessKernel::getNextEmptyRequest() {
+  // reserve the next free request number
+  QMutexLocker locker(&m_comMutex);
+  for (int i = 1; i <= MAX_NB_REQUEST_PER_CLIENT; ++i) {
+    quint8 num = (m_lastRequestNum + i) % MAX_NB_REQUEST_PER_CLIENT;
+    if (m_requests.contains(num)) continue;
+    m_requests.insert(num, new oneRequest());
+    m_lastRequestNum = num;
+    return num;
+  }
+  m_errorMsg = "The maximum number of requests is reached.";
+  return -1;
+}
+
+bool TDispatcherAccessKernel::processTM() {
+  // decode the oldest TM packet of the buffer, if any, and emit
+  // requestArrived
+  int num;
+  int size;
+  {
+    QMutexLocker locker(&m_comMutex);
+    if (m_nbElements == 0) return false;
+    QDispatcherByteArray* element = m_dataBuffer[m_popIndex];
+    size = element->size();
+    decodeTM(element->data(), size);
+    m_popIndex = (m_popIndex + 1) % m_bufferSize;
+    --m_nbElements;
+    num = m_currentDecodingNB;
+    oneRequest* request = m_requests.value(num);
+    if (request != NULL && request->oneShot) delete m_requests.take(num);
+  }
+  double speed = SimulatedConnection::of(this)->dispatcher.options().decode;
+  if (speed > 0) QThread::usleep(qint64(size / speed * 1e6));
+  emit requestArrived(num);
+  return true;
+}
+
+void TDispatcherAccessKernel::deleteRequestsFromBuffer(quint16 reqNum) {
+  // to be called with m_comMutex held: remove the TM packets of a request
+  quint16 kept = 0;
+  for (int i = 0; i < m_nbElements; ++i) {
+    int index = (m_popIndex + i) % m_bufferSize;
+    if (m_dataBuffer[index]->at(0) == reqNum) continue;
+    std::swap(m_dataBuffer[(m_popIndex + kept) % m_bufferSize],
+              m_dataBuffer[index]);
+    ++kept;
+  }
+  m_nbElements = kept;
+  m_pushIndex = (m_popIndex + kept) % m_bufferSize;
+}
+
+TDispatcherAccess::TDispatcherAccess(QString dispatcherAddress,
+                                     int dispatcherPort)
+  : TDispatcherAccessKernel(), TCommandEncode() {
+  initDispatcherAccess(new TParametersTable(), DEFAULT_BUFFER_SIZE,
+                       dispatcherAddress, dispatcherPort);
+}
+
+bool TDispatcherAccess::sendSubsystemTC(quint8 subsysID, quint16 tcID) {
+  return TDispatcherAccessKernel::sendSubsystemTC(subsysID, tcID);
+}
@@ -0,0 +1,125 @@
+#include "tparamscomputer.h"
+#include "simulateddispatcher.h"
+#include "tabstractparameterstable.h"
+
+// The simulated transfer functions are the identity, they have no unit nor
+// description and they can always be inverted.
+
+namespace {
+
+template <typename T> void copyTF(const void* address, double* tf, quint32 n) {
+  const T* raw = static_cast<const T*>(address);
+  for (quint32 i = 0; i < n; ++i) tf[i] = double(raw[i]);
+}
+
+}
+
+void simulatedUpdateTF(TAbstractParametersTable* table, quint32 parameterId) {
+  quint32 index = parameterId & TF_MASK;
+  quint32 n = table->tfParamArraySize[index];
+  const void* raw = table->paramAddress[index];
+  double* tf = table->paramAddressTF[index];
+  switch (PARAMETER_TYPE(table->paramCodage[index])) {
+  case 0x00: copyTF<quint8>(raw, tf, n); break;
+  case 0x01: copyTF<quint16>(raw, tf, n); break;
+  case 0x02:
+  case 0x03: copyTF<quint32>(raw, tf, n); break;
+  case 0x07: copyTF<quint64>(raw, tf, n); break;
+  case 0x08: copyTF<qint8>(raw, tf, n); break;
+  case 0x09: copyTF<qint16>(raw, tf, n); break;
+  case 0x0A:
+  case 0x0B: copyTF<qint32>(raw, tf, n); break;
+  case 0x0F: copyTF<qint64>(raw, tf, n); break;
+  case CODAGE_FLOAT: copyTF<float>(raw, tf, n); break;
+  case CODAGE_DOUBLE: copyTF<double>(raw, tf, n); break;
+  }
+}
+
+TAbstractParamsComputer::TAbstractParamsComputer() : m_currentFileVersion(0) {}
+
+void TAbstractParamsComputer::updateTfParameter(
+    TAbstractParametersTable* parameters, unsigned int parameterId) {
+  simulatedUpdateTF(parameters, parameterId);
+}
+
+double TAbstractParamsComputer::calculate(
+    int parameterId, double value, QList<double>* listOfExtraParameters) {
+  return customProcess(parameterId, value, listOfExtraParameters);
+}
+
+double TAbstractParamsComputer::calculate(
+    TAbstractParametersTable* parameters, int parameterId, double value,
+    QList<double>* listOfExtraParameters) {
+  return customProcess(parameters, parameterId, value, listOfExtraParameters);
+}
+
+void TAbstractParamsComputer::autoCalculateIfNeeded(
+    TAbstractParametersTable* parameters,
+    QList<unsigned int>* listOfDecodedParameters) {
+  for (int i = 0; i < listOfDecodedParameters->count(); ++i)
+    updateTfParameter(parameters, listOfDecodedParameters->at(i));
+}
+
+double TAbstractParamsComputer::invCalculate(int, double value) {
+  return value;
+}
+
+void TAbstractParamsComputer::updateTF() {}
+
+int TAbstractParamsComputer::fileVersion() {
+  return m_currentFileVersion;
+}
+
+QString TAbstractParamsComputer::unit(int) {
+  return QString();
+}
+
+QString TAbstractParamsComputer::rawUnit(int) {
+  return QString();
+}
+
+int TAbstractParamsComputer::precision(int) {
+  return 0;
+}
+
+bool TAbstractParamsComputer::hasTf(int) {
+  return false;
+}
+
+bool TAbstractParamsComputer::canInvCalculate(int) {
+  return true;
+}
+
+QString TAbstractParamsComputer::realName(int) {
+  return QString();
+}
+
+QString TAbstractParamsComputer::dispName(int) {
+  return QString();
+}
+
+QString TAbstractParamsComputer::description(int) {
+  return QString();
+}
+
+TAbstractParamsComputer::TFAlert TAbstractParamsComputer::checkAlert(int,
+                                                                      double) {
+  return inTheRange;
+}
+
+ParamDescription* TAbstractParamsComputer::getParamDescription(int) {
+  return NULL;
+}
+
+TParamsComputer::TParamsComputer() {}
+
+TParamsComputer::~TParamsComputer() {}
+
+double TParamsComputer::customProcess(int, double value, QList<double>*) {
+  return value;
+}
+
+double TParamsComputer::customProcess(TAbstractParametersTable*, int,
+                                      double value, QList<double>*) {
+  return value;
+}
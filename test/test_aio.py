@@ -0,0 +1,54 @@
+import asyncio
+import os
+import pytest
+import threading
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.aio import AsyncRequest
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+def test_afetch(client):
+    async def main():
+        return await asyncio.gather(client.afetch('QUBIC_Nsample'),
+                                    client.afetch('QUBIC_Nsample'))
+    assert [int(_) for _ in asyncio.run(main())] == [100, 100]
+
+
+def test_several_awaits(client):
+    request = AsyncRequest(client.request('QUBIC_Nsample', 10))
+
+    async def main():
+        return await asyncio.gather(request.__anext__(), request.__anext__())
+    try:
+        assert len(asyncio.run(main())) == 2
+    finally:
+        request.abort()
+
+
+def test_several_loops(client):
+    results = []
+
+    def run():
+        async def main():
+            for _ in range(5):
+                results.append(await client.afetch('QUBIC_Nsample'))
+        asyncio.run(main())
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(results) == 20
+
+
+def test_no_running_loop(client):
+    # the futures are only created in the loop running the coroutine
+    coroutine = client.afetch('QUBIC_Nsample')
+    with pytest.raises(RuntimeError):
+        coroutine.send(None)
@@ -0,0 +1,191 @@
+import os
+import numpy as np
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+pytest.importorskip('pystudio.simulated')
+from pystudio import alarms
+
+DESCRIPTION = u"""[parameters]
+1\\name=TEMP
+1\\type=3
+1\\array=1
+2\\name=CURRENT
+2\\type=3
+2\\array=3
+3\\name=VOLTAGE
+3\\type=3
+3\\array=1
+"""
+
+TF = u"""[TEMP]
+realname=TEMP
+unit=K|
+useTF=0
+lowalert=true
+lowalertv=1
+lowwarn=true
+lowwarnv=2
+highwarn=true
+highwarnv=8
+highalert=true
+highalertv=9
+[CURRENT]
+realname=CURRENT
+unit=mA|
+useTF=1
+lowalert=false
+lowalertv=0
+lowwarn=false
+lowwarnv=0
+highwarn=true
+highwarnv=10
+highalert=false
+highalertv=100
+[VOLTAGE]
+realname=VOLTAGE
+unit=V|
+useTF=0
+lowalert=false
+lowalertv=0
+lowwarn=false
+lowwarnv=0
+highwarn=false
+highwarnv=0
+highalert=false
+highalertv=0
+"""
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(alarms, 'CACHE_DIR', str(tmpdir.mkdir('cache')))
+    return tmpdir.join('cache')
+
+
+@pytest.fixture
+def files(tmpdir):
+    description = tmpdir.join('parametersDescription.dispatcher')
+    tf = tmpdir.join('parametersTF.dispatcher')
+    description.write_binary(DESCRIPTION.replace(u'\n', u'\r\n').encode(
+        'latin-1'))
+    tf.write_binary(TF.replace(u'\n', u'\r\n').encode('latin-1'))
+    return str(description), str(tf)
+
+
+@pytest.fixture
+def index(files):
+    return alarms.read_index(*files, cache=False)
+
+
+def test_build_index(index):
+    assert list(index['name']) == [b'CURRENT', b'TEMP', b'VOLTAGE']
+    assert list(index['size']) == [3, 1, 1]
+    assert list(index['use_tf']) == [True, False, False]
+    assert list(index['unit']) == [b'mA', b'K', b'V']
+    assert list(index[1][list(alarms.THRESHOLDS)]) == [1, 2, 8, 9]
+    assert list(index[0][list(alarms.THRESHOLDS)]) == [-np.inf, -np.inf,
+                                                         10, np.inf]
+
+
+def test_read_index_cache(cache_dir, files, index):
+    cached = alarms.read_index(*files)
+    path = alarms._index_cache_path(*files)
+    assert os.listdir(str(cache_dir)) == [os.path.basename(path)]
+    assert isinstance(cached, np.memmap)
+    assert np.array_equal(cached, index)
+    assert np.array_equal(alarms.read_index(*files), index)
+
+
+def test_read_index_invalid_cache(cache_dir, files, index):
+    alarms.read_index(*files)
+    path = alarms._index_cache_path(*files)
+    with open(path, 'wb') as f:
+        f.write(b'garbage')
+    assert np.array_equal(alarms.read_index(*files), index)
+    assert np.array_equal(alarms.read_index(*files), index)
+
+
+def test_read_index_modified_source(cache_dir, files):
+    alarms.read_index(*files)
+    with open(files[1], 'ab') as f:
+        f.write(b'[OTHER]\r\nunit=|\r\n')
+    index = alarms.read_index(*files)
+    assert b'OTHER' in list(index['name'])
+    assert len(os.listdir(str(cache_dir))) == 2
+
+
+def test_read_index_failed_write(cache_dir, files, index, monkeypatch):
+    def rename(src, dst):
+        raise OSError('rename failed')
+    monkeypatch.setattr(os, 'rename', rename)
+    assert np.array_equal(alarms.read_index(*files), index)
+    assert os.listdir(str(cache_dir)) == []
+
+
+def test_alarm_parameters(index):
+    assert alarms.alarm_parameters(index) == ['CURRENT_TF', 'TEMP']
+
+
+def test_alarm_parameters_none_enabled(index):
+    index = index.copy()
+    for field in alarms.THRESHOLDS:
+        index[field] = np.inf if field.startswith('high') else -np.inf
+    assert alarms.alarm_parameters(index) == []
+
+
+def test_evaluate(index):
+    evaluator = alarms.AlarmEvaluator(['TEMP', 'CURRENT_TF'], index)
+    levels = evaluator.evaluate((np.float32(0.5), np.array([5, 11, 200])))
+    assert list(levels) == [alarms.LOW_ALERT, alarms.OK, alarms.HIGH_WARNING,
+                            alarms.HIGH_WARNING]
+    levels = evaluator.evaluate((1.5, np.array([0, 0, 0])))
+    assert list(levels) == [alarms.LOW_WARNING, 0, 0, 0]
+    levels = evaluator.evaluate((8.5, np.array([0, 0, 0])))
+    assert list(levels) == [alarms.HIGH_WARNING, 0, 0, 0]
+    levels = evaluator.evaluate((9.5, np.array([0, 0, 0])))
+    assert list(levels) == [alarms.HIGH_ALERT, 0, 0, 0]
+
+
+def test_violations(index):
+    evaluator = alarms.AlarmEvaluator(['TEMP', 'CURRENT_TF'], index)
+    assert evaluator.violations((5, np.array([0, 10, 0]))) == []
+    assert evaluator.violations((9.5, np.array([0, 11, 0]))) == [
+        ('TEMP', 0, 9.5, alarms.HIGH_ALERT),
+        ('CURRENT_TF', 1, 11, alarms.HIGH_WARNING)]
+
+
+def test_violations_shape_change(index):
+    evaluator = alarms.AlarmEvaluator(['CURRENT_TF'], index)
+    assert evaluator.violations(np.array([11, 0])) == [
+        ('CURRENT_TF', 0, 11, alarms.HIGH_WARNING)]
+    assert evaluator.violations(np.array([0, 0, 0, 12])) == [
+        ('CURRENT_TF', 3, 12, alarms.HIGH_WARNING)]
+
+
+def test_single_parameter(index):
+    evaluator = alarms.AlarmEvaluator('TEMP', index)
+    assert list(evaluator.evaluate(0)) == [alarms.LOW_ALERT]
+
+
+def test_no_parameters(index):
+    evaluator = alarms.AlarmEvaluator([], index)
+    assert len(evaluator.evaluate(())) == 0
+    assert evaluator.violations(()) == []
+
+
+def test_shipped_files():
+    # no threshold is enabled in the shipped parametersTF.dispatcher
+    names = alarms.alarm_parameters(alarms.read_index(cache=False))
+    assert names == []
+    assert alarms.AlarmEvaluator(names).violations(()) == []
+
+
+def test_unknown_parameter(index):
+    with pytest.raises(ValueError):
+        alarms.AlarmEvaluator(['UNKNOWN'], index)
+
+
+def test_raw_tf_parameter(index):
+    with pytest.raises(ValueError):
+        alarms.AlarmEvaluator(['CURRENT'], index)
@@ -0,0 +1,117 @@
+import os
+import platform
+import uuid
+import numpy as np
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+pytest.importorskip('pystudio.simulated')
+pytest.importorskip('multiprocessing.shared_memory')
+from pystudio import broker
+from pystudio.broker import SharedRing, StreamReader
+
+if platform.machine().lower() not in broker.ARCHITECTURES:
+    pytest.skip('The shared memory rings require x86-64.',
+                allow_module_level=True)
+
+NSLOTS = 4
+
+
+@pytest.fixture
+def stream():
+    return 'test-{0}-{1}'.format(os.getpid(), uuid.uuid4().hex[:8])
+
+
+@pytest.fixture
+def ring(stream):
+    ring = SharedRing(broker._block_name(broker.DEFAULT_PREFIX, stream),
+                      [('scalar', np.uint16, ()),
+                       ('timeline', np.float32, (2, 10))], NSLOTS)
+    yield ring
+    ring.close()
+
+
+def chunk(i, n=10):
+    return i, np.full((2, n), i, np.float32)
+
+
+def check(values, i, n=10):
+    scalar, timeline = values
+    assert scalar == i
+    assert timeline.shape == (2, n)
+    assert np.all(timeline == i)
+
+
+def test_write_read(ring, stream):
+    with StreamReader(stream) as reader:
+        assert reader.names == ['scalar', 'timeline']
+        ring.write(chunk(1))
+        ring.write(chunk(2, 5))
+        assert reader.pending == 2
+        check(reader.next(timeout=1), 1)
+        check(reader.next(timeout=1, copy=True), 2, 5)
+        assert reader.sequence == 1
+        assert reader.overruns == 0
+        with pytest.raises(TimeoutError):
+            reader.next(timeout=0.01)
+
+
+def test_wraparound(ring, stream):
+    with StreamReader(stream) as reader:
+        for i in range(10):
+            ring.write(chunk(i))
+        # the reader fell behind: the chunks overwritten and the oldest one,
+        # which may be being overwritten, are lost
+        check(reader.next(timeout=1), 7)
+        assert reader.overruns == 7
+        values = reader.next(timeout=1)
+        check(values, 8)
+        assert reader.valid()
+        for i in range(10, 10 + NSLOTS - 1):
+            ring.write(chunk(i))
+        # the slot of the chunk 8 has been reused
+        assert not reader.valid(8)
+        check(reader.next(timeout=1), 10)
+        assert reader.overruns == 8
+
+
+def test_start_oldest(ring, stream):
+    for i in range(10):
+        ring.write(chunk(i))
+    with StreamReader(stream, start='oldest') as reader:
+        assert [reader.next(timeout=1)[0] for _ in range(NSLOTS - 1)] == \
+            [7, 8, 9]
+        assert reader.overruns == 0
+
+
+def test_torn_read(ring, stream, monkeypatch):
+    with StreamReader(stream) as reader:
+        for i in range(3):
+            ring.write(chunk(i))
+        values = reader._values
+
+        def torn(slot, copy):
+            # the broker overwrites the slot while it is being read
+            out = list(values(slot, copy))
+            ring.layout.sequences[slot] += 1
+            monkeypatch.setattr(reader, '_values', values)
+            return out
+        monkeypatch.setattr(reader, '_values', torn)
+        check(reader.next(timeout=1), 1)
+        assert reader.overruns == 1
+        assert reader.sequence == 1
+
+
+def test_slot_being_written(ring, stream):
+    with StreamReader(stream) as reader:
+        ring.write(chunk(0))
+        ring.write(chunk(1))
+        ring.layout.sequences[0] = 1
+        check(reader.next(timeout=1), 1)
+        assert reader.overruns == 1
+
+
+def test_architecture(monkeypatch, stream):
+    monkeypatch.setattr(platform, 'machine', lambda: 'aarch64')
+    with pytest.raises(RuntimeError):
+        SharedRing(stream, [('scalar', np.uint16, ())])
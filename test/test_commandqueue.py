@@ -0,0 +1,92 @@
+import os
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.commandqueue import CommandError
+
+
+class Client(simulated.SimulatedDispatcherAccess):
+    # client recording the waiting-for-ack mode of the commands it sends
+    def __init__(self, *args, **keywords):
+        simulated.SimulatedDispatcherAccess.__init__(self, *args, **keywords)
+        self.ackmodes = []
+
+    def sendSetNSample(self, nsample):
+        self.ackmodes.append(self.waitingForAckMode)
+        if nsample < 0:
+            raise RuntimeError('Invalid Nsample.')
+        simulated.SimulatedDispatcherAccess.sendSetNSample(self, nsample)
+
+
+@pytest.fixture(scope='module')
+def client():
+    return Client(ack_delay=0.01)
+
+
+@pytest.fixture(autouse=True)
+def reset(client):
+    client.waitingForAckMode = False
+    client.ackmodes = []
+
+
+def test_order(client):
+    nsamples = list(range(10, 110, 10))
+    request = client.request('QUBIC_Nsample', ring_size=64)
+    try:
+        with client.command_queue() as queue:
+            for nsample in nsamples:
+                queue.sendSetNSample(nsample)
+        values = [request.next() for _ in nsamples]
+    finally:
+        request.abort()
+    assert values == nsamples
+    assert client.fetch('QUBIC_Nsample') == nsamples[-1]
+
+
+@pytest.mark.parametrize('ackmode', [False, True])
+@pytest.mark.parametrize('barrier', [False, True])
+def test_ackmode(client, ackmode, barrier):
+    client.waitingForAckMode = ackmode
+    with client.command_queue(barrier=barrier) as queue:
+        for nsample in (100, 200, 300):
+            queue.sendSetNSample(nsample)
+    # only the last command may be acknowledged
+    assert client.ackmodes == [False, False, barrier or ackmode]
+    assert client.waitingForAckMode == ackmode
+
+
+@pytest.mark.parametrize('ackmode', [False, True])
+def test_failures(client, ackmode):
+    client.waitingForAckMode = ackmode
+    queue = client.command_queue()
+    queue.sendSetNSample(100)
+    queue.sendSetNSample(-1)
+    queue.sendSetNSample(200)
+    with pytest.raises(CommandError) as excinfo:
+        queue.flush()
+    failures = excinfo.value.failures
+    assert [(_.index, _.name, _.args) for _ in failures] == [
+        (1, 'sendSetNSample', (-1,))]
+    # the commands following the failure are sent and the mode is restored
+    assert len(client.ackmodes) == 3
+    assert client.waitingForAckMode == ackmode
+    assert client.fetch('QUBIC_Nsample') == 200
+    assert len(queue) == 0
+
+
+def test_unknown_command(client):
+    queue = client.command_queue()
+    with pytest.raises(AttributeError):
+        queue.sendUnknownCommand(0)
+    with pytest.raises(AttributeError):
+        queue.waitMs
+
+
+def test_exception_discards(client):
+    with pytest.raises(ValueError):
+        with client.command_queue() as queue:
+            queue.sendSetNSample(100)
+            raise ValueError()
+    assert len(queue) == 0
+    assert client.ackmodes == []
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+
+# minimum progress of the counter thread during a blocking call, relative to
+# its progress while the main thread sleeps
+THRESHOLD = 0.2
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess(ack_delay=0.1)
+
+
+@pytest.fixture
+def progress():
+    # increments per second of a counter thread during the call of a function
+    state = {'count': 0, 'stopped': False}
+
+    def counter():
+        while not state['stopped']:
+            state['count'] += 1
+
+    def progress(func):
+        count = state['count']
+        start = time.time()
+        func()
+        return (state['count'] - count) / (time.time() - start)
+
+    thread = threading.Thread(target=counter)
+    thread.daemon = True
+    thread.start()
+    yield progress
+    state['stopped'] = True
+    thread.join()
+
+
+def test_wait_ms(client, progress):
+    reference = progress(lambda: time.sleep(0.5))
+    assert progress(lambda: client.waitMs(500)) >= THRESHOLD * reference
+
+
+def test_acknowledged_commands(client, progress):
+    def commands():
+        client.waitingForAckMode = True
+        try:
+            for i in range(5):
+                client.sendGetStatus(0)
+        finally:
+            client.waitingForAckMode = False
+
+    reference = progress(lambda: time.sleep(0.5))
+    start = time.time()
+    assert progress(commands) >= THRESHOLD * reference
+    # the commands were acknowledged, not sent without waiting
+    assert time.time() - start >= 0.4
+    assert not client.waitingForAckMode
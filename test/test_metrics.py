@@ -0,0 +1,110 @@
+import json
+import os
+import warnings
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.metrics import (
+    CLIENT_METRICS, DISPATCHER_PARAMETERS, HealthSampler, LatencyHistogram,
+    prometheus)
+from pystudio.utils import PyStudioWarning
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+def test_histogram():
+    histogram = LatencyHistogram((0.1, 1))
+    for seconds in (0.05, 0.1, 0.5, 2):
+        histogram.observe(seconds)
+    out = histogram.as_dict()
+    assert out['counts'] == [2, 1, 1]
+    assert out['count'] == 4
+    assert out['sum'] == pytest.approx(2.65)
+    assert out['max'] == 2
+
+
+def test_sample(client):
+    sampler = HealthSampler(client, size=2)
+    sample = sampler.sample()
+    for name in CLIENT_METRICS + DISPATCHER_PARAMETERS:
+        assert name in sample
+    assert sample['saturated'] is False
+    sampler.sample()
+    last = sampler.sample()
+    # the ring buffer keeps the last samples
+    assert len(sampler.samples) == 2
+    assert sampler.samples[-1] is last
+
+
+def test_latencies(client):
+    sampler = HealthSampler(client, period=60, parameters=[])
+    sampler.start()
+    try:
+        assert client.health_sampler is sampler
+        with pytest.raises(RuntimeError):
+            HealthSampler(client).start()
+        client.fetch('QUBIC_Nsample')
+        request = client.request('QUBIC_Nsample', 10)
+        try:
+            request.next()
+        finally:
+            request.abort()
+        with sampler.timer('user'):
+            pass
+    finally:
+        sampler.stop()
+    assert client.health_sampler is None
+    assert not sampler.running
+    for name in ('fetch', 'next', 'user'):
+        assert sampler.latency(name)['count'] >= 1
+    sample = sampler.sample()
+    assert set(sample['latencies']) == {'fetch', 'next', 'user'}
+
+
+def test_saturation(client):
+    sampler = HealthSampler(client, parameters=[], saturation=0)
+    with pytest.warns(PyStudioWarning):
+        assert sampler.sample()['saturated']
+    # the warning is only issued when the buffer becomes saturated
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        sampler.sample()
+    assert sampler.nsaturations == 2
+
+
+def test_export_jsonl(client, tmpdir):
+    output = str(tmpdir.join('health.jsonl'))
+    sampler = HealthSampler(client, output=output, format='jsonl')
+    sampler.sample()
+    sampler.sample()
+    with open(output) as f:
+        lines = [json.loads(_) for _ in f]
+    assert len(lines) == 2
+    assert lines[0]['stackSize'] == client.stackSize
+
+
+def test_export_prometheus(client, tmpdir):
+    output = str(tmpdir.join('health.prom'))
+    sampler = HealthSampler(client, output=output, parameters=[])
+    sampler.observe('fetch', 0.003)
+    sample = sampler.sample()
+    with open(output) as f:
+        text = f.read()
+    assert text == prometheus(sample)
+    assert os.listdir(str(tmpdir)) == ['health.prom']
+    assert 'pystudio_disp_' not in text
+    assert 'pystudio_stack_size {0}'.format(client.stackSize) in text
+    assert '# TYPE pystudio_request_latency_seconds histogram' in text
+    assert 'pystudio_request_latency_seconds_count{request="fetch"} 1' in \
+        text
+    assert 'pystudio_request_latency_seconds_bucket{request="fetch",' \
+        'le="+Inf"} 1' in text
+
+
+def test_invalid_format(client):
+    with pytest.raises(ValueError):
+        HealthSampler(client, format='csv')
@@ -0,0 +1,71 @@
+import os
+import pickle
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio import parameters
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(parameters, 'CACHE_DIR', str(tmpdir))
+    return tmpdir
+
+
+def test_read_schema_cache(cache_dir):
+    schema = parameters.read_schema()
+    path, digest = parameters._schema_cache_path(parameters.FILENAME)
+    assert os.listdir(str(cache_dir)) == [os.path.basename(path)]
+    assert parameters.read_schema() == schema
+
+
+def test_read_schema_invalid_cache(cache_dir):
+    schema = parameters.read_schema()
+    path, digest = parameters._schema_cache_path(parameters.FILENAME)
+    with open(path, 'wb') as f:
+        f.write(pickle.dumps((parameters.SCHEMA_VERSION, 'other', [])))
+    assert parameters.read_schema() == schema
+    with open(path, 'wb') as f:
+        f.write(b'garbage')
+    assert parameters.read_schema() == schema
+
+
+def test_read_schema_failed_write(cache_dir, monkeypatch):
+    def rename(src, dst):
+        raise OSError('rename failed')
+    monkeypatch.setattr(os, 'rename', rename)
+    assert len(parameters.read_schema()) > 0
+    assert os.listdir(str(cache_dir)) == []
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+def test_table_built_once(client):
+    table = client.parameters
+    assert client.parameters is table
+    client.fetch('QUBIC_Nsample')
+    assert client.parameters is table
+    client.invalidate_parameters()
+    assert client.parameters is not table
+
+
+def test_table_indexes(client):
+    table = client.parameters
+    param = table['QUBIC_Nsample']
+    assert param.name == 'QUBIC_Nsample'
+    assert table[param.id].id == param.id
+    assert 'QUBIC_Nsample' in table
+    assert param.id in table
+    assert 'UNKNOWN_PARAMETER' not in table
+    with pytest.raises(ValueError):
+        table['UNKNOWN_PARAMETER']
+    with pytest.raises(ValueError):
+        table[2**31 - 1]
+    assert len(table) == len(list(table))
+    # the first parameter of an identifier is returned
+    for param in table:
+        assert table[param.id].id == param.id
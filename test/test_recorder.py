@@ -0,0 +1,99 @@
+import os
+import time
+import numpy as np
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.recorder import SessionReader
+from pystudio.replay import ReplayDispatcherAccess
+
+TIMELINE = 'QUBIC_PixelScientificDataTimeLine_0'
+# the chunk size, upper bound of the timeline, is transferred with it
+PARAMETERS = [TIMELINE, 'QUBIC_PixelScientificDataTimeLineSize']
+
+
+@pytest.fixture(scope='module')
+def client():
+    client = simulated.SimulatedDispatcherAccess()
+    client._configure('asics=0')
+    return client
+
+
+def wait_pending(request, count, timeout=5):
+    deadline = time.time() + timeout
+    while request.pending < count:
+        assert time.time() < deadline, 'The request has not arrived.'
+        time.sleep(0.01)
+
+
+def test_record_unconsumed(client, tmpdir):
+    # the chunks are recorded at their arrival, even if never consumed
+    recorder = client.start_recording(str(tmpdir))
+    request = client.request('QUBIC_Nsample', 10)
+    try:
+        wait_pending(request, 3)
+    finally:
+        request.abort()
+        client.stop_recording()
+    assert recorder.error is None
+    reader = SessionReader(str(tmpdir))
+    records = list(reader.select(request=request.id))
+    assert len(records) >= 3
+    assert [_.sequence for _ in records] == list(range(len(records)))
+    assert all(list(_.values) == ['QUBIC_Nsample'] for _ in records)
+
+
+def test_record_active_request(client, tmpdir):
+    request = client.request('QUBIC_Nsample', 10)
+    try:
+        wait_pending(request, 1)
+        first = request.ring.head
+        client.start_recording(str(tmpdir))
+        wait_pending(request, 3)
+    finally:
+        request.abort()
+        client.stop_recording()
+    records = list(SessionReader(str(tmpdir)))
+    assert len(records) >= 1
+    assert records[0].sequence >= first
+
+
+def test_record_one_time(client, tmpdir):
+    client.start_recording(str(tmpdir))
+    try:
+        value = client.fetch('QUBIC_Nsample')
+    finally:
+        client.stop_recording()
+    records = list(SessionReader(str(tmpdir)))
+    assert len(records) == 1
+    assert records[0].sequence == -1
+    assert records[0].values['QUBIC_Nsample'] == value
+
+
+def test_record_replay(client, tmpdir):
+    recorder = client.start_recording(str(tmpdir))
+    request = client.request(PARAMETERS, ring_size=64)
+    try:
+        recorded = [request.next()[0] for _ in range(5)]
+    finally:
+        request.abort()
+        client.stop_recording()
+    assert recorder.dropped == 0
+    assert all(_.shape[-1] > 0 for _ in recorded)
+    reader = SessionReader(str(tmpdir))
+    assert len(reader) >= 5
+    for record, value in zip(reader, recorded):
+        assert np.array_equal(record.values[TIMELINE], value)
+
+    replay = ReplayDispatcherAccess(session=reader, speed=None)
+    try:
+        request = replay.request(PARAMETERS, ring_size=64)
+        try:
+            replayed = [request.next()[0] for _ in range(5)]
+        finally:
+            request.abort()
+    finally:
+        replay.stop()
+    for value, expected in zip(replayed, recorded):
+        assert np.array_equal(value, expected)
@@ -0,0 +1,151 @@
+import os
+import pytest
+import subprocess
+import sys
+import threading
+import time
+import weakref
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+def wait_pending(request, timeout=5):
+    deadline = time.time() + timeout
+    while request.pending == 0:
+        assert time.time() < deadline, 'The request has not arrived.'
+        time.sleep(0.01)
+
+
+def test_drain_one_time(client):
+    request = simulated.RequestOneTime(client, ['QUBIC_Nsample'], 1000)
+    wait_pending(request)
+    chunks = request.drain()
+    assert len(chunks) == 1
+    assert request.pending == 0
+    assert request.drain() == []
+
+
+def test_drain_without_ring(client):
+    request = client.request('QUBIC_Nsample', 10, ring_size=0)
+    try:
+        wait_pending(request)
+        assert len(request.drain()) == 1
+        assert len(request.drain()) <= 1
+    finally:
+        request.abort()
+
+
+def test_acquire_timeline(client):
+    client._configure('asics=0')
+    timeline, info = client.acquire_timeline(0, 1000, full_output=True,
+                                             dtype=float)
+    assert timeline.dtype == float
+    assert timeline.shape == (128, 1000)
+    assert info['nduplicates'] == 0
+    assert info['rate'] > 0
+
+
+def test_several_clients(client):
+    other = simulated.SimulatedDispatcherAccess()
+    fast = client.request(['QUBIC_Nsample'], 10)
+    slow = other.request(['QUBIC_Nsample'], 60000)
+    try:
+        wait_pending(fast)
+        assert slow.pending == 0
+    finally:
+        fast.abort()
+        slow.abort()
+
+
+def test_release_with_weak_reference():
+    # a thread dereferencing a weak reference to a client, as the replay
+    # thread does, must not resurrect it while it is deallocated
+    refs = []
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            client = refs[-1]() if len(refs) > 0 else None
+            time.sleep(0.0001)
+            del client
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        for _ in range(20):
+            other = simulated.SimulatedDispatcherAccess()
+            refs.append(weakref.ref(other))
+            del other
+    finally:
+        stop.set()
+        thread.join()
+    assert all(_() is None for _ in refs)
+
+
+def test_concurrent_fetches(client):
+    nthreads = 8
+    nfetches = 50
+    errors = []
+    values = []
+    requests = [client.request(['QUBIC_Nsample'], 5) for _ in range(2)]
+
+    def fetch():
+        try:
+            for _ in range(nfetches):
+                values.append(int(client.fetch('QUBIC_Nsample')))
+                client.state, client.stackSize, client.parameters
+        except Exception as exc:
+            errors.append(exc)
+
+    def consume():
+        try:
+            while any(_.is_alive() for _ in threads):
+                for request in requests:
+                    request.drain()
+                time.sleep(0.001)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=fetch) for _ in range(nthreads)]
+    consumer = threading.Thread(target=consume)
+    try:
+        for thread in threads:
+            thread.start()
+        consumer.start()
+        for thread in threads + [consumer]:
+            thread.join(60)
+            assert not thread.is_alive()
+    finally:
+        for request in requests:
+            request.abort()
+    assert errors == []
+    assert values == nthreads * nfetches * [100]
+
+
+def test_parameter_value_not_shared(client):
+    parameter = client.parameters['QUBIC_Nsample']
+    value = parameter.value
+    value.shape = (1, 1)
+    value.flags.writeable = False
+    assert parameter.value.shape == parameter.shape
+    assert parameter.value.flags.writeable
+    assert parameter.value.base is value.base
+
+
+def test_exit():
+    # the event loop thread must not prevent the interpreter from exiting
+    code = ('import pystudio.simulated as s\n'
+            'client = s.SimulatedDispatcherAccess()\n'
+            'client.fetch("QUBIC_Nsample")\n')
+    process = subprocess.Popen([sys.executable, '-c', code])
+    try:
+        assert process.wait(30) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.snapshot import SnapshotHistory, group_parameters, snapshot
+
+TIMELINE = 'QUBIC_PixelScientificDataTimeLine_0'
+# the upper bound of the timeline, transferred with it
+GROUP = [TIMELINE, 'QUBIC_PixelScientificDataTimeLineSize']
+
+
+@pytest.fixture(scope='module')
+def client():
+    client = simulated.SimulatedDispatcherAccess()
+    # the timelines are those written by the tests
+    client._configure('source=none')
+    return client
+
+
+def write_timeline(client, nsamples):
+    value = np.arange(128 * nsamples, dtype=np.float32).reshape(128, -1)
+    client._write(TIMELINE, value)
+    return value
+
+
+def test_group_parameters():
+    assert group_parameters('fll') == ('QUBIC_FLL_State', 'QUBIC_FLL_P',
+                                       'QUBIC_FLL_I', 'QUBIC_FLL_D')
+    assert group_parameters('a, b') == ('a', 'b')
+    for group in ([], ['a', 'a'], ['time']):
+        with pytest.raises(ValueError):
+            group_parameters(group)
+
+
+def test_snapshot(client):
+    record = snapshot(client, 'acquisition')
+    assert record.dtype.names == ('time',) + group_parameters('acquisition')
+    assert record['QUBIC_Nsample'] == client.fetch('QUBIC_Nsample')
+    assert record['time'] > 0
+
+
+def test_dtype_shape_change(client):
+    value = write_timeline(client, 5)
+    first = snapshot(client, GROUP)
+    assert first.dtype[TIMELINE].shape == (128, 5)
+    assert np.array_equal(first[TIMELINE], value)
+    # the dtype is reused as long as the shapes do not change
+    assert snapshot(client, GROUP).dtype is first.dtype
+    value = write_timeline(client, 7)
+    second = snapshot(client, GROUP)
+    assert second.dtype[TIMELINE].shape == (128, 7)
+    assert np.array_equal(second[TIMELINE], value)
+    assert snapshot(client, GROUP).dtype is second.dtype
+
+
+def test_history_growth(client):
+    write_timeline(client, 5)
+    history = SnapshotHistory(2)
+    assert history.data is None
+    records = [snapshot(client, GROUP) for _ in range(5)]
+    for record in records:
+        history.append(record)
+    assert len(history) == 5
+    assert len(history._data) == 8
+    assert np.array_equal(history.data['time'], [_['time'] for _ in records])
+    assert np.array_equal(history.data[TIMELINE][-1], records[-1][TIMELINE])
+    # the snapshots whose shapes differ are rejected
+    write_timeline(client, 7)
+    with pytest.raises(ValueError):
+        history.append(snapshot(client, GROUP))
+    assert len(history) == 5
+    history.clear()
+    assert len(history) == 0
+    assert len(history._data) == 8
+
+
+def test_history_size():
+    with pytest.raises(ValueError):
+        SnapshotHistory(0)
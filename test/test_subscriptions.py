@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pytest
+import threading
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.subscriptions import SubscriptionManager
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+@pytest.mark.parametrize('ring_size', [0, 16])
+def test_callback(client, ring_size):
+    event = threading.Event()
+    values = []
+
+    def callback(value):
+        values.append(value)
+        if len(values) == 3:
+            event.set()
+
+    subscription = client.subscribe('QUBIC_Nsample', 10, callback,
+                                    ring_size=ring_size)
+    try:
+        assert event.wait(5)
+    finally:
+        subscription.close()
+    assert subscription.nerrors == 0
+
+
+@pytest.fixture
+def manager(client):
+    manager = SubscriptionManager(client, max_requests=2, timeout=5000)
+    yield manager
+    manager.close()
+
+
+def test_grouping(client, manager):
+    a = manager.subscribe('QUBIC_Nsample', 10)
+    b = manager.subscribe('NETQUIC_PIOValue', 10)
+    assert manager.nslots == 1
+    c = manager.subscribe('QUBIC_Nsample', 20)
+    assert manager.nslots == 2
+    assert manager.available == 0
+    with pytest.raises(RuntimeError):
+        manager.subscribe('QUBIC_Nsample', 30)
+    # a subscription with the trigger of an existing group needs no slot
+    d = manager.subscribe('QUBIC_Nsample', 20)
+    assert manager.nslots == 2
+    c.close()
+    assert manager.nslots == 2
+    d.close()
+    assert manager.nslots == 1
+    a.close()
+    b.close()
+    assert manager.nslots == 0
+    assert len(client.active_requests) == 0
+
+
+def test_union(client, manager):
+    a = manager.subscribe('QUBIC_Nsample', 10)
+    b = manager.subscribe(['NETQUIC_PIOValue', 'QUBIC_Nsample'], 10)
+    group = manager.groups[(10, 1)]
+    assert group.parameters == ('QUBIC_Nsample', 'NETQUIC_PIOValue')
+    nsample = client.fetch('QUBIC_Nsample')
+    assert a.next() == nsample
+    pio, nsample_ = b.next()
+    assert nsample_ == nsample
+    assert np.array_equal(pio, client.fetch('NETQUIC_PIOValue'))
+    # the subscriptions already served do not resend the request
+    request = group.request
+    manager.subscribe('NETQUIC_PIOValue', 10)
+    assert group.request is request
+
+
+def test_abort_then_resend(client, manager):
+    a = manager.subscribe('QUBIC_Nsample', 10)
+    a.next()
+    group = manager.groups[(10, 1)]
+    previous = group.request
+    b = manager.subscribe('NETQUIC_PIOValue', 10)
+    # the previous request was aborted before its replacement was sent
+    assert group.request is not previous
+    assert client.active_requests == [group.request]
+    assert client._nbrequests() == 1
+    a.next()
+    b.next()
+    # if the replacement fails, the previous request is restored
+    request = group.request
+    with pytest.raises(Exception):
+        manager.subscribe('UNKNOWN_PARAMETER', 10)
+    assert group.parameters == ('QUBIC_Nsample', 'NETQUIC_PIOValue')
+    assert group.request is not None and group.request is not request
+    assert client._nbrequests() == 1
+    a.next()
+    b.next()
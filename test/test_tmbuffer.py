@@ -0,0 +1,135 @@
+import os
+import pytest
+import threading
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+from pystudio.tmbuffer import TMBufferManager
+
+
+@pytest.fixture
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+def test_manual_resize_is_not_shrunk(client):
+    manager = client.tm_buffer
+    manager.shrink_after = 1
+    client.resizeTMBuffer(4 * client.stackSize)
+    size = client.stackSize
+    assert manager.minimum == size
+    for i in range(5):
+        assert manager.sample() == size
+    assert client.stackSize == size
+
+
+class Client(object):
+    # client whose TM buffer occupation and overlaps are set by the test
+    def __init__(self, size, nrequests=0):
+        self.stackSize = size
+        self.stackOccupation = 0
+        self.nbOverlap = 0
+        self.active_requests = [Request() for _ in range(nrequests)]
+        self.sizes = []
+
+    def _resize_tm_buffer(self, size):
+        self.stackSize = size
+        self.sizes.append(size)
+
+
+class Request(object):
+    id = 0
+    overruns = 0
+
+
+def sample(manager, n=1):
+    for i in range(n):
+        manager.sample()
+    return manager.client.stackSize
+
+
+def test_floor():
+    client = Client(2, nrequests=3)
+    manager = TMBufferManager(client, minimum=1, headroom=2, shrink_after=1)
+    assert manager.required() == 6
+    assert sample(manager) == 6
+    assert sample(manager, 10) == 6
+    client.active_requests = []
+    assert sample(manager) == 3
+    assert sample(manager, 10) == 1
+
+
+def test_grow_on_overlap():
+    client = Client(64)
+    manager = TMBufferManager(client, minimum=1)
+    events = []
+    manager.on_overrun(events.append)
+    assert sample(manager) == 64
+    client.nbOverlap += 1
+    assert sample(manager) == 128
+    assert len(events) == 1 and events[0].kind == 'tm_buffer'
+    client.nbOverlap += 3
+    assert sample(manager) == 256
+    assert manager.noverlaps == 4
+
+
+def test_grow_on_occupation():
+    client = Client(64)
+    manager = TMBufferManager(client, minimum=1, high=0.75, maximum=200)
+    client.stackOccupation = 47
+    assert sample(manager) == 64
+    client.stackOccupation = 48
+    assert sample(manager) == 128
+    client.stackOccupation = 100
+    assert sample(manager) == 200
+
+
+def test_shrink_after():
+    client = Client(64)
+    manager = TMBufferManager(client, minimum=1, low=0.25, shrink_after=5)
+    assert sample(manager, 4) == 64
+    assert sample(manager) == 32
+    assert sample(manager, 4) == 32
+    assert sample(manager) == 16
+    # a sample of normal occupation restarts the count
+    assert sample(manager, 4) == 16
+    client.stackOccupation = 8
+    assert sample(manager) == 16
+    client.stackOccupation = 0
+    assert sample(manager, 4) == 16
+    assert sample(manager) == 8
+
+
+def test_concurrent_samples():
+    client = Client(1024)
+    manager = TMBufferManager(client, minimum=1, shrink_after=1)
+
+    def run():
+        for i in range(20):
+            manager.sample()
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # each resize halves the size it replaces, down to the floor
+    sizes = [1024] + client.sizes
+    assert all(new == old // 2 for old, new in zip(sizes[:-1], sizes[1:]))
+    assert client.stackSize == 1
+    assert manager.nresizes == len(client.sizes)
+
+
+def test_concurrent_samples_client(client):
+    manager = TMBufferManager(client, minimum=1, shrink_after=1)
+    client._resize_tm_buffer(1024)
+
+    def run():
+        for i in range(20):
+            manager.sample()
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.stackSize >= manager.required()
+    assert client.stackSize < 1024
@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import pytest
+
+os.environ.setdefault('PYSTUDIO_SIMULATOR', '1')
+simulated = pytest.importorskip('pystudio.simulated')
+
+PARAMETER = 'NETQUIC_PIOValue'
+# above MIN_SIZE_TRANSFER_TABLE, the conversions use the lookup tables and
+# the affine coefficients
+N = 4096
+
+
+@pytest.fixture(scope='module')
+def client():
+    return simulated.SimulatedDispatcherAccess()
+
+
+def serial(client, x):
+    # the conversion of the values one at a time, as float64 scalars, by
+    # the transfer function itself
+    return np.array([client.convertADU2Value(PARAMETER, float(_))
+                     for _ in np.ravel(x)]).reshape(np.shape(x))
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.int8, np.uint16, np.int16])
+def test_adu2value_table(client, dtype):
+    info = np.iinfo(dtype)
+    x = np.linspace(info.min, info.max, N).astype(dtype).reshape(64, -1)
+    out = client.convertADU2Value(PARAMETER, x)
+    assert out.dtype == np.float64
+    assert out.shape == x.shape
+    assert np.array_equal(out, serial(client, x))
+    # the table is used for small arrays once it has been computed
+    assert np.array_equal(client.convertADU2Value(PARAMETER, x[0, :3]),
+                          serial(client, x[0, :3]))
+
+
+@pytest.mark.parametrize('dtype', [np.int32, np.uint32, np.float32, float])
+def test_adu2value_affine(client, dtype):
+    x = np.linspace(-1000 if np.dtype(dtype).kind != 'u' else 0, 1e6,
+                    N).astype(dtype)
+    out = client.convertADU2Value(PARAMETER, x)
+    assert out.dtype == np.float64
+    assert np.allclose(out, serial(client, x), rtol=1e-12)
+
+
+def test_adu2value_scalar(client):
+    out = client.convertADU2Value(PARAMETER, np.uint16(3))
+    assert np.ndim(out) == 0
+    assert out == serial(client, 3)
+
+
+def test_adu2value_identifier(client):
+    x = np.arange(N, dtype=np.uint16)
+    parameter_id = client.parameters[PARAMETER].id
+    assert np.array_equal(client.convertADU2Value(parameter_id, x),
+                          client.convertADU2Value(PARAMETER, x))
+
+
+def test_value2adu(client):
+    x = np.arange(N, dtype=float)
+    out = client.convertValue2ADU(PARAMETER, x)
+    assert out.dtype == client.parameters[PARAMETER].value.dtype
+    assert np.array_equal(out, [client.convertValue2ADU(PARAMETER, _)
+                                for _ in x])
+    assert np.array_equal(client.convertADU2Value(PARAMETER, out), x)
+
+
+def test_reload_tf(client):
+    x = np.arange(N, dtype=np.uint16)
+    expected = client.convertADU2Value(PARAMETER, x)
+    client.convertADU2Value(PARAMETER, x.astype(float))
+    version = client.dispatcherTFVersionLoaded
+    assert set(_[1] for _ in client._transferTables) == {version}
+    parameters = client.parameters
+    assert client.sendReloadTF()
+    assert client.dispatcherTFVersionLoaded == version + 1
+    # the parameter table and the cached conversions are discarded
+    assert len(client._transferTables) == 0
+    assert client.parameters is not parameters
+    assert np.array_equal(client.convertADU2Value(PARAMETER, x), expected)
+    assert set(_[1] for _ in client._transferTables) == {version + 1}
+